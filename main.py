@@ -1,6 +1,8 @@
 from src.logger.logging import LogConfig
 from loguru import logger
 from src.agent.main import MainAgent
+from src.session.factory import create_session_service
+from src.config.config import load_memory_config
 import asyncio
 from src.event.events import EventType
 
@@ -85,12 +87,15 @@ If a TODO list is created, you should follow it strictly.
     user_id = "user_123"
     session_id = "session_456"
     invocation_id = "invocation_123"
+    # 会话服务使用进程共享的连接池，可在多次对话间复用
+    session_service = create_session_service()
     main_agent = MainAgent(
         prompt=prompt, 
         user_message=user_message,
         user_id=user_id,
         session_id=session_id,
         invocation_id=invocation_id,
+        session_service=session_service,
     )
 
     message_generator = main_agent.handle_user_message()
@@ -102,5 +107,12 @@ If a TODO list is created, you should follow it strictly.
             if chunk.type == EventType.COMPLETE_RESPONSE:
                 logger.info(f"Complete response: {chunk.content}")
 
+    await session_service.aclose()
+    # 等待后台的历史压缩完成；记忆服务依赖 SQLAlchemy，只在启用压缩时导入
+    if load_memory_config()["compaction_enabled"]:
+        from src.memory.MySQL_Abstractor import get_mysql_abstractor
+
+        await get_mysql_abstractor().wait_for_compactions()
+
 if __name__ == "__main__":
     asyncio.run(main())
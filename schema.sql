@@ -2,6 +2,7 @@ CREATE TABLE IF NOT EXISTS sessions (
     session_id VARCHAR(128) NOT NULL PRIMARY KEY COMMENT '会话唯一标识符',
     user_id VARCHAR(128) NOT NULL COMMENT '用户标识符',
     session_state LONGTEXT COMMENT '会话状态数据，JSON格式',
+    accumulated_usage INT NOT NULL DEFAULT 0 COMMENT '累计token使用量',
     created_at datetime(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) COMMENT '创建时间',
     updated_at datetime(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6) COMMENT '更新时间',
 
@@ -29,6 +30,7 @@ CREATE TABLE IF NOT EXISTS events (
     INDEX idx_user_id (user_id),
     INDEX idx_session_id (session_id),
     INDEX idx_timestamp (timestamp),
+    INDEX idx_events_session_timestamp (session_id, timestamp),
     INDEX idx_invocation_id (invocation_id)
 ) DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='事件记录表';
 
@@ -39,11 +41,48 @@ CREATE TABLE IF NOT EXISTS messages (
     session_id VARCHAR(128) NOT NULL COMMENT '会话标识符',
     role ENUM('user','assistant') NOT NULL COMMENT '消息角色',
     content LONGTEXT NOT NULL COMMENT '消息内容',
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP COMMENT '消息时间',
+    created_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) COMMENT '消息时间',
     token_usage INT NOT NULL COMMENT '消息token',
     accumulated_usage INT NOT NULL COMMENT '累计token使用量',
 
     INDEX idx_messages_user (user_id),
     INDEX idx_messages_session (session_id),
-    INDEX idx_messages_created (created_at)
+    INDEX idx_messages_created (created_at),
+    INDEX idx_messages_user_session_created (user_id, session_id, created_at)
 ) DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='消息表';
+
+-- 会话摘要表
+-- 摘要覆盖到水位线消息为止，加载历史时使用 摘要 + 水位线之后的消息
+CREATE TABLE IF NOT EXISTS session_summaries (
+    session_id VARCHAR(128) NOT NULL PRIMARY KEY COMMENT '会话标识符',
+    user_id VARCHAR(128) NOT NULL COMMENT '用户标识符',
+    summary LONGTEXT NOT NULL COMMENT '摘要内容',
+    watermark_event_id VARCHAR(128) NOT NULL COMMENT '摘要覆盖的最后一条消息',
+    watermark_time DATETIME(6) NOT NULL COMMENT '水位线消息的时间',
+    watermark_usage INT NOT NULL COMMENT '水位线消息的累计token使用量',
+    token_usage INT NOT NULL COMMENT '摘要token',
+    updated_at datetime(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6) COMMENT '更新时间',
+
+    INDEX idx_summaries_user (user_id)
+) DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='会话摘要表';
+
+-- 迁移
+-- 为已有数据库补齐新增的列和索引，setup_database 会跳过已存在的列和索引
+ALTER TABLE sessions
+    ADD COLUMN accumulated_usage INT NOT NULL DEFAULT 0 COMMENT '累计token使用量' AFTER session_state;
+
+-- 由消息表回填会话的累计token使用量（与写入时维护的值一致，重复执行无影响）
+UPDATE sessions s
+SET accumulated_usage = (
+    SELECT COALESCE(MAX(m.accumulated_usage), 0)
+    FROM messages m
+    WHERE m.user_id = s.user_id AND m.session_id = s.session_id
+);
+
+ALTER TABLE events ADD INDEX idx_events_session_timestamp (session_id, timestamp);
+
+ALTER TABLE messages ADD INDEX idx_messages_user_session_created (user_id, session_id, created_at);
+
+-- 消息时间精确到微秒，同一秒内的消息也能按写入顺序分页
+ALTER TABLE messages
+    MODIFY created_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) COMMENT '消息时间';
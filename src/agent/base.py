@@ -15,6 +15,7 @@ from ..orchestration.runner import runner
 from ..tool.executor import executor
 from ..event.events import Event
 from ..utils.count_tokens import count_tokens
+from ..prompt.parallel import PARALLEL_TOOL_CALLS_PROMPT
 
 def _get(obj, key, default=None):
     if obj is None:
@@ -23,6 +24,22 @@ def _get(obj, key, default=None):
         return obj.get(key, default)
     return getattr(obj, key, default)
 
+def history_message(message: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Rebuild a stored message exactly as it was sent to the model.
+
+    User messages are stored as the JSON of their content blocks; decoding them
+    keeps the history byte-identical to the earlier request, so providers can
+    reuse the cached prompt prefix.
+    """
+    content = message["content"]
+    if message["role"] == "user" and isinstance(content, str) and content.startswith("["):
+        try:
+            content = json.loads(content)
+        except json.JSONDecodeError:
+            pass
+    return {"role": message["role"], "content": content}
+
 class BaseAgent(ABC):
     """Base class for both main agents and sub agents"""
 
@@ -35,6 +52,8 @@ class BaseAgent(ABC):
         invocation_id: Optional[str] = None,
         model: str = "dashscope/qwen-max-latest",
         parent_span_id: Optional[str] = None,
+        max_turns: Optional[int] = None,
+        parallel_tool_calls: Optional[bool] = None,
     ):
         """
         Initialize base agent with common parameters.
@@ -47,6 +66,8 @@ class BaseAgent(ABC):
             invocation_id: Invocation ID of current chat
             model: LLM model to use
             parent_span_id: Parent span ID for creating child spans
+            max_turns: Max LLM turns per run, defaults to AGENT_MAX_TURNS env or 50
+            parallel_tool_calls: Allow several tool calls per LLM turn, defaults to PARALLEL_TOOL_CALLS env
         """
         self.name = name
         self.tools = tools or []
@@ -56,7 +77,7 @@ class BaseAgent(ABC):
         self.model = model
         self.parent_span_id = parent_span_id
         self.executor = executor(user_id=user_id, session_id=session_id, invocation_id=invocation_id, author=name)
-        self.runner = runner(user_id=user_id, session_id=session_id, invocation_id=invocation_id, tools=self.tools, model=model, author=name, executor=self.executor)
+        self.runner = runner(user_id=user_id, session_id=session_id, invocation_id=invocation_id, tools=self.tools, model=model, author=name, executor=self.executor, max_turns=max_turns, parallel_tool_calls=parallel_tool_calls)
         
 
     def basic_info(self):
@@ -67,6 +88,10 @@ class BaseAgent(ABC):
         """
         Build the messages array for LLM completion.
         Must be implemented by subclasses.
+
+        Keep the layout ``system + history + new user message`` and avoid
+        per-request content (timestamps, ids) before the new message, so the
+        prefix stays byte-identical across requests and turns for prompt caching.
         """
         pass
 
@@ -113,7 +138,7 @@ class BaseAgent(ABC):
         This method:
         1. Builds the messages from subclass implementation
         2. Calls conversation start hook
-        3. Runs the recursive LLM completion with streaming
+        3. Runs the iterative LLM turn loop with streaming
         4. Calls conversation end hook
         5. Yields streaming response chunks
         """
@@ -123,6 +148,10 @@ class BaseAgent(ABC):
             # Build messages from subclass implementation
             messages = self.build_messages(*args, **kwargs)
 
+            # 并行工具调用模式下提示模型一次返回互不依赖的多个 tool call
+            if self.runner.parallel_tool_calls and messages and messages[0].get("role") == "system":
+                messages[0]["content"] = messages[0]["content"] + PARALLEL_TOOL_CALLS_PROMPT
+
             # Call conversation start hook
             await self.on_conversation_start()
 
@@ -12,6 +12,9 @@ from src.logger.logging import logger, LogConfig
 
 LogConfig.init_logger()
 
+# 迁移语句重复执行时的错误码：列已存在、索引已存在
+ALREADY_MIGRATED_ERRORS = {1060, 1061}
+
 def read_schema_file(schema_file: str = None) -> str:
     if schema_file is None:
         schema_file = Path(__file__).resolve().parent.parent.parent / "schema.sql"
@@ -135,6 +138,12 @@ def setup_database():
                         #     table_part = statement[table_start:].split("(")[0]
                         #     table_name = table_part.split()[-1].strip("`")
                         #     logger.info(f"创建表：{table_name}")
+                    except pymysql.err.OperationalError as e:
+                        if e.args and e.args[0] in ALREADY_MIGRATED_ERRORS:
+                            logger.info(f"第{i}个SQL语句已执行过，跳过: {e.args[1]}")
+                            continue
+                        logger.error(f"执行第{i}个SQL语句失败: {e}")
+                        raise e
                     except Exception as e:
                         logger.error(f"执行第{i}个SQL语句失败: {e}")
                         raise e
@@ -147,7 +156,7 @@ def setup_database():
                 cursor.execute("SHOW TABLES")
                 tables = cursor.fetchall()
 
-                expected_tables = ["sessions", "events", "messages"]
+                expected_tables = ["sessions", "events", "messages", "session_summaries"]
                 found_tables = [
                     table for row in tables for table in row.values() if table in expected_tables
                 ]
@@ -0,0 +1,94 @@
+"""
+进程级数据库引擎
+
+每个数据库 URL 只在首次使用时创建一个引擎（及其连接池），由进程内所有会话服务、
+摘要器和智能体共享，处理每条消息时不再重复建立和释放连接。
+连接池大小、溢出数量、pre-ping 和 recycle 由 load_db_config 配置。
+"""
+
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from ..config.config import load_db_config
+from ..logger import logger
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+_engines: Dict[str, Engine] = {}
+_async_engines: Dict[str, "AsyncEngine"] = {}
+_engine_lock = threading.RLock()
+
+
+def engine_options(config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """同步和异步引擎共用的连接池参数"""
+    config = config or load_db_config()
+    return {
+        "pool_size": config["pool_size"],
+        "max_overflow": config["max_overflow"],
+        "pool_timeout": config["pool_timeout"],
+        "pool_recycle": config["pool_recycle"],
+        "pool_pre_ping": config["pool_pre_ping"],
+    }
+
+
+def get_engine(url: Optional[str] = None) -> Engine:
+    """获取 url 对应的共享同步引擎，默认 DATABASE_URL"""
+    config = load_db_config()
+    url = url or config["url"]
+
+    engine = _engines.get(url)
+    if engine is None:
+        with _engine_lock:
+            engine = _engines.get(url)
+            if engine is None:
+                engine = create_engine(url, **engine_options(config))
+                _engines[url] = engine
+                logger.info(f"创建数据库引擎: {engine.url!r}")
+
+    return engine
+
+
+def get_async_engine(url: Optional[str] = None) -> "AsyncEngine":
+    """
+    获取 url 对应的共享异步引擎，默认 DATABASE_ASYNC_URL
+
+    异步连接绑定在创建它的事件循环上，共享引擎应只在应用的主事件循环中使用。
+    """
+    # 异步驱动是可选依赖（sqlalchemy[asyncio]），只在使用时导入
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    config = load_db_config()
+    url = url or config["async_url"]
+
+    engine = _async_engines.get(url)
+    if engine is None:
+        with _engine_lock:
+            engine = _async_engines.get(url)
+            if engine is None:
+                engine = create_async_engine(url, **engine_options(config))
+                _async_engines[url] = engine
+                logger.info(f"创建异步数据库引擎: {engine.url!r}")
+
+    return engine
+
+
+def dispose_engines() -> None:
+    """关闭所有共享同步引擎的连接池（进程退出或 fork 之后调用）"""
+    with _engine_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+async def adispose_engines() -> None:
+    """关闭所有共享引擎（同步和异步）的连接池"""
+    with _engine_lock:
+        async_engines = list(_async_engines.values())
+        _async_engines.clear()
+    for engine in async_engines:
+        await engine.dispose()
+    dispose_engines()
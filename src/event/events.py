@@ -7,10 +7,48 @@ from re import S
 from typing import Dict, Any, List, Optional
 import uuid
 import time
+import json
 from pydantic import BaseModel, Field, ConfigDict
 from ..tool.types import ToolCallResult
 
 
+def convert_choices_to_json(choices) -> str:
+    """将Choice数组对象转换为JSON字符串"""
+    try:
+        # 处理单个Choice对象的情况（向后兼容）
+        if not isinstance(choices, (list, tuple)):
+            choices = [choices]
+
+        # 转换每个Choice对象
+        choices_data = []
+        for choice in choices:
+            if hasattr(choice, "model_dump"):
+                choice_data = choice.model_dump(exclude_unset=True)
+            elif hasattr(choice, "__dict__"):
+                choice_data = {
+                    k: v for k, v in choice.__dict__.items() if v is not None
+                }
+            else:
+                choice_data = str(choice)
+            choices_data.append(choice_data)
+
+        return json.dumps(choices_data, ensure_ascii=False)
+    except Exception:
+        # 异常处理：尝试将每个元素转为基本格式
+        try:
+            fallback_data = []
+            if not isinstance(choices, (list, tuple)):
+                choices = [choices]
+            for choice in choices:
+                if hasattr(choice, "__dict__"):
+                    fallback_data.append(choice.__dict__)
+                else:
+                    fallback_data.append(str(choice))
+            return json.dumps(fallback_data, ensure_ascii=False)
+        except Exception:
+            return json.dumps([str(choices)], ensure_ascii=False)
+
+
 class EventType:
     """Event types for the app."""
 
@@ -54,3 +92,80 @@ class Event(BaseModel):
 
     def to_dict(self):
         return self.model_dump_json()
+
+
+class ChunkEvent:
+    """
+    Lightweight streaming chunk event (RESPONSE_CHUNK / TOOL_CALL).
+
+    Only the delta text and the raw choices are kept; the JSON ``content`` that a
+    full ``Event`` would carry is serialized lazily on first access, so chunks
+    that nobody inspects are never serialized.
+    """
+
+    __slots__ = (
+        "type", "event_id", "user_id", "session_id", "invocation_id",
+        "author", "timestamp", "model", "delta", "_choices", "_content",
+    )
+
+    def __init__(
+        self,
+        type: str,
+        event_id: str,
+        user_id: str,
+        session_id: str,
+        invocation_id: str,
+        author: str,
+        timestamp: float,
+        delta: str = "",
+        model: Optional[str] = None,
+        choices: Any = None,
+    ):
+        self.type = type
+        self.event_id = event_id
+        self.user_id = user_id
+        self.session_id = session_id
+        self.invocation_id = invocation_id
+        self.author = author
+        self.timestamp = timestamp
+        self.model = model
+        self.delta = delta
+        self._choices = choices
+        self._content: Optional[str] = None
+
+    @property
+    def content(self) -> str:
+        """JSON content compatible with ``Event.content``, built on first access"""
+        if self._content is None:
+            if self._choices is not None:
+                self._content = convert_choices_to_json(self._choices)
+            else:
+                # 合并后的 chunk 没有原始 choices，按单个 delta 的格式构造
+                self._content = json.dumps(
+                    [{"index": 0, "delta": {"role": "assistant", "content": self.delta}}],
+                    ensure_ascii=False,
+                )
+        return self._content
+
+    def to_event(self) -> Event:
+        """Materialize as a full ``Event``"""
+        return Event(
+            type=self.type,
+            event_id=self.event_id,
+            user_id=self.user_id,
+            session_id=self.session_id,
+            invocation_id=self.invocation_id,
+            author=self.author,
+            timestamp=self.timestamp,
+            content=self.content,
+            model=self.model,
+        )
+
+    def model_dump(self, **kwargs) -> Dict[str, Any]:
+        return self.to_event().model_dump(**kwargs)
+
+    def model_dump_json(self, **kwargs) -> str:
+        return self.to_event().model_dump_json(**kwargs)
+
+    def to_dict(self):
+        return self.model_dump_json()
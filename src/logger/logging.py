@@ -4,19 +4,38 @@ import os
 import json
 import sys
 import logging
+import threading
 import traceback
 from loguru import logger
 from pathlib import Path
 
 
 class LogConfig:
-    @staticmethod
-    def init_logger(project_root: str = None):
-        """初始化JSON格式日志配置
+    # 进程内只初始化一次：重复初始化会重建文件 sink（以及 enqueue 的写线程）
+    _initialized = False
+    _lock = threading.RLock()
+
+    @classmethod
+    def init_logger(cls, project_root: str = None, force: bool = False) -> bool:
+        """初始化JSON格式日志配置（幂等）
 
         Args:
             project_root: 项目根目录路径（用于生成相对路径）
+            force: 已初始化时是否重新初始化
+
+        Returns:
+            本次调用是否执行了初始化
         """
+        with cls._lock:
+            if cls._initialized and not force:
+                return False
+            cls._configure(project_root)
+            cls._initialized = True
+        logger.info("Logger init...")
+        return True
+
+    @staticmethod
+    def _configure(project_root: str = None):
         # 获取项目根目录（如果未指定则自动推断）
         if not project_root:
             project_root = str(Path(__file__).parent.parent.parent)
@@ -100,9 +119,8 @@ class LogConfig:
 
 
 try:
-    # 初始化日志
+    # 初始化日志，入口脚本中再次调用 init_logger 不会重复初始化
     LogConfig.init_logger()
-    logger.info("Logger init...")
 
 except Exception as e:
     logger.error(f"Failed init logger: {str(e)}")
@@ -1,94 +1,89 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import text
-import os
-import uuid
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 
+from ..config.config import load_memory_config
+from ..db.engine import get_engine
 from ..logger.logging import logger
+from ..session.mysql_service import fill_window, message_cursor, messages_page_params, messages_page_sql
 from ..utils.count_tokens import count_tokens
+from .summarizer import Summarizer, get_summarizer
 
-GENERIC_VIDEO_MESSAGE_ABSTRACT_SYSTEM_PROMPT = """你是一名专业助理，专门负责总结用户和Agent的对话。你的任务是将用户与视频剪辑处理Agent之间的交互历史转换为清晰、结构化的摘要，使视频剪辑Agent能够快速理解上下文并高效继续提供支持。
-
-请严格按照下方 JSON 格式输出摘要：
-
-{
-  "user_intent": "用户的主要需求与意图",
-  "key_issues": ["问题 1", "问题 2", "问题 3"],
-  "video_editing_services": ["相关视频剪辑服务 1", "相关视频剪辑服务 2"],
-  "video_editing_problems": [
-    {
-      "problem": "问题的详细描述",
-      "solution": "已提供的解决方案",
-      "status": "已解决 / 部分解决 / 未解决"
-    }
-  ],
-  "user_messages": ["用户消息 1", "用户消息 2"],
-  "key_responses":["关键回复 1", "关键回复 2"],
-  "pending_tasks": ["待办事项 1", "待办事项 2"],
-  "current_status": "当前处理状态",
-  "next_steps": "建议的下一步行动"
-}
-
-要求：
-1. **摘要控制在 3500 tokens 以内；**
-2. 保持客观，并保留上下文连续性，准确反映对话内容；
-3. 聚焦用户的核心需求与问题；
-4. 记录视频剪辑处理Agent提供的所有解决方案及其结果；
-5. 识别未解决的问题与需要跟进的事项；
-6. 确保摘要全面、清晰、易于理解。
-"""
-
-
-GENERIC_VIDEO_MESSAGE_ABSTRACT_PROMPT = """请分析以下对话，并严格按照系统提示中指定的 JSON 格式生成结构化摘要：
-
-对话历史：
-{message_history}
-
-请仔细分析对话内容，提取关键信息，并按要求的 JSON 格式输出摘要。"""
-
-def _summarize_messages(messages_content: list) -> str:
+# 会话摘要：摘要覆盖到水位线消息（watermark）为止，之后的消息保留原文
+GET_SUMMARY_SQL = text(
     """
-    调用 LLM 对消息内容进行摘要    # todo
+    SELECT summary, watermark_event_id, UNIX_TIMESTAMP(watermark_time) AS watermark_time, watermark_usage
+    FROM session_summaries
+    WHERE user_id = :user_id AND session_id = :session_id
     """
-    try:
-        from litellm import completion
-
-        # 设置环境变量（可以通过参数传入或从配置读取）
-        api_key = os.getenv("OPENAI_API_KEY", "sk-K5uhRfyp9FvdTRPXxtZ2fGVvQ9RJBkyNoeyhbmUtV4Lls14h")
-        base_url = os.getenv("OPENAI_BASE_URL", "https://api.zetatechs.com/v1")
-
-        os.environ["OPENAI_API_KEY"] = api_key
-        os.environ["OPENAI_BASE_URL"] = base_url
-
-        # 构建消息内容
-        content_parts = []
-        for msg in messages_content:
-            role = msg.get("role", "user")
-            content = msg.get("content", "")
-            content_parts.append(f"{role}: {content}")
-
-        combined_content = "\n".join(content_parts)
-
-        response = completion(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": GENERIC_VIDEO_MESSAGE_ABSTRACT_SYSTEM_PROMPT},
-                {"role": "user", "content": GENERIC_VIDEO_MESSAGE_ABSTRACT_PROMPT.format(message_history=combined_content)}
-            ],
-        )
+)
+
+UPSERT_SUMMARY_SQL = text(
+    """
+    INSERT INTO session_summaries
+    (session_id, user_id, summary, watermark_event_id, watermark_time, watermark_usage, token_usage)
+    VALUES (:session_id, :user_id, :summary, :watermark_event_id, FROM_UNIXTIME(:watermark_time),
+        :watermark_usage, :token_usage)
+    ON DUPLICATE KEY UPDATE
+        summary = VALUES(summary),
+        watermark_event_id = VALUES(watermark_event_id),
+        watermark_time = VALUES(watermark_time),
+        watermark_usage = VALUES(watermark_usage),
+        token_usage = VALUES(token_usage)
+    """
+)
 
-        summary = response.choices[0].message.content
-        return summary if summary else ""
+# 水位线之后的累计token使用量
+UNCOMPACTED_USAGE_SQL = text(
+    """
+    SELECT s.accumulated_usage - COALESCE(ss.watermark_usage, 0) AS uncompacted_usage
+    FROM sessions s
+    LEFT JOIN session_summaries ss ON ss.session_id = s.session_id
+    WHERE s.user_id = :user_id AND s.session_id = :session_id
+    """
+)
+
+# 摘要以 assistant 消息的形式放在历史消息最前面
+ABSTRACT_PREFIX = "[abstract]"
+
+
+def split_for_compaction(
+    messages: List[Dict[str, Any]], keep_recent_tokens: int
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    将水位线之后的消息分为需要摘要的较早部分和保留原文的最近部分
+
+    最近部分的 token 总量不超过 keep_recent_tokens，并且从用户消息开始，
+    不会把一轮问答拆到摘要和原文两边。
+    """
+    recent: List[Dict[str, Any]] = []
+    fill_window(recent, list(reversed(messages)), keep_recent_tokens)
+    split = len(messages) - len(recent)
+    while split < len(messages) and messages[split]["role"] != "user":
+        split += 1
+    return messages[:split], messages[split:]
 
-    except Exception as e:
-        logger.error(f"LLM 摘要生成失败: {e}")
-        raise e
 
 class MySQLAbstractor:
-    def __init__(self, db_url: str, **kwargs):
+    def __init__(self, db_url: Optional[str] = None, engine=None, summarizer: Optional[Summarizer] = None, **kwargs):
         """
         初始化MySQL会话服务
+
+        未传入 db_url 和 engine 时使用进程共享的引擎（见 src.db.engine），
+        未传入 summarizer 时使用全局的摘要生成器
         """
+        self.summarizer = summarizer
+        # session_id -> 正在执行的后台压缩任务
+        self._compactions: Dict[str, asyncio.Task] = {}
+        self._owns_engine = engine is None and db_url is not None
+        if not self._owns_engine:
+            self.engine = engine if engine is not None else get_engine()
+            self.SessionLocal = sessionmaker(bind=self.engine)
+            return
+
         try:
             self.engine = create_engine(db_url, **kwargs)
             self.SessionLocal = sessionmaker(bind=self.engine)
@@ -101,115 +96,207 @@ class MySQLAbstractor:
             logger.error(f"MySQL连接失败: {e}")
             raise e
     
-    def check_threshold(self,user_id: str, session_id: str, threshold: int=40) -> bool:
+    def get_summary(self, user_id: str, session_id: str) -> Optional[Dict[str, Any]]:
         """
-        检查用户会话的累计token使用量是否超过阈值
+        获取会话的摘要，没有摘要时返回 None
+
+        返回的 watermark 是摘要覆盖的最后一条消息的分页游标
         """
-        try:
-            with self.SessionLocal() as db_session:
-                query_sql = text(
-                    """
-                    SELECT MAX(accumulated_usage) AS accumulated_usage
-                    FROM messages
-                    WHERE user_id = :user_id AND session_id = :session_id
-                """
-                )
-                result = db_session.execute(query_sql, {"user_id": user_id, "session_id": session_id})
-                row = result.fetchone()
-                accumulated_usage = row.accumulated_usage if row and row.accumulated_usage else 0
-                return accumulated_usage > threshold
-        except Exception as e:
-            logger.error(f"检查用户会话的累计token使用量是否超过阈值失败: {e}")
-            raise e
-    
-    def update_with_abstract(self, user_id: str, session_id: str) -> str:
+        with self.SessionLocal() as db_session:
+            row = db_session.execute(
+                GET_SUMMARY_SQL, {"user_id": user_id, "session_id": session_id}
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "summary": row.summary,
+            "watermark": message_cursor({"timestamp": row.watermark_time, "event_id": row.watermark_event_id}),
+            "watermark_usage": row.watermark_usage,
+        }
+
+    def _messages_after(self, user_id: str, session_id: str, cursor: Optional[str]) -> List[Dict[str, Any]]:
+        """按时间正序读取游标之后的全部消息"""
+        page_size = load_memory_config()["page_size"]
+        messages: List[Dict[str, Any]] = []
+        with self.SessionLocal() as db_session:
+            while True:
+                rows = db_session.execute(
+                    messages_page_sql(cursor),
+                    messages_page_params(user_id, session_id, page_size, cursor),
+                ).mappings().all()
+                messages.extend(dict(row) for row in rows)
+                if len(rows) < page_size:
+                    return messages
+                cursor = message_cursor(rows[-1])
+
+    def _recent_messages_after(
+        self, user_id: str, session_id: str, cursor: Optional[str], max_tokens: int
+    ) -> List[Dict[str, Any]]:
         """
-        对会话消息进行摘要并更新数据库
+        从最新的消息往前按页读取游标之后的消息，token 总量达到 max_tokens 时停止，
+        返回按时间正序的消息
+        """
+        page_size = load_memory_config()["page_size"]
+        bound = None
+        if cursor is not None:
+            bound_time, bound_id = cursor.split("|", 1)
+            bound = (float(bound_time), bound_id)
+
+        window: List[Dict[str, Any]] = []
+        page_cursor = None
+        with self.SessionLocal() as db_session:
+            while True:
+                rows = db_session.execute(
+                    messages_page_sql(page_cursor, descending=True),
+                    messages_page_params(user_id, session_id, page_size, page_cursor),
+                ).mappings().all()
+                messages = [dict(row) for row in rows]
+                # 读到水位线即停止，水位线之前的消息已包含在摘要中
+                if bound is not None:
+                    messages = [m for m in messages if (float(m["timestamp"]), m["event_id"]) > bound]
+                if fill_window(window, messages, max_tokens) or len(messages) < page_size:
+                    break
+                page_cursor = message_cursor(rows[-1])
 
-        1. 根据 user_id, session_id 从 messages 表查询所有记录
-        2. 将内容发送给 LLM 生成摘要
-        3. 删除原有记录，插入新的摘要记录
+        window.reverse()
+        return window
 
-        返回: 生成的摘要内容
+    def load_history(
+        self, user_id: str, session_id: str, max_tokens: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """
-        try:
-            with self.SessionLocal() as db_session:
-                # 1. 查询所有消息记录
-                query_sql = text(
-                    """
-                    SELECT role, content
-                    FROM messages
-                    WHERE user_id = :user_id AND session_id = :session_id
-                    ORDER BY created_at ASC
-                """
-                )
-                result = db_session.execute(
-                    query_sql,
-                    {"user_id": user_id, "session_id": session_id}
-                )
-                rows = result.fetchall()
-
-                if not rows:
-                    logger.info(f"[{user_id}] [{session_id}] 没有消息记录需要摘要")
-                    return ""
-
-                # 转换为字典列表
-                messages_content = [{"role": row.role, "content": row.content} for row in rows]
-
-                # 调用 LLM 生成摘要
-                summary = _summarize_messages(messages_content)
-                # summary = "test abstract summary"
-
-                # 删除原有消息记录
-                delete_sql = text(
-                    """
-                    DELETE FROM messages
-                    WHERE user_id = :user_id AND session_id = :session_id
-                """
-                )
-                db_session.execute(
-                    delete_sql,
-                    {"user_id": user_id, "session_id": session_id}
-                )
-
-                # 插入新的摘要记录
-                abstract_event_id = f"abstract_{uuid.uuid4().hex[:16]}"
-                insert_sql = text(
-                    """
-                    INSERT INTO messages
-                    (event_id, user_id, session_id, role, content, created_at, token_usage, accumulated_usage)
-                    VALUES (:event_id, :user_id, :session_id, :role, :content, NOW(), :token_usage, :accumulated_usage)
-                """
-                )
-
-                db_session.execute(
-                    insert_sql,
-                    {
-                        "event_id": abstract_event_id,
-                        "user_id": user_id,
-                        "session_id": session_id,
-                        "role": "assistant",  # 摘要作为 assistant 的消息
-                        "content": "[abstract]" + summary,
-                        "token_usage": count_tokens(summary),  # 简单使用字符数作为 token 估计
-                        "accumulated_usage": count_tokens(summary),
-                    }
-                )
-                db_session.commit()
-
-                logger.info(
-                    f"[{user_id}] [{session_id}] 消息摘要更新成功，"
-                    f"原始记录数: {len(rows)}, 摘要长度: {len(summary)}"
-                )
-                return summary
+        加载对话历史：摘要 + 水位线之后的消息
+
+        Args:
+            max_tokens: 水位线之后的消息超过该 token 数时只保留最近的部分（压缩未完成时），
+                默认 SESSION_HISTORY_MAX_TOKENS，0 表示不限制
+        """
+        summary = self.get_summary(user_id, session_id)
+        watermark = summary["watermark"] if summary else None
+
+        if max_tokens is None:
+            max_tokens = load_memory_config()["history_max_tokens"]
+        if max_tokens:
+            messages = self._recent_messages_after(user_id, session_id, watermark, max_tokens)
+        else:
+            messages = self._messages_after(user_id, session_id, watermark)
+
+        if summary is None:
+            return messages
+        return [{"role": "assistant", "content": ABSTRACT_PREFIX + summary["summary"]}] + messages
 
+    async def aload_history(
+        self, user_id: str, session_id: str, max_tokens: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """load_history 的异步版本（在线程池中执行）"""
+        return await asyncio.to_thread(self.load_history, user_id, session_id, max_tokens)
+
+    def uncompacted_usage(self, user_id: str, session_id: str) -> int:
+        """水位线之后的累计token使用量"""
+        with self.SessionLocal() as db_session:
+            row = db_session.execute(
+                UNCOMPACTED_USAGE_SQL, {"user_id": user_id, "session_id": session_id}
+            ).fetchone()
+        return int(row.uncompacted_usage or 0) if row else 0
+
+    def _save_summary(self, user_id: str, session_id: str, summary: str, watermark: Dict[str, Any]) -> None:
+        with self.SessionLocal() as db_session:
+            db_session.execute(
+                UPSERT_SUMMARY_SQL,
+                {
+                    "session_id": session_id,
+                    "user_id": user_id,
+                    "summary": summary,
+                    "watermark_event_id": watermark["event_id"],
+                    "watermark_time": watermark["timestamp"],
+                    "watermark_usage": watermark["accumulated_usage"],
+                    "token_usage": count_tokens(summary),
+                },
+            )
+            db_session.commit()
+
+    async def acompact(self, user_id: str, session_id: str) -> Optional[str]:
+        """
+        压缩会话历史：将上次摘要和水位线之后较早的消息合并为新的摘要，并推进水位线
+
+        原始消息不删除，最近 MEMORY_KEEP_RECENT_TOKENS 以内的消息保留原文。
+
+        Returns:
+            新的摘要，没有需要压缩的消息时返回 None
+        """
+        summary = await asyncio.to_thread(self.get_summary, user_id, session_id)
+        messages = await asyncio.to_thread(
+            self._messages_after, user_id, session_id, summary["watermark"] if summary else None
+        )
+        span, _ = split_for_compaction(messages, load_memory_config()["keep_recent_tokens"])
+        if not span:
+            return None
+
+        # 增量摘要：上次的摘要作为最早的一条消息参与本次摘要
+        messages_content = [{"role": message["role"], "content": message["content"]} for message in span]
+        if summary is not None:
+            messages_content.insert(0, {"role": "assistant", "content": ABSTRACT_PREFIX + summary["summary"]})
+
+        # LLM 调用期间不占用数据库连接；同一会话同一消息区间的并发压缩只调用一次模型，
+        # 区间不同（如水位线之后又有新消息）时各自生成摘要，避免以较短区间的摘要推进更远的水位线
+        summarizer = self.summarizer or get_summarizer()
+        key = (session_id, span[0]["event_id"], span[-1]["event_id"])
+        new_summary = await summarizer.asummarize(messages_content, key=key)
+        await asyncio.to_thread(self._save_summary, user_id, session_id, new_summary, span[-1])
+
+        logger.info(
+            f"[{user_id}] [{session_id}] 会话历史压缩成功，摘要消息数: {len(span)}, "
+            f"水位线: {span[-1]['event_id']}, 摘要长度: {len(new_summary)}"
+        )
+        return new_summary
+
+    async def _compact_if_needed(self, user_id: str, session_id: str) -> None:
+        try:
+            usage = await asyncio.to_thread(self.uncompacted_usage, user_id, session_id)
+            if usage > load_memory_config()["compaction_threshold"]:
+                await self.acompact(user_id, session_id)
         except Exception as e:
-            logger.error(f"[{user_id}] [{session_id}] 消息摘要更新失败: {e}")
-            raise e
-    
+            logger.error(f"[{user_id}] [{session_id}] 会话历史压缩失败: {e}")
+        finally:
+            self._compactions.pop(session_id, None)
+
+    def schedule_compaction(self, user_id: str, session_id: str) -> asyncio.Task:
+        """
+        在后台检查并压缩会话历史，不阻塞当前对话
+
+        同一会话已有压缩任务在执行时返回该任务，不重复压缩。
+        """
+        task = self._compactions.get(session_id)
+        if task is None or task.done():
+            task = asyncio.get_running_loop().create_task(self._compact_if_needed(user_id, session_id))
+            self._compactions[session_id] = task
+        return task
+
+    async def wait_for_compactions(self) -> None:
+        """等待所有后台压缩任务完成（进程退出前调用）"""
+        if self._compactions:
+            await asyncio.gather(*self._compactions.values(), return_exceptions=True)
+
     def close(self):
         """
         关闭数据库连接
         """
-        if hasattr(self, "engine"):
+        if getattr(self, "_owns_engine", False):
             self.engine.dispose()
             logger.info("MySQL connection closed")
+
+
+_mysql_abstractor: Optional[MySQLAbstractor] = None
+_abstractor_lock = threading.RLock()
+
+
+def get_mysql_abstractor() -> MySQLAbstractor:
+    """获取全局唯一的会话摘要服务实例（使用进程共享的数据库引擎）"""
+    global _mysql_abstractor
+
+    if _mysql_abstractor is None:
+        with _abstractor_lock:
+            if _mysql_abstractor is None:
+                _mysql_abstractor = MySQLAbstractor()
+
+    return _mysql_abstractor
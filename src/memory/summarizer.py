@@ -0,0 +1,205 @@
+"""
+会话摘要服务
+
+摘要使用单独配置的模型（MEMORY_SUMMARY_MODEL，默认较便宜、较快的模型），通过进程共享的
+LLM client 异步调用，不阻塞事件循环，也不再修改 os.environ。同一会话并发触发的摘要请求
+合并为一次调用。MEMORY_SUMMARY_MODEL=local 时使用本地抽取式摘要，不访问网络（用于测试）。
+"""
+
+import asyncio
+import json
+import threading
+from typing import Any, Dict, Hashable, List, Optional
+
+from ..config.config import load_summarizer_config
+from ..logger.logging import logger
+from ..model.llm.client import get_llm_client
+
+# 本地摘要模型的名称
+LOCAL_MODEL = "local"
+
+GENERIC_VIDEO_MESSAGE_ABSTRACT_SYSTEM_PROMPT = """你是一名专业助理，专门负责总结用户和Agent的对话。你的任务是将用户与视频剪辑处理Agent之间的交互历史转换为清晰、结构化的摘要，使视频剪辑Agent能够快速理解上下文并高效继续提供支持。
+
+请严格按照下方 JSON 格式输出摘要：
+
+{
+  "user_intent": "用户的主要需求与意图",
+  "key_issues": ["问题 1", "问题 2", "问题 3"],
+  "video_editing_services": ["相关视频剪辑服务 1", "相关视频剪辑服务 2"],
+  "video_editing_problems": [
+    {
+      "problem": "问题的详细描述",
+      "solution": "已提供的解决方案",
+      "status": "已解决 / 部分解决 / 未解决"
+    }
+  ],
+  "user_messages": ["用户消息 1", "用户消息 2"],
+  "key_responses":["关键回复 1", "关键回复 2"],
+  "pending_tasks": ["待办事项 1", "待办事项 2"],
+  "current_status": "当前处理状态",
+  "next_steps": "建议的下一步行动"
+}
+
+要求：
+1. **摘要控制在 3500 tokens 以内；**
+2. 保持客观，并保留上下文连续性，准确反映对话内容；
+3. 聚焦用户的核心需求与问题；
+4. 记录视频剪辑处理Agent提供的所有解决方案及其结果；
+5. 识别未解决的问题与需要跟进的事项；
+6. 确保摘要全面、清晰、易于理解。
+"""
+
+
+GENERIC_VIDEO_MESSAGE_ABSTRACT_PROMPT = """请分析以下对话，并严格按照系统提示中指定的 JSON 格式生成结构化摘要：
+
+对话历史：
+{message_history}
+
+请仔细分析对话内容，提取关键信息，并按要求的 JSON 格式输出摘要。"""
+
+
+def format_history(messages_content: List[Dict[str, Any]]) -> str:
+    """将消息拼接为 "role: content" 形式的对话历史"""
+    return "\n".join(f"{msg.get('role', 'user')}: {msg.get('content', '')}" for msg in messages_content)
+
+
+def build_summary_messages(messages_content: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": GENERIC_VIDEO_MESSAGE_ABSTRACT_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": GENERIC_VIDEO_MESSAGE_ABSTRACT_PROMPT.format(message_history=format_history(messages_content)),
+        },
+    ]
+
+
+def local_summary(messages_content: List[Dict[str, Any]], max_chars: int = 200) -> str:
+    """
+    本地抽取式摘要：按系统提示中的 JSON 格式截取用户消息和回复，结果只取决于输入
+    """
+    def clip(text: str) -> str:
+        return text if len(text) <= max_chars else text[:max_chars] + "..."
+
+    user_messages = [clip(msg.get("content") or "") for msg in messages_content if msg.get("role") == "user"]
+    responses = [clip(msg.get("content") or "") for msg in messages_content if msg.get("role") != "user"]
+    return json.dumps(
+        {
+            "user_intent": user_messages[0] if user_messages else "",
+            "key_issues": [],
+            "video_editing_services": [],
+            "video_editing_problems": [],
+            "user_messages": user_messages,
+            "key_responses": responses,
+            "pending_tasks": [],
+            "current_status": responses[-1] if responses else "",
+            "next_steps": "",
+        },
+        ensure_ascii=False,
+    )
+
+
+class Summarizer:
+    """对话摘要生成器"""
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        api_base: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Args:
+            model: litellm 模型名称或 "local"，默认 MEMORY_SUMMARY_MODEL
+            api_base: API 地址，默认 MEMORY_SUMMARY_API_BASE
+            max_tokens: 摘要的最大输出 token 数，默认 MEMORY_SUMMARY_MAX_TOKENS
+            timeout: 请求超时（秒），默认 MEMORY_SUMMARY_TIMEOUT
+        """
+        config = load_summarizer_config()
+        self.model = model or config["model"]
+        self.api_base = api_base or config["api_base"]
+        self.max_tokens = max_tokens or config["max_tokens"]
+        self.timeout = timeout or config["timeout"]
+        # 合并键 -> 正在执行的摘要任务
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def asummarize(self, messages_content: List[Dict[str, Any]], key: Optional[Hashable] = None) -> str:
+        """
+        生成摘要
+
+        Args:
+            messages_content: [{"role": ..., "content": ...}] 形式的消息
+            key: 合并键，同一个键已有摘要在执行时等待并返回其结果；
+                键需要能确定消息内容（如会话 + 消息区间的首尾 event_id），只用 session_id
+                会让内容不同的请求拿到别人的摘要
+
+        Raises:
+            Exception: LLM 调用失败时抛出异常
+        """
+        if key is None:
+            return await self._asummarize(messages_content)
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._asummarize(messages_content))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.debug(f"[{key}] 合并重复的摘要请求")
+        # 调用方被取消时不取消共享的摘要任务
+        return await asyncio.shield(task)
+
+    async def _asummarize(self, messages_content: List[Dict[str, Any]]) -> str:
+        if self.model == LOCAL_MODEL:
+            return local_summary(messages_content)
+
+        try:
+            response = await get_llm_client(self.model, self.api_base).acompletion(
+                messages=build_summary_messages(messages_content),
+                max_tokens=self.max_tokens,
+                timeout=self.timeout,
+            )
+        except Exception as e:
+            logger.error(f"LLM 摘要生成失败: {e}")
+            raise e
+
+        summary = response.choices[0].message.content
+        return summary if summary else ""
+
+    def summarize(self, messages_content: List[Dict[str, Any]]) -> str:
+        """同步生成摘要（供同步代码使用，不做请求合并）"""
+        if self.model == LOCAL_MODEL:
+            return local_summary(messages_content)
+
+        from litellm import completion
+
+        try:
+            response = completion(
+                model=self.model,
+                messages=build_summary_messages(messages_content),
+                api_base=self.api_base,
+                max_tokens=self.max_tokens,
+                timeout=self.timeout,
+            )
+        except Exception as e:
+            logger.error(f"LLM 摘要生成失败: {e}")
+            raise e
+
+        summary = response.choices[0].message.content
+        return summary if summary else ""
+
+
+_summarizer: Optional[Summarizer] = None
+_summarizer_lock = threading.RLock()
+
+
+def get_summarizer() -> Summarizer:
+    """获取全局唯一的摘要生成器"""
+    global _summarizer
+
+    if _summarizer is None:
+        with _summarizer_lock:
+            if _summarizer is None:
+                _summarizer = Summarizer()
+
+    return _summarizer
@@ -9,6 +9,19 @@ ASR (Automatic Speech Recognition) 统一接口模块
     results = asr.transcribe(['url1', 'url2'], language_hints=['zh'])
     text = asr.extract_text(results[0])
     
+    # 异步并发识别，按完成顺序返回
+    async for result in asr.atranscribe_iter(['url1', 'url2']):
+        print(result['index'], asr.extract_text(result))
+    
+    # 本地提取音轨并裁剪静音后再识别，时间戳对应原始媒体
+    results = await asr.atranscribe_media(['/data/video.mp4'])
+    
+    # 长媒体在静音处分段并发识别，拼接后的句子时间戳对应原始媒体
+    result = await asr.atranscribe_chunked('/data/long_video.mp4')
+    
+    # 重复识别同一段音频时直接返回缓存结果，命中统计：
+    get_asr_result_cache().metrics()
+    
     # 或显式指定provider
     asr = ASR(provider='funasr')
     asr = ASR(provider='bytedance')
@@ -32,7 +45,9 @@ import os
 import logging
 from typing import Optional
 
-from .base_asr import BaseASR
+from .base_asr import BaseASR, ASRJob
+from .job_engine import ASRJobEngine, get_asr_job_engine
+from .result_cache import ASRResultCache, get_asr_result_cache
 from .fun_asr import FunASR
 from .bytedance_llm_asr import ByteDanceASR
 from .qwen_asr import QwenASR
@@ -98,6 +113,11 @@ def ASR(provider: Optional[str] = None, **kwargs) -> BaseASR:
 __all__ = [
     'ASR',
     'BaseASR',
+    'ASRJob',
+    'ASRJobEngine',
+    'get_asr_job_engine',
+    'ASRResultCache',
+    'get_asr_result_cache',
     'FunASR',
     'ByteDanceASR',
     'QwenASR',
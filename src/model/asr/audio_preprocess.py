@@ -0,0 +1,415 @@
+"""
+ASR 音频预处理
+
+在提交 ASR 之前，先在本地用 ffmpeg 从媒体中提取单声道 16kHz Opus 音轨，
+并裁掉首尾和较长的中间静音，只上传裁剪后的小文件。裁剪时记录时间映射，
+识别结果中的时间戳（begin_time / start_time / end_time）会被映射回原始媒体的时间。
+
+使用示例:
+    asr = ASR(provider='qwen')
+    results = await transcribe_media(asr, ['/data/video.mp4'], language_hints=['zh'])
+"""
+
+import os
+import re
+import bisect
+import shutil
+import asyncio
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from ...config.config import load_audio_preprocess_config
+from ...utils.ffmpeg import FFmpegError, ffmpeg_available, run_ffmpeg
+from .base_asr import BaseASR, ASRResult
+
+
+logger = logging.getLogger(__name__)
+
+_SILENCE_START_RE = re.compile(r"silence_start:\s*(-?[\d.]+)")
+_SILENCE_END_RE = re.compile(r"silence_end:\s*([\d.]+)")
+_PROGRESS_TIME_RE = re.compile(r"time=(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+# 识别结果中需要映射的时间戳字段（毫秒）
+_START_KEYS = ("begin_time", "start_time")
+_END_KEYS = ("end_time",)
+
+
+class TimestampMap:
+    """裁剪后音频时间 -> 原始媒体时间的映射"""
+
+    def __init__(self, segments: List[Tuple[float, float]]):
+        """
+        Args:
+            segments: 保留的原始时间区间 [(start, end), ...]（秒），按时间顺序且互不重叠
+        """
+        self.segments = segments
+        # 每个区间在裁剪后音频中的起始时间（秒）
+        self.offsets = []
+        offset = 0.0
+        for start, end in segments:
+            self.offsets.append(offset)
+            offset += end - start
+        self.duration = offset
+
+    @classmethod
+    def identity(cls, duration: float) -> "TimestampMap":
+        return cls([(0.0, duration)])
+
+    def to_source(self, t: float, is_end: bool = False) -> float:
+        """将裁剪后音频的时间（秒）映射为原始时间；区间边界上的结束时间映射到前一区间的末尾"""
+        if not self.segments:
+            return t
+        # 容差避免浮点误差把边界上的时间分到错误的区间
+        if is_end:
+            index = bisect.bisect_left(self.offsets, t - 1e-6) - 1
+        else:
+            index = bisect.bisect_right(self.offsets, t + 1e-6) - 1
+        index = max(0, min(index, len(self.segments) - 1))
+        start, end = self.segments[index]
+        source_t = start + t - self.offsets[index]
+        return source_t if index == len(self.segments) - 1 else min(source_t, end)
+
+    def remap(self, data: Any) -> Any:
+        """
+        递归映射识别结果中的毫秒时间戳字段
+
+        返回映射后的副本，不修改传入的结果（它可能同时保存在识别结果缓存中）
+        """
+        if isinstance(data, dict):
+            remapped = {}
+            for key, value in data.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and key in _START_KEYS + _END_KEYS:
+                    remapped[key] = int(round(self.to_source(value / 1000, is_end=key in _END_KEYS) * 1000))
+                else:
+                    remapped[key] = self.remap(value)
+            return remapped
+        if isinstance(data, list):
+            return [self.remap(item) for item in data]
+        return data
+
+
+class PreparedAudio:
+    """预处理后的音频"""
+
+    def __init__(self, source: str, file_url: str, timestamp_map: TimestampMap,
+                 source_duration: float, workdir: Optional[str] = None):
+        self.source = source
+        self.file_url = file_url
+        self.timestamp_map = timestamp_map
+        self.source_duration = source_duration
+        self.workdir = workdir
+
+    @property
+    def kept_duration(self) -> float:
+        return self.timestamp_map.duration
+
+    def cleanup(self) -> None:
+        if self.workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class AudioPreprocessor:
+    """基于 ffmpeg 的音轨提取与静音裁剪"""
+
+    def __init__(self,
+                 silence_db: float = -35,
+                 min_silence: float = 1.0,
+                 padding: float = 0.2,
+                 bitrate: str = "24k",
+                 timeout: float = 600,
+                 concurrency: int = 2,
+                 upload_concurrency: int = 4):
+        """
+        Args:
+            silence_db: 低于该音量（dB）视为静音
+            min_silence: 超过该时长（秒）的静音才会被裁掉
+            padding: 每段保留音频两侧额外保留的静音（秒），避免切掉字头字尾
+            bitrate: Opus 码率
+            timeout: 单次 ffmpeg 超时（秒）
+            concurrency: 同时运行的 ffmpeg 进程数
+            upload_concurrency: 同时进行的音频上传数
+        """
+        self.silence_db = silence_db
+        self.min_silence = min_silence
+        self.padding = padding
+        self.bitrate = bitrate
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.upload_concurrency = upload_concurrency
+        # 信号量属于创建它的事件循环，事件循环变化时重建
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ffmpeg_semaphore: Optional[asyncio.Semaphore] = None
+        self._upload_semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+
+    def _semaphores(self) -> Tuple[asyncio.Semaphore, asyncio.Semaphore]:
+        """获取当前事件循环中的 (ffmpeg 信号量, 上传信号量)"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._loop is not loop:
+                self._loop = loop
+                self._ffmpeg_semaphore = asyncio.Semaphore(self.concurrency)
+                self._upload_semaphore = asyncio.Semaphore(self.upload_concurrency)
+            return self._ffmpeg_semaphore, self._upload_semaphore
+
+    async def _run_ffmpeg(self, args: List[str]) -> Tuple[int, str]:
+        """在并发上限内运行 ffmpeg，ffmpeg 为 CPU 密集型，大量媒体同时处理时排队执行"""
+        semaphore, _ = self._semaphores()
+        async with semaphore:
+            return await run_ffmpeg(args, timeout=self.timeout)
+
+    def _encode_args(self) -> List[str]:
+        # bitexact：ogg 封装默认使用随机的流序列号，相同输入每次输出的文件内容都不同，
+        # 上传去重和识别结果缓存（按内容哈希）就无法命中
+        return [
+            "-vn", "-ac", "1", "-ar", "16000", "-c:a", "libopus", "-b:a", self.bitrate, "-application", "voip",
+            "-fflags", "+bitexact", "-flags:a", "+bitexact",
+        ]
+
+    def keep_segments(self, silences: List[Tuple[float, float]], duration: float) -> List[Tuple[float, float]]:
+        """由静音区间计算需要保留的区间（两侧各留 padding）"""
+        segments = []
+        cursor = 0.0
+        for start, end in silences:
+            # 开头和结尾的静音整段裁掉，不保留 padding
+            seg_end = min(start + self.padding, duration) if start > 0 else 0.0
+            if seg_end > cursor:
+                segments.append((cursor, seg_end))
+            cursor = max(cursor, end - self.padding) if end < duration else duration
+        if cursor < duration:
+            segments.append((cursor, duration))
+        # 合并相接的区间
+        merged: List[Tuple[float, float]] = []
+        for start, end in segments:
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+            elif end > start:
+                merged.append((start, end))
+        return merged
+
+    @staticmethod
+    def _check(returncode: int, stderr: str) -> None:
+        if returncode != 0:
+            raise FFmpegError(stderr.strip().splitlines()[-1] if stderr.strip() else f"exit code {returncode}")
+
+    @staticmethod
+    def _parse_silences(stderr: str, source: str) -> Tuple[List[Tuple[float, float]], float]:
+        """从 silencedetect 输出中解析 (静音区间列表, 音频时长)"""
+        # 以处理进度中最后的 time= 作为音频时长
+        times = _PROGRESS_TIME_RE.findall(stderr)
+        if not times:
+            raise FFmpegError(f"Cannot read audio duration: {source}")
+        hours, minutes, seconds = times[-1]
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+        starts = [max(0.0, float(v)) for v in _SILENCE_START_RE.findall(stderr)]
+        ends = [float(v) for v in _SILENCE_END_RE.findall(stderr)]
+        # 结尾的静音没有 silence_end
+        ends += [duration] * (len(starts) - len(ends))
+        return list(zip(starts, ends)), duration
+
+    async def extract(self, source: str, workdir: str) -> Tuple[str, List[Tuple[float, float]], float]:
+        """
+        一次解码完成音轨提取和静音检测
+
+        Returns:
+            (完整音轨路径, 静音区间列表, 音频时长秒数)
+        """
+        full_path = os.path.join(workdir, "full.ogg")
+        returncode, stderr = await self._run_ffmpeg(
+            [
+                "-i", source,
+                "-af", f"silencedetect=noise={self.silence_db}dB:d={self.min_silence}",
+                *self._encode_args(),
+                "-y", full_path,
+            ],
+        )
+        self._check(returncode, stderr)
+        silences, duration = self._parse_silences(stderr, source)
+        return full_path, silences, duration
+
+    async def detect_silences(self, path: str, min_silence: float) -> Tuple[List[Tuple[float, float]], float]:
+        """
+        检测音频中长于 min_silence 秒的静音（不输出文件）
+
+        Returns:
+            (静音区间列表, 音频时长秒数)
+        """
+        returncode, stderr = await self._run_ffmpeg(
+            ["-i", path, "-af", f"silencedetect=noise={self.silence_db}dB:d={min_silence}", "-f", "null", "-"],
+        )
+        self._check(returncode, stderr)
+        return self._parse_silences(stderr, path)
+
+    async def cut(self, path: str, start: float, end: float, out_path: str) -> str:
+        """截取 [start, end) 秒的音频"""
+        returncode, stderr = await self._run_ffmpeg(
+            ["-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-i", path, *self._encode_args(), "-y", out_path],
+        )
+        self._check(returncode, stderr)
+        return out_path
+
+    async def trim(self, full_path: str, segments: List[Tuple[float, float]], workdir: str) -> str:
+        """只保留 segments 中的音频，拼接为新文件"""
+        trimmed_path = os.path.join(workdir, "trimmed.ogg")
+        select = "+".join(f"between(t\\,{start:.3f}\\,{end:.3f})" for start, end in segments)
+        returncode, stderr = await self._run_ffmpeg(
+            [
+                "-i", full_path,
+                "-af", f"aselect='{select}',asetpts=N/SR/TB",
+                *self._encode_args(),
+                "-y", trimmed_path,
+            ],
+        )
+        self._check(returncode, stderr)
+        return trimmed_path
+
+    async def prepare_local(self, source: str) -> Tuple[str, TimestampMap, float, str]:
+        """
+        提取并裁剪音频
+
+        Returns:
+            (本地音频路径, 时间映射, 原始时长, 临时目录)
+        """
+        workdir = tempfile.mkdtemp(prefix="asr_audio_")
+        try:
+            full_path, silences, duration = await self.extract(source, workdir)
+            segments = self.keep_segments(silences, duration)
+            if not segments:
+                raise FFmpegError(f"No audio above {self.silence_db}dB: {source}")
+
+            if len(segments) == 1 and segments[0] == (0.0, duration):
+                return full_path, TimestampMap.identity(duration), duration, workdir
+
+            trimmed_path = await self.trim(full_path, segments, workdir)
+            os.remove(full_path)
+            return trimmed_path, TimestampMap(segments), duration, workdir
+        except BaseException:
+            shutil.rmtree(workdir, ignore_errors=True)
+            raise
+
+    async def upload(self, local_path: str, folder: str = "asr_audio") -> str:
+        """
+        上传本地音频，返回可访问的 URL
+
+        Raises:
+            Exception: 上传失败时抛出异常
+        """
+        from ...tool.upload_to_tos import UploadToTOS
+
+        _, semaphore = self._semaphores()
+        async with semaphore:
+            result = await UploadToTOS().execute(local_path=local_path, introduction="上传 ASR 音频", folder=folder)
+        if not result.success:
+            raise Exception(f"音频上传失败: {result.error}")
+        return result.result["file_url"]
+
+    async def prepare(self, source: str, folder: str = "asr_audio") -> PreparedAudio:
+        """
+        预处理并上传音频
+
+        ffmpeg 不可用或处理失败时，URL 原样交给 ASR（本地文件则直接上传）。
+
+        Raises:
+            Exception: 上传失败时抛出异常
+        """
+        workdir = None
+        if ffmpeg_available():
+            try:
+                local_path, timestamp_map, duration, workdir = await self.prepare_local(source)
+                logger.info(
+                    f"音频预处理完成: {source}，原始 {duration:.1f}s，保留 {timestamp_map.duration:.1f}s，"
+                    f"大小 {os.path.getsize(local_path) / 1024:.0f}KB"
+                )
+            except FFmpegError as e:
+                logger.warning(f"音频预处理失败，使用原始媒体: {source}，错误: {e}")
+                local_path = None
+        else:
+            local_path = None
+
+        if local_path is None:
+            if source.startswith(("http://", "https://")):
+                return PreparedAudio(source, source, TimestampMap([]), 0.0)
+            local_path, timestamp_map, duration = source, TimestampMap([]), 0.0
+
+        try:
+            file_url = await self.upload(local_path, folder)
+        except BaseException:
+            if workdir:
+                shutil.rmtree(workdir, ignore_errors=True)
+            raise
+        return PreparedAudio(source, file_url, timestamp_map, duration, workdir)
+
+
+# 全局音频预处理器
+_audio_preprocessor: Optional[AudioPreprocessor] = None
+_preprocessor_lock = threading.RLock()
+
+
+def get_audio_preprocessor() -> AudioPreprocessor:
+    """获取全局唯一的音频预处理器"""
+    global _audio_preprocessor
+
+    if _audio_preprocessor is None:
+        with _preprocessor_lock:
+            if _audio_preprocessor is None:
+                config = load_audio_preprocess_config()
+                _audio_preprocessor = AudioPreprocessor(
+                    silence_db=config["silence_db"],
+                    min_silence=config["min_silence"],
+                    padding=config["padding"],
+                    bitrate=config["bitrate"],
+                    timeout=config["timeout"],
+                    concurrency=config["concurrency"],
+                    upload_concurrency=config["upload_concurrency"],
+                )
+
+    return _audio_preprocessor
+
+
+async def transcribe_media(asr: BaseASR,
+                           sources: Union[str, List[str]],
+                           language_hints: Optional[List[str]] = None,
+                           **kwargs) -> List[Dict[str, Any]]:
+    """
+    预处理媒体（本地路径或URL）后再识别，结果中的时间戳映射回原始媒体时间
+
+    Returns:
+        识别结果列表（与 sources 顺序一致），file_url 为原始媒体
+    """
+    if isinstance(sources, str):
+        sources = [sources]
+
+    preprocessor = get_audio_preprocessor()
+    prepared: List[Optional[PreparedAudio]] = []
+    errors: Dict[int, str] = {}
+    for index, outcome in enumerate(
+        await asyncio.gather(*[preprocessor.prepare(source) for source in sources], return_exceptions=True)
+    ):
+        if isinstance(outcome, BaseException):
+            errors[index] = str(outcome)
+            prepared.append(None)
+        else:
+            prepared.append(outcome)
+
+    try:
+        urls = [audio.file_url for audio in prepared if audio is not None]
+        transcribed = iter(await asr.atranscribe(urls, language_hints, **kwargs) if urls else [])
+
+        results = []
+        for index, audio in enumerate(prepared):
+            if audio is None:
+                results.append(ASRResult(sources[index], 'failed', error=errors[index]).to_dict())
+                continue
+            result = next(transcribed)
+            if result.get('status') == 'success':
+                result['transcription'] = audio.timestamp_map.remap(result.get('transcription'))
+            result['file_url'] = audio.source
+            results.append(result)
+        return results
+    finally:
+        for audio in prepared:
+            if audio is not None:
+                audio.cleanup()
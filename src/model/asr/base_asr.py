@@ -1,15 +1,32 @@
 """
 ASR (Automatic Speech Recognition) 基类定义
 定义了语音识别服务的通用接口
+
+各服务商实现 submit_job / poll_job 两个任务接口，批量识别由基类统一调度：
+- transcribe: 同步接口，先提交全部文件，再轮询所有未完成任务
+- atranscribe / atranscribe_iter: 异步接口，由 ASRJobEngine 并发提交和轮询，按完成顺序返回结果
+- atranscribe_media: 异步接口，先在本地提取并裁剪音轨再识别（见 audio_preprocess）
+
+transcribe / atranscribe / atranscribe_iter 会先查询识别结果缓存（见 result_cache），
+只有未命中的文件才会提交任务。
 """
 
+import time
+import asyncio
+import logging
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any, Union
+from typing import AsyncIterator, List, Optional, Dict, Any, Union
+
+from ...config.config import load_asr_config
 
+logger = logging.getLogger(__name__)
 
 class BaseASR(ABC):
     """语音识别服务基类"""
     
+    # 是否使用识别结果缓存，可按实例关闭
+    use_cache: bool = True
+    
     def __init__(self, *args, **kwargs):
         """
         初始化ASR实例
@@ -23,12 +40,48 @@ class BaseASR(ABC):
         pass
     
     @abstractmethod
+    def submit_job(self, file_url: str, **kwargs) -> "ASRJob":
+        """
+        提交单个文件的识别任务（不等待结果）
+        
+        Args:
+            file_url: 音频文件URL
+            **kwargs: 识别参数（已经过 job_kwargs 处理）
+            
+        Returns:
+            ASRJob: 任务句柄
+        """
+        pass
+    
+    @abstractmethod
+    def poll_job(self, job: "ASRJob") -> Optional[Dict[str, Any]]:
+        """
+        查询一次任务状态
+        
+        Args:
+            job: submit_job 返回的任务句柄
+            
+        Returns:
+            任务未完成时返回 None；完成后返回识别结果（格式同 transcribe 的列表元素）
+        """
+        pass
+    
+    def job_kwargs(self, language_hints: Optional[List[str]] = None, **kwargs) -> Dict[str, Any]:
+        """
+        将 transcribe 的参数转换为 submit_job 的参数，默认取第一个语言提示作为 language
+        """
+        if language_hints and 'language' not in kwargs:
+            kwargs['language'] = language_hints[0]
+        return kwargs
+    
     def transcribe(self, 
                   file_urls: Union[str, List[str]], 
                   language_hints: Optional[List[str]] = None,
                   **kwargs) -> List[Dict[str, Any]]:
         """
-        对音频文件进行语音识别
+        对音频文件进行语音识别（同步）
+        
+        先提交全部文件，再轮询所有未完成的任务，轮询间隔自适应退避
         
         Args:
             file_urls: 音频文件URL，可以是单个URL字符串或URL列表
@@ -36,9 +89,144 @@ class BaseASR(ABC):
             **kwargs: 其他参数
             
         Returns:
-            识别结果列表，每个元素包含文件URL和识别结果
+            识别结果列表（与 file_urls 顺序一致），每个元素包含文件URL和识别结果
         """
-        pass
+        if isinstance(file_urls, str):
+            file_urls = [file_urls]
+        job_kwargs = self.job_kwargs(language_hints, **kwargs)
+        
+        cache = self._result_cache()
+        if cache is None:
+            return self._transcribe_jobs(file_urls, job_kwargs)
+        
+        keys, results = cache.lookup(type(self).__name__, file_urls, job_kwargs)
+        missing = [index for index in range(len(file_urls)) if index not in results]
+        if missing:
+            transcribed = self._transcribe_jobs([file_urls[index] for index in missing], job_kwargs)
+            for index, result in zip(missing, transcribed):
+                cache.store(keys[index], result)
+                results[index] = result
+        return [results[index] for index in range(len(file_urls))]
+    
+    def _result_cache(self):
+        if not self.use_cache:
+            return None
+        from .result_cache import get_asr_result_cache
+        
+        return get_asr_result_cache()
+    
+    def _transcribe_jobs(self, file_urls: List[str], job_kwargs: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        提交全部文件后轮询所有未完成的任务，返回与 file_urls 顺序一致的结果
+        
+        查询出错时继续轮询，连续出错 max_poll_errors 次才判定任务失败（与 ASRJobEngine 一致）
+        """
+        config = load_asr_config()
+        
+        results: Dict[int, Dict[str, Any]] = {}
+        pending: List[ASRJob] = []
+        for index, file_url in enumerate(file_urls):
+            try:
+                job = self.submit_job(file_url, **job_kwargs)
+                job.index = index
+                pending.append(job)
+            except Exception as e:
+                results[index] = ASRResult(file_url, 'failed', error=str(e)).to_dict()
+        
+        interval = config["poll_initial_interval"]
+        errors: Dict[int, int] = {}
+        while pending:
+            time.sleep(interval)
+            for job in list(pending):
+                try:
+                    result = self.poll_job(job)
+                    errors[job.index] = 0
+                except Exception as e:
+                    errors[job.index] = errors.get(job.index, 0) + 1
+                    logger.warning(f"查询文件 {job.file_url} 出错 ({errors[job.index]}/{config['max_poll_errors']}): {str(e)}")
+                    if errors[job.index] >= config["max_poll_errors"]:
+                        result = ASRResult(job.file_url, 'failed', error=str(e)).to_dict()
+                    else:
+                        result = None
+                if result is None and config["job_timeout"] and job.elapsed > config["job_timeout"]:
+                    result = ASRResult(job.file_url, 'failed', error=f"识别超时（{config['job_timeout']}秒）").to_dict()
+                if result is not None:
+                    results[job.index] = result
+                    pending.remove(job)
+            interval = min(interval * config["poll_backoff"], config["poll_max_interval"])
+        
+        return [results[index] for index in range(len(file_urls))]
+    
+    async def atranscribe_iter(self,
+                              file_urls: Union[str, List[str]],
+                              language_hints: Optional[List[str]] = None,
+                              **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """
+        异步识别，所有文件并发提交和轮询，按完成顺序逐个返回结果
+        """
+        from .job_engine import get_asr_job_engine
+        
+        engine = get_asr_job_engine()
+        cache = self._result_cache()
+        if cache is None:
+            async for result in engine.transcribe_iter(self, file_urls, language_hints, **kwargs):
+                yield result
+            return
+        
+        if isinstance(file_urls, str):
+            file_urls = [file_urls]
+        job_kwargs = self.job_kwargs(language_hints, **kwargs)
+        # 本地文件需要计算哈希，放到线程中执行
+        keys, hits = await asyncio.to_thread(cache.lookup, type(self).__name__, file_urls, job_kwargs)
+        for index, result in hits.items():
+            yield {**result, 'index': index}
+        
+        missing = [index for index in range(len(file_urls)) if index not in hits]
+        if missing:
+            async for result in engine.transcribe_iter(self, [file_urls[index] for index in missing], language_hints, **kwargs):
+                index = missing[result['index']]
+                # 持久化缓存写入 SQLite，放到线程中执行
+                await asyncio.to_thread(cache.store, keys[index], result)
+                yield {**result, 'index': index}
+    
+    async def atranscribe(self,
+                         file_urls: Union[str, List[str]],
+                         language_hints: Optional[List[str]] = None,
+                         **kwargs) -> List[Dict[str, Any]]:
+        """
+        异步识别，返回与 file_urls 顺序一致的结果列表
+        """
+        if isinstance(file_urls, str):
+            file_urls = [file_urls]
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(file_urls)
+        async for result in self.atranscribe_iter(file_urls, language_hints, **kwargs):
+            index = result.pop('index')
+            results[index] = result
+        return results
+    
+    async def atranscribe_media(self,
+                               sources: Union[str, List[str]],
+                               language_hints: Optional[List[str]] = None,
+                               **kwargs) -> List[Dict[str, Any]]:
+        """
+        异步识别本地或远程媒体：先在本地提取音轨、裁掉静音并上传，识别结果的时间戳映射回原始媒体
+        """
+        from .audio_preprocess import transcribe_media
+        
+        return await transcribe_media(self, sources, language_hints, **kwargs)
+    
+    async def atranscribe_chunked(self,
+                                  source: str,
+                                  language_hints: Optional[List[str]] = None,
+                                  chunk_seconds: Optional[float] = None,
+                                  **kwargs) -> Dict[str, Any]:
+        """
+        异步识别长媒体：在静音处切分后各段并发识别，再拼接为 QwenASR 格式的句子列表
+        """
+        from .chunked import transcribe_chunked
+        
+        return await transcribe_chunked(self, source, language_hints, chunk_seconds, **kwargs)
     
     def extract_text(self, transcription_result: Dict[str, Any]) -> str:
         """
@@ -67,6 +255,30 @@ class BaseASR(ABC):
         return str(transcription)
 
 
+class ASRJob:
+    """已提交的识别任务句柄"""
+    
+    def __init__(self, file_url: str, job_id: str, **extra):
+        """
+        初始化任务句柄
+        
+        Args:
+            file_url: 音频文件URL
+            job_id: 服务商返回的任务ID
+            **extra: 查询和处理结果所需的其他信息（如 x_tt_logid、识别参数）
+        """
+        self.file_url = file_url
+        self.job_id = job_id
+        self.extra = extra
+        self.index = 0
+        self.submitted_at = time.monotonic()
+    
+    @property
+    def elapsed(self) -> float:
+        """提交后经过的秒数"""
+        return time.monotonic() - self.submitted_at
+
+
 class ASRResult:
     """ASR识别结果数据类"""
     
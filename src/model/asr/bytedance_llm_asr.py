@@ -8,14 +8,14 @@ ByteDanceASR - 字节跳动火山引擎语音识别服务封装
 """
 
 import json
-import time
 import uuid
 import requests
 import logging
 import os
 from typing import List, Optional, Dict, Any, Union
 
-from .base_asr import BaseASR, ASRResult
+from .base_asr import BaseASR, ASRJob, ASRResult
+from .http_client import get_http_session, get_timeout
 
 
 class ByteDanceASR(BaseASR):
@@ -115,7 +115,9 @@ class ByteDanceASR(BaseASR):
         request_data["request"].update(kwargs)
         
         self.logger.info(f"提交任务ID: {task_id}")
-        response = requests.post(self.submit_url, data=json.dumps(request_data), headers=headers)
+        response = get_http_session("bytedance").post(
+            self.submit_url, data=json.dumps(request_data), headers=headers, timeout=get_timeout()
+        )
         
         if 'X-Api-Status-Code' in response.headers and response.headers["X-Api-Status-Code"] == "20000000":
             x_tt_logid = response.headers.get("X-Tt-Logid", "")
@@ -146,7 +148,9 @@ class ByteDanceASR(BaseASR):
             "X-Tt-Logid": x_tt_logid
         }
         
-        response = requests.post(self.query_url, data=json.dumps({}), headers=headers)
+        response = get_http_session("bytedance").post(
+            self.query_url, data=json.dumps({}), headers=headers, timeout=get_timeout()
+        )
         
         if 'X-Api-Status-Code' in response.headers:
             self.logger.debug(f"查询任务状态 - Status: {response.headers['X-Api-Status-Code']}")
@@ -157,78 +161,48 @@ class ByteDanceASR(BaseASR):
             
         return response
     
-    def transcribe(self, 
-                  file_urls: Union[str, List[str]], 
-                  language_hints: Optional[List[str]] = None,
-                  **kwargs) -> List[Dict[str, Any]]:
+    def submit_job(self, file_url: str, **kwargs) -> ASRJob:
         """
-        对音频文件进行语音识别
+        提交单个文件的识别任务
         
         Args:
-            file_urls: 音频文件URL，可以是单个URL字符串或URL列表
-            language_hints: 语言提示列表，如 ['en-US'] 表示英语。为空时支持中英文、上海话、闽南语、四川话、陕西话、粤语识别
-            **kwargs: 其他参数，如enable_channel_split等
+            file_url: 音频文件URL
+            **kwargs: submit_task 的参数，如language、enable_channel_split等
             
         Returns:
-            识别结果列表，每个元素包含文件URL和识别结果
+            ASRJob: 任务句柄
+        """
+        task_id, x_tt_logid = self.submit_task(file_url, **kwargs)
+        return ASRJob(file_url, task_id, x_tt_logid=x_tt_logid, kwargs=kwargs)
+    
+    def poll_job(self, job: ASRJob) -> Optional[Dict[str, Any]]:
         """
-        # 统一处理为列表格式
-        if isinstance(file_urls, str):
-            file_urls = [file_urls]
+        查询一次任务状态
         
-        # 处理 language_hints 参数，取第一个语言提示
-        language = None
-        if language_hints and len(language_hints) > 0:
-            language = language_hints[0]
-            if 'language' not in kwargs:
-                kwargs['language'] = language
+        Args:
+            job: submit_job 返回的任务句柄
             
-        self.logger.info(f"开始识别 {len(file_urls)} 个音频文件")
+        Returns:
+            任务进行中返回 None，否则返回识别结果
+        """
+        file_url = job.file_url
+        query_response = self.query_task(job.job_id, job.extra["x_tt_logid"])
+        status_code = query_response.headers.get('X-Api-Status-Code', "")
         
-        results = []
-        for file_url in file_urls:
-            try:
-                # 提交识别任务
-                task_id, x_tt_logid = self.submit_task(file_url, **kwargs)
-                
-                # 轮询查询任务状态
-                while True:
-                    query_response = self.query_task(task_id, x_tt_logid)
-                    status_code = query_response.headers.get('X-Api-Status-Code', "")
-                    
-                    if status_code == '20000000':  # 任务完成
-                        result_data = query_response.json()
-                        # 处理和简化结果
-                        simplified_result = self._process_result(result_data, **kwargs)
-                        results.append({
-                            'file_url': file_url,
-                            'status': 'success',
-                            'transcription': simplified_result
-                        })
-                        self.logger.info(f"文件 {file_url} 识别成功")
-                        break
-                    elif status_code != '20000001' and status_code != '20000002':  # 任务失败
-                        error_data = query_response.json() if query_response.text else {}
-                        results.append({
-                            'file_url': file_url,
-                            'status': 'failed',
-                            'error': error_data
-                        })
-                        self.logger.error(f"文件 {file_url} 识别失败: {error_data}")
-                        break
-                    else:
-                        # 任务进行中，等待1秒后继续查询
-                        time.sleep(1)
-                        
-            except Exception as e:
-                results.append({
-                    'file_url': file_url,
-                    'status': 'failed',
-                    'error': str(e)
-                })
-                self.logger.error(f"处理文件 {file_url} 时出错: {str(e)}")
+        if status_code == '20000000':  # 任务完成
+            result_data = query_response.json()
+            # 处理和简化结果
+            simplified_result = self._process_result(result_data, **job.extra["kwargs"])
+            self.logger.info(f"文件 {file_url} 识别成功")
+            return ASRResult(file_url, 'success', transcription=simplified_result).to_dict()
+        
+        if status_code in ('20000001', '20000002'):  # 任务进行中
+            return None
         
-        return results
+        # 任务失败
+        error_data = query_response.json() if query_response.text else {}
+        self.logger.error(f"文件 {file_url} 识别失败: {error_data}")
+        return ASRResult(file_url, 'failed', error=error_data).to_dict()
     
     def _process_result(self, raw_result: Dict[str, Any], include_words: bool = False, **kwargs) -> Dict[str, Any]:
         """
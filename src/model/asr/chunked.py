@@ -0,0 +1,319 @@
+"""
+长音频分段并发识别
+
+整段长音频作为一个任务提交时，等待时间等于服务商处理整段音频的时间。
+这里先在本地提取并裁剪音轨（见 audio_preprocess），再在静音处把音频切成若干段，
+各段并发提交（可分摊到多个服务商），最后按分段偏移修正时间戳、去掉重叠区域中的
+重复句子，拼接为与 QwenASR._process_result 相同结构的结果。
+
+使用示例:
+    asr = ASR(provider='qwen')
+    result = await transcribe_chunked(asr, '/data/long_video.mp4', language_hints=['zh'])
+    sentences = result['transcription']['result']['sentences']
+"""
+
+import os
+import re
+import shutil
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from ...config.config import load_asr_chunk_config
+from ...utils.ffmpeg import FFmpegError, ffmpeg_available
+from .audio_preprocess import get_audio_preprocessor
+from .base_asr import BaseASR, ASRResult
+
+
+logger = logging.getLogger(__name__)
+
+# 两个句子的时间重叠超过较短句子的该比例时视为重复
+_DUPLICATE_OVERLAP_RATIO = 0.5
+
+_WORD_END_RE = re.compile(r"[A-Za-z0-9]$")
+_WORD_START_RE = re.compile(r"^[A-Za-z0-9]")
+
+
+class AudioChunk:
+    """音频分段"""
+
+    def __init__(self, index: int, start: float, end: float, own_start: float, own_end: float):
+        """
+        Args:
+            index: 分段序号
+            start: 截取的起始时间（秒）
+            end: 截取的结束时间（秒）
+            own_start: 该分段负责的起始时间（秒），中点落在 [own_start, own_end) 内的句子归属该分段
+            own_end: 该分段负责的结束时间（秒）
+        """
+        self.index = index
+        self.start = start
+        self.end = end
+        self.own_start = own_start
+        self.own_end = own_end
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def __repr__(self) -> str:
+        return f"AudioChunk({self.index}, {self.start:.2f}-{self.end:.2f})"
+
+
+def plan_chunks(silences: List[Tuple[float, float]],
+                duration: float,
+                chunk_seconds: float = 300,
+                search_window: float = 30,
+                overlap: float = 1.0) -> List[AudioChunk]:
+    """
+    在静音处规划分段
+
+    每个切点取目标位置（上一切点 + chunk_seconds）前后 search_window 秒内最长的静音的中点；
+    找不到静音时在目标位置硬切，两侧分段各多截取 overlap 秒，重复的句子在拼接时去掉。
+
+    Args:
+        silences: 静音区间 [(start, end), ...]（秒）
+        duration: 音频时长（秒）
+        chunk_seconds: 目标分段时长（秒）
+        search_window: 在目标切点前后多少秒内寻找静音
+        overlap: 硬切时两侧分段的重叠时长（秒）
+
+    Returns:
+        按时间顺序的分段列表
+    """
+    cuts: List[Tuple[float, bool]] = []  # (切点, 是否在静音处)
+    cursor = 0.0
+    # 剩余部分不超过 1.25 倍目标时长时不再切分，避免产生过短的尾段
+    while duration - cursor > chunk_seconds * 1.25:
+        target = cursor + chunk_seconds
+        candidates = [
+            (start, end) for start, end in silences
+            if abs((start + end) / 2 - target) <= search_window and (start + end) / 2 > cursor
+        ]
+        if candidates:
+            start, end = max(candidates, key=lambda s: (s[1] - s[0], -abs((s[0] + s[1]) / 2 - target)))
+            cuts.append(((start + end) / 2, True))
+        else:
+            cuts.append((target, False))
+        cursor = cuts[-1][0]
+
+    chunks = []
+    bounds = [(0.0, True)] + cuts + [(duration, True)]
+    for index in range(len(bounds) - 1):
+        own_start, start_in_silence = bounds[index]
+        own_end, end_in_silence = bounds[index + 1]
+        start = own_start if start_in_silence else max(0.0, own_start - overlap)
+        end = own_end if end_in_silence else min(duration, own_end + overlap)
+        chunks.append(AudioChunk(index, start, end, own_start, own_end))
+    return chunks
+
+
+def extract_sentences(transcription: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    将各服务商的识别结果统一为 QwenASR 的句子格式
+
+    支持 QwenASR（result.sentences）、ByteDanceASR（result.utterances）
+    和 FunASR（transcripts[].sentences）的结果。
+    """
+    result = transcription.get("result") if isinstance(transcription.get("result"), dict) else {}
+    if "sentences" in result:
+        raw = [(sentence.get("channel_id", 0), sentence) for sentence in result["sentences"]]
+    elif "utterances" in result:
+        raw = [(0, utterance) for utterance in result["utterances"]]
+    else:
+        raw = [
+            (transcript.get("channel_id", 0), sentence)
+            for transcript in transcription.get("transcripts", [])
+            for sentence in transcript.get("sentences", [])
+        ]
+
+    sentences = []
+    for channel_id, sentence in raw:
+        begin_time = sentence.get("begin_time", sentence.get("start_time", 0))
+        sentences.append({
+            "channel_id": channel_id,
+            "sentence_id": sentence.get("sentence_id", 0),
+            "text": sentence.get("text", ""),
+            "begin_time": begin_time,
+            "end_time": sentence.get("end_time", begin_time),
+            "language": sentence.get("language", ""),
+            "emotion": sentence.get("emotion", "neutral"),
+        })
+    return sentences
+
+
+def _join_text(texts: List[str]) -> str:
+    """拼接句子文本，只在两个英文单词/数字之间补空格"""
+    full_text = ""
+    for text in texts:
+        if full_text and _WORD_END_RE.search(full_text) and _WORD_START_RE.search(text):
+            full_text += " "
+        full_text += text
+    return full_text
+
+
+def _is_duplicate(previous: Dict[str, Any], sentence: Dict[str, Any]) -> bool:
+    overlap = min(previous["end_time"], sentence["end_time"]) - max(previous["begin_time"], sentence["begin_time"])
+    shorter = min(previous["end_time"] - previous["begin_time"], sentence["end_time"] - sentence["begin_time"])
+    return overlap > 0 and (shorter <= 0 or overlap >= shorter * _DUPLICATE_OVERLAP_RATIO)
+
+
+def stitch_transcriptions(chunks: List[AudioChunk],
+                          transcriptions: List[Dict[str, Any]],
+                          file_url: str = "") -> Dict[str, Any]:
+    """
+    拼接各分段的识别结果
+
+    句子时间戳加上分段的起始偏移；只保留中点落在分段负责区间内的句子，
+    硬切处两侧分段识别出的同一句话只保留时长较长（更完整）的一个。
+
+    Args:
+        chunks: plan_chunks 返回的分段
+        transcriptions: 与 chunks 一一对应的识别结果（ASRResult 的 transcription 字段）
+        file_url: 原始媒体
+
+    Returns:
+        与 QwenASR._process_result 相同结构的结果
+    """
+    all_sentences: List[Dict[str, Any]] = []
+    seconds = 0
+    model = ""
+    for chunk, transcription in zip(chunks, transcriptions):
+        usage = transcription.get("usage", {})
+        seconds += usage.get("seconds", 0)
+        model = model or usage.get("model", "")
+
+        offset_ms = int(round(chunk.start * 1000))
+        own_start_ms, own_end_ms = chunk.own_start * 1000, chunk.own_end * 1000
+        is_last = chunk is chunks[-1]
+        for sentence in extract_sentences(transcription):
+            sentence["begin_time"] += offset_ms
+            sentence["end_time"] += offset_ms
+            middle = (sentence["begin_time"] + sentence["end_time"]) / 2
+            if middle < own_start_ms or (middle >= own_end_ms and not is_last):
+                continue
+
+            previous = all_sentences[-1] if all_sentences else None
+            if previous is not None and previous["_chunk"] != chunk.index and _is_duplicate(previous, sentence):
+                if sentence["end_time"] - sentence["begin_time"] > previous["end_time"] - previous["begin_time"]:
+                    all_sentences[-1] = {**sentence, "_chunk": chunk.index}
+                continue
+            all_sentences.append({**sentence, "_chunk": chunk.index})
+
+    for sentence_id, sentence in enumerate(all_sentences, start=1):
+        sentence.pop("_chunk")
+        sentence["sentence_id"] = sentence_id
+
+    return {
+        "audio_info": {
+            "file_url": file_url,
+            "audio_info": {}
+        },
+        "result": {
+            "text": _join_text([sentence["text"] for sentence in all_sentences]),
+            "sentences": all_sentences
+        },
+        "usage": {
+            "model": model,
+            "total_duration_ms": all_sentences[-1]["end_time"] if all_sentences else 0,
+            "seconds": seconds
+        }
+    }
+
+
+async def _transcribe_chunks(asrs: List[BaseASR],
+                             file_urls: List[str],
+                             language_hints: Optional[List[str]],
+                             **kwargs) -> List[Dict[str, Any]]:
+    """按轮询方式把分段分配给各服务商并发识别，返回与 file_urls 顺序一致的结果"""
+    groups = [list(range(index, len(file_urls), len(asrs))) for index in range(len(asrs))]
+    outcomes = await asyncio.gather(*[
+        asr.atranscribe([file_urls[i] for i in group], language_hints, **kwargs)
+        for asr, group in zip(asrs, groups) if group
+    ])
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(file_urls)
+    for group, group_results in zip([group for group in groups if group], outcomes):
+        for i, result in zip(group, group_results):
+            results[i] = result
+    return results
+
+
+async def transcribe_chunked(asr: Union[BaseASR, List[BaseASR]],
+                             source: str,
+                             language_hints: Optional[List[str]] = None,
+                             chunk_seconds: Optional[float] = None,
+                             **kwargs) -> Dict[str, Any]:
+    """
+    分段并发识别一个本地或远程媒体
+
+    Args:
+        asr: ASR 实例；传入多个实例时分段轮流分配给各实例
+        source: 媒体路径或 URL
+        language_hints: 语言提示
+        chunk_seconds: 目标分段时长（秒），默认 ASR_CHUNK_SECONDS
+        **kwargs: 传给服务商的其他参数
+
+    Returns:
+        ASRResult 字典，transcription 为与 QwenASR._process_result 相同结构的结果，
+        时间戳对应原始媒体；任一分段失败时整体失败
+    """
+    asrs = asr if isinstance(asr, list) else [asr]
+    config = load_asr_chunk_config()
+    chunk_seconds = chunk_seconds or config["chunk_seconds"]
+    preprocessor = get_audio_preprocessor()
+
+    workdir = None
+    try:
+        try:
+            if not ffmpeg_available():
+                raise FFmpegError("ffmpeg not found")
+            local_path, timestamp_map, _, workdir = await preprocessor.prepare_local(source)
+        except FFmpegError as e:
+            # 无法在本地切分，退化为整段识别
+            logger.warning(f"无法分段，整段识别: {source}，错误: {e}")
+            result = (await asrs[0].atranscribe_media(source, language_hints, **kwargs))[0]
+            if result.get('status') == 'success':
+                whole = AudioChunk(0, 0.0, 0.0, 0.0, float("inf"))
+                result['transcription'] = stitch_transcriptions([whole], [result['transcription']], source)
+            return result
+
+        if timestamp_map.duration > chunk_seconds * 1.25:
+            silences, _ = await preprocessor.detect_silences(local_path, config["min_silence"])
+            chunks = plan_chunks(
+                silences, timestamp_map.duration, chunk_seconds, config["search_window"], config["overlap"]
+            )
+        else:
+            chunks = [AudioChunk(0, 0.0, timestamp_map.duration, 0.0, timestamp_map.duration)]
+
+        # 裁剪和上传由预处理器按 ASR_PREPROCESS_CONCURRENCY / ASR_UPLOAD_CONCURRENCY 限制并发，
+        # 分段再多也不会同时启动全部 ffmpeg 进程和上传
+        if len(chunks) == 1:
+            paths = [local_path]
+        else:
+            paths = await asyncio.gather(*[
+                preprocessor.cut(local_path, chunk.start, chunk.end, os.path.join(workdir, f"chunk_{chunk.index:03d}.ogg"))
+                for chunk in chunks
+            ])
+        file_urls = await asyncio.gather(*[preprocessor.upload(path) for path in paths])
+
+        logger.info(f"分段识别: {source}，共 {len(chunks)} 段，{len(asrs)} 个服务商")
+        results = await _transcribe_chunks(asrs, list(file_urls), language_hints, **kwargs)
+
+        for chunk, result in zip(chunks, results):
+            if result.get('status') != 'success':
+                logger.error(f"分段 {chunk} 识别失败: {result.get('error')}")
+                return ASRResult(source, 'failed', error=f"分段 {chunk.index} 识别失败: {result.get('error')}").to_dict()
+
+        stitched = stitch_transcriptions(chunks, [result['transcription'] for result in results], source)
+        stitched["result"]["sentences"] = timestamp_map.remap(stitched["result"]["sentences"])
+        if stitched["result"]["sentences"]:
+            stitched["usage"]["total_duration_ms"] = stitched["result"]["sentences"][-1]["end_time"]
+        return ASRResult(source, 'success', transcription=stitched).to_dict()
+
+    except FFmpegError as e:
+        logger.error(f"音频分段失败: {source}，错误: {e}")
+        return ASRResult(source, 'failed', error=str(e)).to_dict()
+    finally:
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
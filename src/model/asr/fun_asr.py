@@ -10,14 +10,13 @@ FunASR - 阿里云通义语音识别服务封装
 
 from http import HTTPStatus
 from dashscope.audio.asr import Transcription
-from urllib import request
 import dashscope
 import os
-import json
 import logging
 from typing import List, Optional, Dict, Any, Union
 
-from .base_asr import BaseASR, ASRResult
+from .base_asr import BaseASR, ASRJob, ASRResult
+from .http_client import fetch_json
 
 
 class FunASR(BaseASR):
@@ -42,90 +41,91 @@ class FunASR(BaseASR):
         # 设置日志
         self.logger = logging.getLogger(__name__)
     
-    def transcribe(self, 
-                  file_urls: Union[str, List[str]], 
-                  language_hints: Optional[List[str]] = None,
-                  diarization_enabled: bool = False,
-                  **kwargs) -> List[Dict[str, Any]]:
+    def job_kwargs(self,
+                   language_hints: Optional[List[str]] = None,
+                   diarization_enabled: bool = False,
+                   **kwargs) -> Dict[str, Any]:
         """
-        对音频文件进行语音识别
+        FunASR 直接使用语言提示列表（默认 ['zh', 'en']），并支持说话人分离
         
         Args:
-            file_urls: 音频文件URL，可以是单个URL字符串或URL列表
             language_hints: 语言提示列表，如['zh', 'en']
             diarization_enabled: 是否启用说话人分离
             **kwargs: 其他参数
+        """
+        return {
+            'language_hints': language_hints or ['zh', 'en'],
+            'diarization_enabled': diarization_enabled,
+            **kwargs,
+        }
+    
+    def submit_job(self, file_url: str, **kwargs) -> ASRJob:
+        """
+        提交单个文件的识别任务
+        
+        Args:
+            file_url: 音频文件URL
+            **kwargs: Transcription.async_call 的参数
             
         Returns:
-            识别结果列表，每个元素包含文件URL和识别结果
+            ASRJob: 任务句柄
             
         Raises:
-            Exception: 当识别失败时抛出异常
+            Exception: 提交失败时抛出异常
         """
-        # 统一处理为列表格式
-        if isinstance(file_urls, str):
-            file_urls = [file_urls]
-            
-        self.logger.info(f"开始识别 {len(file_urls)} 个音频文件")
+        task_response = Transcription.async_call(
+            model='fun-asr',
+            file_urls=[file_url],
+            **kwargs
+        )
         
-        try:
-            # 提交识别任务
-            task_response = Transcription.async_call(
-                model='fun-asr',
-                file_urls=file_urls,
-                language_hints=language_hints or ['zh', 'en'],
-                diarization_enabled=diarization_enabled,
-                **kwargs
-            )
+        if not task_response or not task_response.output:
+            raise Exception(f"提交识别任务失败: {getattr(task_response, 'message', '')}")
             
-            if not task_response or not task_response.output:
-                raise Exception("提交识别任务失败")
-                
-            task_id = task_response.output.task_id
-            self.logger.info(f"任务已提交，任务ID: {task_id}")
+        task_id = task_response.output.task_id
+        self.logger.info(f"任务已提交，任务ID: {task_id}")
+        return ASRJob(file_url, task_id)
+    
+    def poll_job(self, job: ASRJob) -> Optional[Dict[str, Any]]:
+        """
+        查询一次任务状态
+        
+        Args:
+            job: submit_job 返回的任务句柄
             
-            # 等待识别完成
-            transcription_response = Transcription.wait(task=task_id)
+        Returns:
+            任务进行中返回 None，否则返回识别结果
             
-            if transcription_response.status_code == HTTPStatus.OK:
-                results = []
-                
-                for i, transcription in enumerate(transcription_response.output['results']):
-                    if transcription['subtask_status'] == 'SUCCEEDED':
-                        url = transcription['transcription_url']
-                        result = json.loads(request.urlopen(url).read().decode('utf8'))
-                        
-                        usage = {
-                            "model": "fun-asr",
-                            "total_duration_ms": result.get("properties", {}).get("original_duration_in_milliseconds", 0),
-                        }
-                        result["usage"] = usage
-                        
-                        results.append({
-                            'file_url': file_urls[i],
-                            'status': 'success',
-                            'transcription': result
-                        })
-                        
-                        self.logger.info(f"文件 {file_urls[i]} 识别成功")
-                    else:
-                        results.append({
-                            'file_url': file_urls[i],
-                            'status': 'failed',
-                            'error': transcription
-                        })
-                        
-                        self.logger.error(f"文件 {file_urls[i]} 识别失败: {transcription}")
-                
-                return results
-            else:
-                error_msg = f"识别任务失败: {transcription_response.output.message}"
-                self.logger.error(error_msg)
-                raise Exception(error_msg)
-                
-        except Exception as e:
-            self.logger.error(f"ASR识别过程中出错: {str(e)}")
-            raise
+        Raises:
+            Exception: 查询请求失败时抛出异常
+        """
+        file_url = job.file_url
+        transcription_response = Transcription.fetch(task=job.job_id)
+        
+        if transcription_response.status_code != HTTPStatus.OK:
+            raise Exception(f"查询识别任务失败: {transcription_response.message}")
+        
+        task_status = transcription_response.output.task_status
+        if task_status in ('PENDING', 'RUNNING'):
+            return None
+        
+        results = transcription_response.output.get('results') or []
+        transcription = results[0] if results else transcription_response.output
+        if task_status != 'SUCCEEDED' or transcription.get('subtask_status') != 'SUCCEEDED':
+            self.logger.error(f"文件 {file_url} 识别失败: {transcription}")
+            return ASRResult(file_url, 'failed', error=transcription).to_dict()
+        
+        url = transcription['transcription_url']
+        result = fetch_json(url, "funasr")
+        
+        usage = {
+            "model": "fun-asr",
+            "total_duration_ms": result.get("properties", {}).get("original_duration_in_milliseconds", 0),
+        }
+        result["usage"] = usage
+        
+        self.logger.info(f"文件 {file_url} 识别成功")
+        return ASRResult(file_url, 'success', transcription=result).to_dict()
     
     def extract_text(self, transcription_result: Dict[str, Any]) -> str:
         """
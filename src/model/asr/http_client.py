@@ -0,0 +1,103 @@
+"""
+ASR 服务商 HTTP 连接池
+
+每个服务商共享一个 requests.Session（keep-alive 连接池），提交 / 查询任务和下载
+转写结果时复用连接，省去每个请求的 TCP + TLS 握手。所有请求都带 (连接, 读取) 超时。
+
+转写结果（transcription_url）以流式方式下载：安装了 ijson 时边下载边解析，
+否则按块读入后一次解析，不再额外保留解码后的完整字符串。
+"""
+
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ...config.config import load_asr_http_config
+
+try:
+    import ijson
+except ImportError:  # 可选依赖
+    ijson = None
+
+
+logger = logging.getLogger(__name__)
+
+# 流式下载的块大小
+_CHUNK_SIZE = 256 * 1024
+
+# provider -> Session
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.RLock()
+
+
+def get_http_session(provider: str) -> requests.Session:
+    """
+    获取服务商共享的 HTTP 会话
+
+    连接失败和 GET 请求的 502/503/504 会自动重试；POST（提交任务）不重试，避免重复提交。
+    """
+    session = _sessions.get(provider)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(provider)
+            if session is None:
+                config = load_asr_http_config()
+                retry = Retry(
+                    total=config["retries"],
+                    backoff_factor=0.5,
+                    status_forcelist=(502, 503, 504),
+                    allowed_methods=frozenset({"GET", "HEAD"}),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=config["pool_size"],
+                    pool_maxsize=config["pool_size"],
+                    max_retries=retry,
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _sessions[provider] = session
+
+    return session
+
+
+def get_timeout() -> Tuple[float, float]:
+    """(连接超时, 读取超时) 秒"""
+    config = load_asr_http_config()
+    return config["connect_timeout"], config["read_timeout"]
+
+
+def fetch_json(url: str, provider: str, timeout: Optional[Tuple[float, float]] = None) -> Any:
+    """
+    流式下载并解析 JSON（如 transcription_url 指向的转写结果）
+
+    Raises:
+        requests.HTTPError: 下载失败时抛出异常
+        ValueError: 内容不是合法的 JSON
+    """
+    session = get_http_session(provider)
+    with session.get(url, stream=True, timeout=timeout or get_timeout()) as response:
+        response.raise_for_status()
+        if ijson is not None:
+            response.raw.decode_content = True
+            return next(ijson.items(response.raw, "", use_float=True))
+
+        body = bytearray()
+        for chunk in response.iter_content(chunk_size=_CHUNK_SIZE):
+            body.extend(chunk)
+    logger.debug(f"下载转写结果 {len(body) / 1024:.0f}KB: {url}")
+    return json.loads(body)
+
+
+def close_http_sessions() -> None:
+    """关闭所有服务商会话"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
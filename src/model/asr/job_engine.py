@@ -0,0 +1,157 @@
+"""
+ASR 异步任务引擎
+
+所有文件一次性并发提交，各任务独立轮询（自适应退避 + 抖动），
+结果按完成顺序返回，调用方的事件循环不会被阻塞。
+
+使用示例:
+    asr = ASR(provider='qwen')
+    async for result in asr.atranscribe_iter(['url1', 'url2']):
+        print(result['file_url'], result['status'])
+"""
+
+import asyncio
+import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from ...config.config import load_asr_config
+from .base_asr import BaseASR, ASRResult
+
+
+logger = logging.getLogger(__name__)
+
+
+class ASRJobEngine:
+    """并发提交、轮询 ASR 任务的异步引擎"""
+
+    def __init__(self,
+                 max_workers: int = 16,
+                 poll_initial_interval: float = 1.0,
+                 poll_max_interval: float = 10.0,
+                 poll_backoff: float = 1.5,
+                 job_timeout: Optional[float] = 3600,
+                 max_poll_errors: int = 3):
+        """
+        初始化任务引擎
+
+        Args:
+            max_workers: 执行服务商同步 HTTP 请求的线程数
+            poll_initial_interval: 首次轮询前的等待秒数
+            poll_max_interval: 轮询间隔上限（秒）
+            poll_backoff: 每次未完成后轮询间隔的增长倍数
+            job_timeout: 单个任务的超时秒数，None 或 0 表示不限
+            max_poll_errors: 连续查询出错多少次后判定任务失败
+        """
+        self.poll_initial_interval = poll_initial_interval
+        self.poll_max_interval = poll_max_interval
+        self.poll_backoff = poll_backoff
+        self.job_timeout = job_timeout
+        self.max_poll_errors = max_poll_errors
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="asr")
+
+    async def _call(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def _run_job(self, asr: BaseASR, index: int, file_url: str, job_kwargs: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """提交并轮询单个任务，直到完成、失败或超时"""
+        try:
+            job = await self._call(asr.submit_job, file_url, **job_kwargs)
+        except Exception as e:
+            logger.error(f"提交文件 {file_url} 时出错: {str(e)}")
+            return index, ASRResult(file_url, 'failed', error=str(e)).to_dict()
+        job.index = index
+
+        interval = self.poll_initial_interval
+        errors = 0
+        while True:
+            # 抖动避免大量任务同时轮询
+            await asyncio.sleep(interval * random.uniform(0.8, 1.2))
+            try:
+                result = await self._call(asr.poll_job, job)
+                errors = 0
+            except Exception as e:
+                errors += 1
+                logger.warning(f"查询文件 {file_url} 出错 ({errors}/{self.max_poll_errors}): {str(e)}")
+                if errors >= self.max_poll_errors:
+                    return index, ASRResult(file_url, 'failed', error=str(e)).to_dict()
+                result = None
+
+            if result is not None:
+                return index, result
+            if self.job_timeout and job.elapsed > self.job_timeout:
+                logger.error(f"文件 {file_url} 识别超时")
+                return index, ASRResult(file_url, 'failed', error=f"识别超时（{self.job_timeout}秒）").to_dict()
+            interval = min(interval * self.poll_backoff, self.poll_max_interval)
+
+    async def transcribe_iter(self,
+                              asr: BaseASR,
+                              file_urls: Union[str, List[str]],
+                              language_hints: Optional[List[str]] = None,
+                              **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """
+        并发识别所有文件，按完成顺序逐个返回结果
+
+        每个结果额外带有 index 字段，对应文件在 file_urls 中的位置。
+        迭代提前结束或被取消时，未完成的任务停止轮询。
+        """
+        if isinstance(file_urls, str):
+            file_urls = [file_urls]
+        job_kwargs = asr.job_kwargs(language_hints, **kwargs)
+
+        logger.info(f"开始并发识别 {len(file_urls)} 个音频文件")
+        tasks = [
+            asyncio.create_task(self._run_job(asr, index, file_url, job_kwargs))
+            for index, file_url in enumerate(file_urls)
+        ]
+        try:
+            for future in asyncio.as_completed(tasks):
+                index, result = await future
+                yield {**result, 'index': index}
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def transcribe(self,
+                         asr: BaseASR,
+                         file_urls: Union[str, List[str]],
+                         language_hints: Optional[List[str]] = None,
+                         **kwargs) -> List[Dict[str, Any]]:
+        """并发识别所有文件，返回与 file_urls 顺序一致的结果列表"""
+        if isinstance(file_urls, str):
+            file_urls = [file_urls]
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(file_urls)
+        async for result in self.transcribe_iter(asr, file_urls, language_hints, **kwargs):
+            index = result.pop('index')
+            results[index] = result
+        return results
+
+
+# 全局任务引擎（共享线程池）
+_asr_job_engine: Optional[ASRJobEngine] = None
+_engine_lock = threading.RLock()
+
+
+def get_asr_job_engine() -> ASRJobEngine:
+    """获取全局唯一的 ASR 任务引擎"""
+    global _asr_job_engine
+
+    if _asr_job_engine is None:
+        with _engine_lock:
+            if _asr_job_engine is None:
+                config = load_asr_config()
+                _asr_job_engine = ASRJobEngine(
+                    max_workers=config["max_workers"],
+                    poll_initial_interval=config["poll_initial_interval"],
+                    poll_max_interval=config["poll_max_interval"],
+                    poll_backoff=config["poll_backoff"],
+                    job_timeout=config["job_timeout"],
+                    max_poll_errors=config["max_poll_errors"],
+                )
+
+    return _asr_job_engine
@@ -5,17 +5,18 @@ QwenASR - 通义千问语音识别服务封装
     asr = QwenASR(api_key="your_api_key")
     result = asr.transcribe("http://example.com/audio.mp3")
     print(result)
+    
+    # 异步并发识别
+    results = await asr.atranscribe(["http://example.com/a.mp3", "http://example.com/b.mp3"])
 """
 
 import json
-import time
-import requests
 import logging
 import os
 from typing import List, Optional, Dict, Any, Union
-from urllib import request
 
-from .base_asr import BaseASR, ASRResult
+from .base_asr import BaseASR, ASRJob, ASRResult
+from .http_client import fetch_json, get_http_session, get_timeout
 
 
 class QwenASR(BaseASR):
@@ -99,7 +100,9 @@ class QwenASR(BaseASR):
         }
         
         self.logger.info(f"提交识别任务: {file_url}")
-        response = requests.post(self.submit_url, headers=headers, data=json.dumps(payload))
+        response = get_http_session("qwen").post(
+            self.submit_url, headers=headers, data=json.dumps(payload), timeout=get_timeout()
+        )
         
         if response.status_code == 200:
             result = response.json()
@@ -133,7 +136,7 @@ class QwenASR(BaseASR):
         }
         
         query_url = f"{self.query_url}/{task_id}"
-        response = requests.get(query_url, headers=headers)
+        response = get_http_session("qwen").get(query_url, headers=headers, timeout=get_timeout())
         
         if response.status_code == 200:
             return response.json()
@@ -142,117 +145,72 @@ class QwenASR(BaseASR):
             self.logger.error(error_msg)
             raise Exception(error_msg)
     
-    def transcribe(self,
-                  file_urls: Union[str, List[str]],
-                  language_hints: Optional[List[str]] = None,
-                  **kwargs) -> List[Dict[str, Any]]:
+    def submit_job(self, file_url: str, **kwargs) -> ASRJob:
         """
-        对音频文件进行语音识别
+        提交单个文件的识别任务
         
         Args:
-            file_urls: 音频文件URL，可以是单个URL字符串或URL列表
-            language_hints: 语言提示列表，如 ['zh'] 表示中文。为空时自动识别多语种
-            **kwargs: 其他参数，如enable_itn、enable_words等
+            file_url: 音频文件URL
+            **kwargs: submit_task 的参数，如language、enable_itn、enable_words等
             
         Returns:
-            识别结果列表，每个元素包含文件URL和识别结果
+            ASRJob: 任务句柄
         """
-        # 统一处理为列表格式
-        if isinstance(file_urls, str):
-            file_urls = [file_urls]
-        
-        # 处理 language_hints 参数，取第一个语言提示
-        language = None
-        if language_hints and len(language_hints) > 0:
-            language = language_hints[0]
-            if 'language' not in kwargs:
-                kwargs['language'] = language
-        
-        self.logger.info(f"开始识别 {len(file_urls)} 个音频文件")
-        
-        results = []
-        for file_url in file_urls:
-            try:
-                # 提交识别任务
-                task_id = self.submit_task(file_url, **kwargs)
-                
-                # 轮询查询任务状态
-                while True:
-                    query_response = self.query_task(task_id)
-                    
-                    # 检查任务状态
-                    if "output" in query_response:
-                        task_status = query_response["output"].get("task_status", "")
-                        
-                        if task_status == "SUCCEEDED":  # 任务完成
-                            # 获取转写结果URL
-                            result_info = query_response["output"].get("result", {})
-                            transcription_url = result_info.get("transcription_url", "")
-                            
-                            if not transcription_url:
-                                error_msg = "未找到 transcription_url"
-                                results.append({
-                                    'file_url': file_url,
-                                    'status': 'failed',
-                                    'error': error_msg
-                                })
-                                self.logger.error(f"文件 {file_url} 识别失败: {error_msg}")
-                                break
-                            
-                            # 下载转写结果
-                            self.logger.info(f"下载转写结果: {transcription_url}")
-                            transcription_data = json.loads(request.urlopen(transcription_url).read().decode('utf8'))
-                            
-                            # 处理和简化结果
-                            simplified_result = self._process_result(transcription_data, query_response, **kwargs)
-                            results.append({
-                                'file_url': file_url,
-                                'status': 'success',
-                                'transcription': simplified_result
-                            })
-                            self.logger.info(f"文件 {file_url} 识别成功")
-                            break
-                        elif task_status == "FAILED":  # 任务失败
-                            error_data = query_response.get("output", {})
-                            results.append({
-                                'file_url': file_url,
-                                'status': 'failed',
-                                'error': error_data
-                            })
-                            self.logger.error(f"文件 {file_url} 识别失败: {error_data}")
-                            break
-                        elif task_status in ["PENDING", "RUNNING"]:
-                            # 任务进行中，等待1秒后继续查询
-                            time.sleep(1)
-                        else:
-                            # 未知状态
-                            error_msg = f"未知任务状态: {task_status}"
-                            results.append({
-                                'file_url': file_url,
-                                'status': 'failed',
-                                'error': error_msg
-                            })
-                            self.logger.error(error_msg)
-                            break
-                    else:
-                        error_msg = f"查询响应格式错误: {query_response}"
-                        results.append({
-                            'file_url': file_url,
-                            'status': 'failed',
-                            'error': error_msg
-                        })
-                        self.logger.error(error_msg)
-                        break
-                        
-            except Exception as e:
-                results.append({
-                    'file_url': file_url,
-                    'status': 'failed',
-                    'error': str(e)
-                })
-                self.logger.error(f"处理文件 {file_url} 时出错: {str(e)}")
+        task_id = self.submit_task(file_url, **kwargs)
+        return ASRJob(file_url, task_id, kwargs=kwargs)
+    
+    def poll_job(self, job: ASRJob) -> Optional[Dict[str, Any]]:
+        """
+        查询一次任务状态
         
-        return results
+        Args:
+            job: submit_job 返回的任务句柄
+            
+        Returns:
+            任务进行中返回 None，否则返回识别结果
+        """
+        file_url = job.file_url
+        query_response = self.query_task(job.job_id)
+        
+        # 检查任务状态
+        if "output" not in query_response:
+            error_msg = f"查询响应格式错误: {query_response}"
+            self.logger.error(error_msg)
+            return ASRResult(file_url, 'failed', error=error_msg).to_dict()
+        
+        task_status = query_response["output"].get("task_status", "")
+        
+        if task_status in ["PENDING", "RUNNING"]:  # 任务进行中
+            return None
+        
+        if task_status == "SUCCEEDED":  # 任务完成
+            # 获取转写结果URL
+            result_info = query_response["output"].get("result", {})
+            transcription_url = result_info.get("transcription_url", "")
+            
+            if not transcription_url:
+                error_msg = "未找到 transcription_url"
+                self.logger.error(f"文件 {file_url} 识别失败: {error_msg}")
+                return ASRResult(file_url, 'failed', error=error_msg).to_dict()
+            
+            # 下载转写结果
+            self.logger.info(f"下载转写结果: {transcription_url}")
+            transcription_data = fetch_json(transcription_url, "qwen")
+            
+            # 处理和简化结果
+            simplified_result = self._process_result(transcription_data, query_response, **job.extra["kwargs"])
+            self.logger.info(f"文件 {file_url} 识别成功")
+            return ASRResult(file_url, 'success', transcription=simplified_result).to_dict()
+        
+        if task_status == "FAILED":  # 任务失败
+            error_data = query_response.get("output", {})
+            self.logger.error(f"文件 {file_url} 识别失败: {error_data}")
+            return ASRResult(file_url, 'failed', error=error_data).to_dict()
+        
+        # 未知状态
+        error_msg = f"未知任务状态: {task_status}"
+        self.logger.error(error_msg)
+        return ASRResult(file_url, 'failed', error=error_msg).to_dict()
     
     def _process_result(self, transcription_data: Dict[str, Any], query_response: Dict[str, Any], **kwargs) -> Dict[str, Any]:
         """
@@ -0,0 +1,138 @@
+"""
+ASR 识别结果缓存
+
+同一段音频重复识别时（用户反复修改剪辑很常见）直接返回缓存的结果。
+缓存 key 由音频内容指纹、服务商、语言提示和识别参数组成：
+- 内容寻址的 URL（UploadToTOS 上传的 {folder}/{sha256}{ext}）取 URL 中的哈希
+- 本地文件取内容的 SHA-256（通过上传索引按 path/size/mtime 复用）
+- 其他 URL 以 URL 本身作为指纹
+
+结果保存在内存 LRU + SQLite 磁盘两级缓存中，磁盘超出大小上限时淘汰最久未访问的结果。
+只缓存识别成功的结果。
+"""
+
+import os
+import copy
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from ...config.config import load_asr_cache_config
+from ...storage.upload_index import content_hash_from_url, get_upload_index, hash_file
+from ...utils.cache import BaseCache, DiskCache, MemoryCache, TieredCache
+
+
+logger = logging.getLogger(__name__)
+
+
+def audio_fingerprint(file_url: str) -> str:
+    """音频内容指纹"""
+    content_hash = content_hash_from_url(file_url)
+    if content_hash:
+        return f"sha256:{content_hash}"
+    if os.path.isfile(file_url):
+        try:
+            return f"sha256:{get_upload_index().file_hash(file_url)}"
+        except Exception as e:
+            logger.warning(f"上传索引不可用，直接计算文件哈希: {str(e)}")
+            return f"sha256:{hash_file(file_url)}"
+    return f"url:{file_url}"
+
+
+class ASRResultCache:
+    """按音频指纹缓存识别结果"""
+
+    def __init__(self, cache: BaseCache):
+        """
+        Args:
+            cache: 底层缓存，值需可 JSON 序列化
+        """
+        self.cache = cache
+
+    def key(self, provider: str, file_url: str, job_kwargs: Dict[str, Any]) -> str:
+        """
+        Args:
+            provider: 服务商（ASR 类名）
+            file_url: 音频文件URL或本地路径
+            job_kwargs: 经 job_kwargs 处理后的识别参数（含语言提示、diarization_enabled 等）
+        """
+        raw = json.dumps(
+            [audio_fingerprint(file_url), provider, job_kwargs],
+            ensure_ascii=False, sort_keys=True, default=str,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def lookup(self,
+               provider: str,
+               file_urls: List[str],
+               job_kwargs: Dict[str, Any]) -> Tuple[List[Optional[str]], Dict[int, Dict[str, Any]]]:
+        """
+        批量查询缓存
+
+        Returns:
+            (每个文件的缓存 key，无法计算指纹时为 None, {文件序号: 缓存的识别结果})
+        """
+        keys: List[Optional[str]] = []
+        hits: Dict[int, Dict[str, Any]] = {}
+        for index, file_url in enumerate(file_urls):
+            try:
+                key = self.key(provider, file_url, job_kwargs)
+            except OSError as e:
+                logger.warning(f"无法计算音频指纹，跳过缓存: {file_url}，错误: {str(e)}")
+                keys.append(None)
+                continue
+            keys.append(key)
+            result = self.cache.get(key)
+            if result is not None:
+                # 内存层返回的是缓存中的对象，深拷贝后调用方修改结果（如映射时间戳）不会影响缓存；
+                # 相同内容可能来自不同的 URL
+                hits[index] = {**copy.deepcopy(result), 'file_url': file_url}
+        if hits:
+            logger.info(f"ASR 缓存命中 {len(hits)}/{len(file_urls)} 个文件")
+        return keys, hits
+
+    def store(self, key: Optional[str], result: Dict[str, Any]) -> None:
+        """保存识别成功的结果"""
+        if key is None or result.get('status') != 'success':
+            return
+        try:
+            # 保存副本：调用方之后还会修改返回的结果；结果序号只对本次请求有意义
+            self.cache.set(key, copy.deepcopy({k: v for k, v in result.items() if k != 'index'}))
+        except Exception as e:
+            logger.warning(f"写入 ASR 缓存失败: {str(e)}")
+
+    def metrics(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        if isinstance(self.cache, TieredCache):
+            return self.cache.metrics()
+        return self.cache.stats.to_dict()
+
+
+# 全局识别结果缓存
+_asr_result_cache: Optional[ASRResultCache] = None
+_asr_cache_loaded = False
+_asr_cache_lock = threading.RLock()
+
+
+def get_asr_result_cache() -> Optional[ASRResultCache]:
+    """获取全局 ASR 识别结果缓存，未启用时返回 None"""
+    global _asr_result_cache, _asr_cache_loaded
+
+    if not _asr_cache_loaded:
+        with _asr_cache_lock:
+            if not _asr_cache_loaded:
+                config = load_asr_cache_config()
+                if config["enabled"]:
+                    memory = MemoryCache(max_entries=config["max_entries"], ttl=config["ttl"])
+                    disk = None
+                    if config["path"]:
+                        try:
+                            disk = DiskCache(config["path"], max_bytes=config["max_bytes"], ttl=config["ttl"])
+                        except Exception as e:
+                            logger.warning(f"ASR 磁盘缓存不可用，只使用内存缓存: {str(e)}")
+                    _asr_result_cache = ASRResultCache(TieredCache(memory, disk))
+                _asr_cache_loaded = True
+
+    return _asr_result_cache
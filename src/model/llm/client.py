@@ -0,0 +1,187 @@
+"""
+Process-wide LLM client layer.
+
+One ``LLMClient`` is shared per (model, api_base) by every agent and sub-agent in
+the process, so streaming completions reuse pooled keep-alive (HTTP/2 when the
+``h2`` package is installed) connections instead of paying connection and TLS
+setup on every call.
+
+litellm is imported on first use (creating a client or sending a request), so
+importing the agent package does not pay its multi-second import cost.
+"""
+
+import os
+import asyncio
+import threading
+import importlib.util
+from typing import AsyncGenerator, Dict, Optional, Tuple
+
+import httpx
+
+from ...config.config import load_llm_config
+from ...logger import logger
+
+
+class LLMClient:
+    """Shared streaming completion client for one (model, api_base) pair"""
+
+    def __init__(
+        self,
+        model: str,
+        api_base: Optional[str] = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 120,
+        timeout: float = 600,
+        http2: bool = True,
+    ):
+        """
+        Args:
+            model: litellm model name, e.g. "dashscope/qwen-max-latest"
+            api_base: API base URL, defaults to the provider's default
+            max_connections: Max open connections of the pool
+            max_keepalive_connections: Max idle connections kept alive
+            keepalive_expiry: Seconds an idle connection is kept alive
+            timeout: Request timeout in seconds
+            http2: Use HTTP/2 if the h2 package is available
+        """
+        self.model = model
+        self.api_base = api_base
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+
+        import litellm
+
+        _, self.provider, api_key, provider_api_base = litellm.get_llm_provider(model, api_base=api_base)
+        self.api_key = api_key or os.getenv(f"{self.provider.upper()}_API_KEY")
+        self.base_url = api_base or provider_api_base
+
+        # 只有 OpenAI 兼容的 provider 才能注入自定义 client
+        self.supports_client = self.provider == "openai" or self.provider in litellm.openai_compatible_providers
+
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._openai_client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lifetime: Optional[AsyncGenerator[None, None]] = None
+
+    async def _get_openai_client(self):
+        """Get the pooled client bound to the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._openai_client is None or self._loop is not loop:
+            # httpx 连接池绑定在事件循环上，事件循环变化时需要重建，旧的连接池在它自己的事件循环中关闭
+            from openai import AsyncOpenAI
+
+            old_loop, old_lifetime = self._loop, self._lifetime
+            self._http_client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=self.limits,
+                timeout=httpx.Timeout(self.timeout),
+            )
+            self._openai_client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=self._http_client,
+                timeout=self.timeout,
+            )
+            self._loop = loop
+            self._lifetime = _client_lifetime(self._http_client)
+            _release_lifetime(old_loop, old_lifetime)
+            logger.info(
+                f"LLM client created: model={self.model}, base_url={self.base_url}, http2={self.http2}, "
+                f"max_connections={self.limits.max_connections}"
+            )
+            await self._lifetime.__anext__()
+        return self._openai_client
+
+    async def acompletion(self, **params):
+        """litellm ``acompletion`` over the shared connection pool"""
+        from litellm import acompletion
+
+        params.setdefault("model", self.model)
+        if self.api_base:
+            params.setdefault("api_base", self.api_base)
+        if self.supports_client:
+            params.setdefault("client", await self._get_openai_client())
+        return await acompletion(**params)
+
+    async def aclose(self):
+        """Close pooled connections"""
+        loop, lifetime = self._loop, self._lifetime
+        self._http_client = None
+        self._openai_client = None
+        self._loop = None
+        self._lifetime = None
+        if lifetime is not None and loop is asyncio.get_running_loop():
+            await lifetime.aclose()
+        else:
+            _release_lifetime(loop, lifetime)
+
+
+async def _client_lifetime(http_client: httpx.AsyncClient) -> AsyncGenerator[None, None]:
+    """
+    Ties a connection pool to the event loop that created it.
+
+    The generator is registered with the loop on its first iteration, so the pool
+    is closed inside its own loop when the generator is closed: explicitly, or by
+    ``loop.shutdown_asyncgens()`` when ``asyncio.run`` finishes.
+    """
+    try:
+        yield
+    finally:
+        await http_client.aclose()
+
+
+def _release_lifetime(
+    loop: Optional[asyncio.AbstractEventLoop], lifetime: Optional[AsyncGenerator[None, None]]
+) -> None:
+    """Close a replaced connection pool from outside of its event loop"""
+    if lifetime is None or loop is None or loop.is_closed():
+        # asyncio.run 结束时已由 shutdown_asyncgens 关闭
+        return
+    if loop.is_running():
+        # 另一个线程中仍在运行的事件循环
+        asyncio.run_coroutine_threadsafe(lifetime.aclose(), loop)
+    else:
+        # 已停止但未关闭的事件循环：生成器被回收时由该事件循环的 finalizer 关闭
+        logger.debug("LLM connection pool left to its stopped event loop")
+
+
+# 全局 LLM client 注册表，按 (model, api_base) 复用
+_llm_clients: Dict[Tuple[str, Optional[str]], LLMClient] = {}
+_clients_lock = threading.RLock()
+
+
+def get_llm_client(model: str, api_base: Optional[str] = None) -> LLMClient:
+    """获取 (model, api_base) 对应的全局共享 LLM client"""
+    key = (model, api_base)
+    client = _llm_clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _llm_clients.get(key)
+            if client is None:
+                config = load_llm_config()
+                client = LLMClient(
+                    model=model,
+                    api_base=api_base,
+                    max_connections=config["max_connections"],
+                    max_keepalive_connections=config["max_keepalive_connections"],
+                    keepalive_expiry=config["keepalive_expiry"],
+                    timeout=config["timeout"],
+                    http2=config["http2"],
+                )
+                _llm_clients[key] = client
+    return client
+
+
+async def close_llm_clients() -> None:
+    """关闭所有共享 LLM client 的连接"""
+    with _clients_lock:
+        clients = list(_llm_clients.values())
+        _llm_clients.clear()
+    for client in clients:
+        await client.aclose()
@@ -0,0 +1,206 @@
+"""
+Local keyframe sampling before VLM analysis.
+
+Instead of letting the provider decode a whole video at a fixed fps, ffmpeg
+(CPU only) picks keyframes locally: a frame is kept on a scene change, or when
+the last kept frame is too old, so static shots cost a few frames and busy
+shots are not missed. Frames are downscaled and capped at a frame budget, and
+the VLM receives them as an image sequence.
+"""
+
+import os
+import re
+import shutil
+import asyncio
+import tempfile
+import threading
+from typing import List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from ...config.config import load_frame_sampling_config
+from ...logger import logger
+from ...utils.ffmpeg import FFmpegError, ffmpeg_available, probe_duration, run_ffmpeg
+
+# 以图片序列作为视频输入时，服务端要求至少 4 帧
+MIN_SEQUENCE_FRAMES = 4
+
+_PTS_TIME_RE = re.compile(r"Parsed_showinfo.*?\bn:\s*(\d+).*?\bpts_time:\s*([\d.]+)")
+
+
+class SampledFrames(BaseModel):
+    """Keyframes extracted from a video"""
+    frames: List[str] = Field(..., description="Local JPEG paths, in time order")
+    timestamps: List[float] = Field(..., description="Timestamp of each frame in seconds")
+    duration: float = Field(..., description="Video duration in seconds")
+    workdir: str = Field(..., description="Temporary directory holding the frames")
+
+    @property
+    def fps(self) -> float:
+        """Average sampling rate, used by the VLM to place frames in time"""
+        return max(len(self.frames) / self.duration, 0.01) if self.duration else 1.0
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class FrameSampler:
+    """Scene-change keyframe sampler built on ffmpeg"""
+
+    def __init__(
+        self,
+        max_frames: int = 32,
+        scene_threshold: float = 0.3,
+        max_side: int = 768,
+        min_duration: float = 10,
+        timeout: float = 120,
+    ):
+        """
+        Args:
+            max_frames: Frame budget per video
+            scene_threshold: ffmpeg scene score (0-1) above which a frame starts a new shot
+            max_side: Max width/height of a frame in pixels
+            min_duration: Videos shorter than this (seconds) are not sampled
+            timeout: ffmpeg timeout in seconds
+        """
+        self.max_frames = max(MIN_SEQUENCE_FRAMES, max_frames)
+        self.scene_threshold = scene_threshold
+        self.max_side = max_side
+        self.min_duration = min_duration
+        self.timeout = timeout
+
+    @property
+    def signature(self) -> str:
+        """Identifies the sampling settings, part of the analysis cache key"""
+        return f"keyframes:{self.max_frames}:{self.scene_threshold}:{self.max_side}"
+
+    def _select_filter(self, duration: float) -> str:
+        # 场景切换帧之间至少间隔 min_gap，静态画面最多间隔 max_gap 取一帧，
+        # 最多输出约 2 倍预算的帧，再均匀裁剪到预算以内
+        min_gap = duration / (2 * self.max_frames)
+        max_gap = 2 * duration / self.max_frames
+        select = (
+            f"select='isnan(prev_selected_t)"
+            f"+gte(t-prev_selected_t\\,{max_gap:.3f})"
+            f"+gt(scene\\,{self.scene_threshold})*gte(t-prev_selected_t\\,{min_gap:.3f})'"
+        )
+        scale = (
+            f"scale=w='min(iw\\,{self.max_side})':h='min(ih\\,{self.max_side})'"
+            f":force_original_aspect_ratio=decrease"
+        )
+        return f"{select},showinfo,{scale}"
+
+    def _trim_to_budget(self, frames: List[Tuple[str, float]]) -> List[Tuple[str, float]]:
+        if len(frames) <= self.max_frames:
+            return frames
+        step = len(frames) / self.max_frames
+        return [frames[int(i * step)] for i in range(self.max_frames)]
+
+    async def sample(self, video: str) -> Optional[SampledFrames]:
+        """
+        Extract keyframes of a local path or URL.
+
+        Returns None when the video should be sent as is (ffmpeg missing, clip
+        too short, too few frames, or extraction failed).
+        """
+        if not ffmpeg_available():
+            return None
+
+        workdir = tempfile.mkdtemp(prefix="keyframes_")
+        try:
+            duration = await probe_duration(video, timeout=self.timeout)
+            if duration < self.min_duration:
+                shutil.rmtree(workdir, ignore_errors=True)
+                return None
+
+            returncode, stderr = await run_ffmpeg(
+                [
+                    "-i", video,
+                    "-vf", self._select_filter(duration),
+                    "-vsync", "vfr",
+                    "-q:v", "4",
+                    os.path.join(workdir, "%05d.jpg"),
+                ],
+                timeout=self.timeout,
+            )
+            if returncode != 0:
+                raise FFmpegError(stderr.strip().splitlines()[-1] if stderr.strip() else f"exit code {returncode}")
+
+            # showinfo 按输出顺序打印被选中的帧，与输出文件一一对应
+            timestamps = [float(m.group(2)) for m in _PTS_TIME_RE.finditer(stderr)]
+            paths = sorted(os.listdir(workdir))
+            frames = [(os.path.join(workdir, name), ts) for name, ts in zip(paths, timestamps)]
+            if len(frames) < MIN_SEQUENCE_FRAMES:
+                shutil.rmtree(workdir, ignore_errors=True)
+                return None
+
+            kept = self._trim_to_budget(frames)
+            kept_paths = {path for path, _ in kept}
+            for path, _ in frames:
+                if path not in kept_paths:
+                    os.remove(path)
+
+            logger.info(
+                f"Keyframes sampled: {video}, duration: {duration:.1f}s, "
+                f"candidates: {len(frames)}, kept: {len(kept)}"
+            )
+            return SampledFrames(
+                frames=[path for path, _ in kept],
+                timestamps=[ts for _, ts in kept],
+                duration=duration,
+                workdir=workdir,
+            )
+
+        except (FFmpegError, OSError) as e:
+            logger.warning(f"Keyframe sampling failed, sending the video as is: {video}, error: {e}")
+            shutil.rmtree(workdir, ignore_errors=True)
+            return None
+        except BaseException:
+            shutil.rmtree(workdir, ignore_errors=True)
+            raise
+
+
+# 全局帧采样器；ffmpeg 进程为 CPU 密集型，按事件循环限制并发数
+_frame_sampler: Optional[FrameSampler] = None
+_sampler_loaded = False
+_sampler_semaphore: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+_sampler_lock = threading.RLock()
+
+
+def get_frame_sampler() -> Optional[FrameSampler]:
+    """获取全局帧采样器，未启用时返回 None"""
+    global _frame_sampler, _sampler_loaded
+
+    if not _sampler_loaded:
+        with _sampler_lock:
+            if not _sampler_loaded:
+                config = load_frame_sampling_config()
+                if config["enabled"]:
+                    _frame_sampler = FrameSampler(
+                        max_frames=config["max_frames"],
+                        scene_threshold=config["scene_threshold"],
+                        max_side=config["max_side"],
+                        min_duration=config["min_duration"],
+                        timeout=config["timeout"],
+                    )
+                _sampler_loaded = True
+
+    return _frame_sampler
+
+
+async def sample_keyframes(video: str) -> Optional[SampledFrames]:
+    """Sample keyframes with the global sampler, None if disabled or not applicable"""
+    global _sampler_semaphore
+
+    sampler = get_frame_sampler()
+    if sampler is None:
+        return None
+
+    loop = asyncio.get_running_loop()
+    with _sampler_lock:
+        if _sampler_semaphore is None or _sampler_semaphore[0] is not loop:
+            _sampler_semaphore = (loop, asyncio.Semaphore(load_frame_sampling_config()["concurrency"]))
+        semaphore = _sampler_semaphore[1]
+
+    async with semaphore:
+        return await sampler.sample(video)
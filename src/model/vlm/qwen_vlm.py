@@ -1,9 +1,48 @@
 import os
-from typing import Optional
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 import dashscope
+from ...config.config import load_vlm_config
 from ...logger import logger
 
+if TYPE_CHECKING:
+    from .frame_sampler import SampledFrames
+
+# 专用 VLM 线程池（同步 SDK 调用不再占用默认线程池）
+_vlm_executor: Optional[ThreadPoolExecutor] = None
+# model -> (event loop, semaphore)，每个模型独立的并发上限
+_model_semaphores: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = {}
+_vlm_lock = threading.RLock()
+
+
+def get_vlm_executor() -> ThreadPoolExecutor:
+    """获取全局唯一的 VLM 线程池"""
+    global _vlm_executor
+
+    if _vlm_executor is None:
+        with _vlm_lock:
+            if _vlm_executor is None:
+                _vlm_executor = ThreadPoolExecutor(
+                    max_workers=load_vlm_config()["max_workers"], thread_name_prefix="vlm"
+                )
+
+    return _vlm_executor
+
+
+def get_model_semaphore(model: str) -> asyncio.Semaphore:
+    """获取当前事件循环中某个模型的并发信号量"""
+    loop = asyncio.get_running_loop()
+    with _vlm_lock:
+        entry = _model_semaphores.get(model)
+        if entry is None or entry[0] is not loop:
+            entry = (loop, asyncio.Semaphore(load_vlm_config()["max_concurrency"]))
+            _model_semaphores[model] = entry
+    return entry[1]
+
 
 class QwenVLM:
     """Qwen VLM model caller class using the official dashscope SDK."""
@@ -13,6 +52,7 @@ class QwenVLM:
         api_key: Optional[str] = None,
         model: str = "qwen3-vl-plus",
         base_http_api_url: Optional[str] = None,
+        timeout: Optional[float] = None,
     ):
         """Initializes the Qwen VLM model client.
 
@@ -20,6 +60,7 @@ class QwenVLM:
             api_key: API key, defaults to DASHSCOPE_API_KEY environment variable.
             model: Name of the model to use.
             base_http_api_url: API base URL for switching regions (e.g., Singapore region).
+            timeout: Timeout in seconds of ``acall_model``, defaults to VLM_TIMEOUT.
         """
         self.api_key = api_key or os.getenv("DASHSCOPE_API_KEY")
         self.model = model
@@ -30,6 +71,59 @@ class QwenVLM:
         if base_http_api_url:
             dashscope.base_http_api_url = base_http_api_url
 
+        config = load_vlm_config()
+        self.timeout = timeout if timeout is not None else config["timeout"]
+        # 原生异步接口（aiohttp）取消时会中断 HTTP 请求，线程池中的同步调用则只能放弃等待
+        self.native_async = config["native_async"] and hasattr(dashscope, "AioMultiModalConversation")
+
+    def _build_messages(
+        self,
+        media_url: str,
+        prompt: str,
+        media_type: str,
+        fps: float,
+        frames: Optional["SampledFrames"] = None,
+    ) -> List[Dict[str, Any]]:
+        if media_type not in ["video", "image"]:
+            raise ValueError(
+                f"Unsupported media type: {media_type}, only 'video' or 'image' are supported"
+            )
+
+        logger.debug(f"Calling Qwen VLM model: {self.model}")
+        logger.debug(f"{media_type.upper()} URL: {media_url}")
+
+        # Build content based on media type
+        content = []
+        if media_type == "video" and frames is not None:
+            # 本地关键帧以图片序列的形式发送，由 SDK 上传
+            content.append({"video": [f"file://{path}" for path in frames.frames], "fps": frames.fps})
+            timestamps = ", ".join(f"{ts:.1f}s" for ts in frames.timestamps)
+            prompt = (
+                f"The video ({frames.duration:.1f}s) is given as {len(frames.frames)} keyframes "
+                f"taken at: {timestamps}.\n\n{prompt}"
+            )
+        elif media_type == "video":
+            content.append({"video": media_url, "fps": fps})
+        else:  # image
+            content.append({"image": media_url})
+
+        content.append({"text": prompt})
+
+        return [{"role": "user", "content": content}]
+
+    def _parse_response(self, response) -> str:
+        if response.status_code == 200:
+            result_text = response.output.choices[0].message.content[0]["text"]
+            logger.debug(f"Raw model response length: {len(result_text)}")
+            return result_text
+        else:
+            error_msg = (
+                f"Model call failed, status code: {response.status_code}, "
+                f"error message: {response.message}"
+            )
+            logger.error(error_msg)
+            raise Exception(error_msg)
+
     def call_model(
         self, media_url: str, prompt: str, media_type: str = "video", fps: float = 2.0
     ) -> str:
@@ -49,45 +143,72 @@ class QwenVLM:
             ValueError: If unsupported media type is provided.
             Exception: If model call fails.
         """
-        if media_type not in ["video", "image"]:
-            raise ValueError(
-                f"Unsupported media type: {media_type}, only 'video' or 'image' are supported"
-            )
+        messages = self._build_messages(media_url, prompt, media_type, fps)
 
         try:
-            logger.debug(f"Calling Qwen VLM model: {self.model}")
-            logger.debug(f"{media_type.upper()} URL: {media_url}")
-
-            # Build content based on media type
-            content = []
-            if media_type == "video":
-                content.append({"video": media_url, "fps": fps})
-            else:  # image
-                content.append({"image": media_url})
-
-            content.append({"text": prompt})
-
-            messages = [{"role": "user", "content": content}]
-
             response = dashscope.MultiModalConversation.call(
                 api_key=self.api_key,
                 model=self.model,
                 messages=messages,
                 response_format={"type": "json_object"},
             )
-
-            if response.status_code == 200:
-                result_text = response.output.choices[0].message.content[0]["text"]
-                logger.debug(f"Raw model response length: {len(result_text)}")
-                return result_text
-            else:
-                error_msg = (
-                    f"Model call failed, status code: {response.status_code}, "
-                    f"error message: {response.message}"
-                )
-                logger.error(error_msg)
-                raise Exception(error_msg)
+            return self._parse_response(response)
 
         except Exception as e:
             logger.error(f"Qwen VLM model call failed: {e}")
             raise
+
+    async def acall_model(
+        self,
+        media_url: str,
+        prompt: str,
+        media_type: str = "video",
+        fps: float = 2.0,
+        timeout: Optional[float] = None,
+        frames: Optional["SampledFrames"] = None,
+    ) -> str:
+        """Async version of ``call_model``.
+
+        Calls are limited per model (VLM_MAX_CONCURRENCY) and time out after
+        ``timeout`` seconds. Cancelling the awaiting task cancels the request.
+        When ``frames`` is given, the keyframes are sent instead of the video URL.
+
+        Raises:
+            ValueError: If unsupported media type is provided.
+            asyncio.TimeoutError: If the call times out.
+            Exception: If model call fails.
+        """
+        messages = self._build_messages(media_url, prompt, media_type, fps, frames)
+        timeout = self.timeout if timeout is None else timeout
+
+        async with get_model_semaphore(self.model):
+            try:
+                # 本地帧由 SDK 同步上传，放到线程池中执行以免阻塞事件循环
+                if self.native_async and frames is None:
+                    call = dashscope.AioMultiModalConversation.call(
+                        api_key=self.api_key,
+                        model=self.model,
+                        messages=messages,
+                        response_format={"type": "json_object"},
+                    )
+                else:
+                    loop = asyncio.get_running_loop()
+                    call = loop.run_in_executor(
+                        get_vlm_executor(),
+                        partial(
+                            dashscope.MultiModalConversation.call,
+                            api_key=self.api_key,
+                            model=self.model,
+                            messages=messages,
+                            response_format={"type": "json_object"},
+                        ),
+                    )
+                response = await asyncio.wait_for(call, timeout=timeout or None)
+                return self._parse_response(response)
+
+            except asyncio.TimeoutError:
+                logger.error(f"Qwen VLM model call timed out after {timeout}s")
+                raise
+            except Exception as e:
+                logger.error(f"Qwen VLM model call failed: {e}")
+                raise
@@ -0,0 +1,74 @@
+"""
+Coalescing of streamed content deltas.
+"""
+
+import time
+from typing import List, Optional
+
+from ..event.events import ChunkEvent
+
+
+class ChunkCoalescer:
+    """
+    Batch consecutive content deltas into a single ChunkEvent.
+
+    A batch is emitted once it is older than ``window_ms`` or holds at least
+    ``max_bytes`` bytes of UTF-8 text; the remaining batch must be flushed by the
+    caller before any other event (tool call, completion) is emitted. With both
+    limits set to 0 coalescing is disabled.
+    """
+
+    def __init__(self, window_ms: float = 0, max_bytes: int = 0):
+        self.window = window_ms / 1000 if window_ms else 0
+        self.max_bytes = max_bytes or 0
+        self._first: Optional[ChunkEvent] = None
+        self._parts: List[str] = []
+        self._bytes = 0
+        self._started = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 or self.max_bytes > 0
+
+    def add(self, event: ChunkEvent) -> Optional[ChunkEvent]:
+        """Add a delta, returns the merged event when the batch is due"""
+        if self._first is None:
+            self._first = event
+            self._started = time.monotonic()
+
+        self._parts.append(event.delta)
+        if self.max_bytes:
+            self._bytes += len(event.delta.encode("utf-8"))
+
+        if (self.max_bytes and self._bytes >= self.max_bytes) or (
+            self.window and time.monotonic() - self._started >= self.window
+        ):
+            return self.flush()
+        return None
+
+    def flush(self) -> Optional[ChunkEvent]:
+        """Emit the pending batch, if any"""
+        first = self._first
+        if first is None:
+            return None
+
+        if len(self._parts) == 1:
+            # 只有一个 delta 时保留原始 choices
+            merged = first
+        else:
+            merged = ChunkEvent(
+                type=first.type,
+                event_id=first.event_id,
+                user_id=first.user_id,
+                session_id=first.session_id,
+                invocation_id=first.invocation_id,
+                author=first.author,
+                timestamp=first.timestamp,
+                delta="".join(self._parts),
+                model=first.model,
+            )
+
+        self._first = None
+        self._parts = []
+        self._bytes = 0
+        return merged
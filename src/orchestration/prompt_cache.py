@@ -0,0 +1,102 @@
+"""
+Prompt prefix caching helpers.
+
+Providers with prefix caching (implicit on DashScope / OpenAI, explicit
+``cache_control`` breakpoints on Anthropic and DashScope explicit cache) only
+hit the cache when the start of the request is byte-identical to an earlier
+one. Agents therefore keep the layout ``system + tools + frozen history +
+new messages``, where only the tail changes between turns; this module marks
+cache breakpoints on a per-request copy of the messages and reads the cached
+token counts back from the usage block.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# PROMPT_CACHE_CONTROL=auto 时自动添加 cache_control 的 provider
+AUTO_CACHE_CONTROL_PROVIDERS = {"anthropic"}
+
+# Anthropic 单个请求最多 4 个缓存断点
+MAX_BREAKPOINTS = 4
+
+
+def cache_control_enabled(mode: str, provider: Optional[str], model: str = "") -> bool:
+    """
+    Whether to send explicit cache_control hints
+
+    Args:
+        mode: "auto", "true" or "false" (PROMPT_CACHE_CONTROL)
+        provider: litellm provider of the model
+        model: model name
+    """
+    mode = (mode or "auto").lower()
+    if mode in ("1", "true", "yes"):
+        return True
+    if mode != "auto":
+        return False
+    return provider in AUTO_CACHE_CONTROL_PROVIDERS or "claude" in model.lower()
+
+
+def _mark(message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Copy of ``message`` whose last content block carries cache_control, None if it has no text"""
+    content = message.get("content")
+    if isinstance(content, str):
+        if not content:
+            return None
+        blocks = [{"type": "text", "text": content}]
+    elif isinstance(content, list) and content:
+        blocks = [dict(block) if isinstance(block, dict) else block for block in content]
+        if not isinstance(blocks[-1], dict):
+            return None
+    else:
+        return None
+
+    blocks[-1] = {**blocks[-1], "cache_control": CACHE_CONTROL}
+    return {**message, "content": blocks}
+
+
+def with_cache_breakpoints(messages: List[Dict[str, Any]], breakpoints: Sequence[int]) -> List[Dict[str, Any]]:
+    """
+    Shallow copy of ``messages`` with cache_control on the given message indexes
+
+    The original messages (the agent's history) are never modified, so the
+    history stays byte-identical across turns. A breakpoint on a message
+    without text (e.g. an assistant message with only tool calls) moves to the
+    closest earlier message with text.
+    """
+    marked = list(messages)
+    done = set()
+    for index in sorted({i % len(messages) for i in breakpoints if -len(messages) <= i < len(messages)}, reverse=True):
+        while index >= 0 and index not in done:
+            message = _mark(marked[index])
+            if message is not None:
+                marked[index] = message
+                done.add(index)
+                break
+            index -= 1
+        if len(done) >= MAX_BREAKPOINTS:
+            break
+    return marked
+
+
+def _get(obj, key, default=None):
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        return obj.get(key, default)
+    return getattr(obj, key, default)
+
+
+def prompt_cache_usage(usage: Any) -> Tuple[int, int]:
+    """
+    (prompt tokens, cached prompt tokens) of a completion usage block
+
+    Supports the OpenAI / DashScope ``prompt_tokens_details.cached_tokens`` and
+    the Anthropic ``cache_read_input_tokens`` fields.
+    """
+    prompt_tokens = _get(usage, "prompt_tokens", 0) or 0
+    cached_tokens = _get(_get(usage, "prompt_tokens_details"), "cached_tokens", None)
+    if cached_tokens is None:
+        cached_tokens = _get(usage, "cache_read_input_tokens", 0)
+    return prompt_tokens, cached_tokens or 0
@@ -1,18 +1,23 @@
 import os
 import json
 import time
-from litellm import acompletion
-import litellm
 from ..event.events import EventType
 from ..logger import logger
 from dotenv import load_dotenv
 from ..tool.executor import executor
-from ..tool.types import ToolCall, ToolCallResponse, ToolCallResult
-from ..event.events import Event
+from ..model.llm.client import get_llm_client
+from ..config.config import load_llm_config
+from ..tool.types import ToolCall, ToolCallResponse, ToolCallResult, ToolExeResult
+from ..event.events import Event, ChunkEvent, convert_choices_to_json
+from .coalescer import ChunkCoalescer
+from .prompt_cache import cache_control_enabled, prompt_cache_usage, with_cache_breakpoints
 import uuid
-from typing import List
+from typing import Dict, List, Optional
 load_dotenv()
 
+# 默认最大轮次，可通过环境变量 AGENT_MAX_TURNS 覆盖
+DEFAULT_MAX_TURNS = 50
+
 def _get(obj, key, default=None):
     if obj is None:
         return default
@@ -20,42 +25,6 @@ def _get(obj, key, default=None):
         return obj.get(key, default)
     return getattr(obj, key, default)
 
-def convert_choices_to_json(choices) -> str:
-    """将Choice数组对象转换为JSON字符串"""
-    try:
-        # 处理单个Choice对象的情况（向后兼容）
-        if not isinstance(choices, (list, tuple)):
-            choices = [choices]
-
-        # 转换每个Choice对象
-        choices_data = []
-        for choice in choices:
-            if hasattr(choice, "model_dump"):
-                choice_data = choice.model_dump(exclude_unset=True)
-            elif hasattr(choice, "__dict__"):
-                choice_data = {
-                    k: v for k, v in choice.__dict__.items() if v is not None
-                }
-            else:
-                choice_data = str(choice)
-            choices_data.append(choice_data)
-
-        return json.dumps(choices_data, ensure_ascii=False)
-    except Exception:
-        # 异常处理：尝试将每个元素转为基本格式
-        try:
-            fallback_data = []
-            if not isinstance(choices, (list, tuple)):
-                choices = [choices]
-            for choice in choices:
-                if hasattr(choice, "__dict__"):
-                    fallback_data.append(choice.__dict__)
-                else:
-                    fallback_data.append(str(choice))
-            return json.dumps(fallback_data, ensure_ascii=False)
-        except Exception:
-            return json.dumps([str(choices)], ensure_ascii=False)
-
 class runner():
     def __init__(self, 
         user_id:str,
@@ -68,7 +37,11 @@ class runner():
         safety=None, 
         session=None, 
         session_service=None, 
-        executor:executor=None
+        executor:executor=None,
+        max_turns: Optional[int] = None,
+        chunk_coalesce_ms: Optional[float] = None,
+        chunk_coalesce_bytes: Optional[int] = None,
+        parallel_tool_calls: Optional[bool] = None,
     ):
         self.user_id = user_id
         self.session_id = session_id
@@ -80,55 +53,133 @@ class runner():
         self.session = session
         self.session_service = session_service
         self.author = author  
-        self.api_base_url = os.getenv("DASHSCOPE_BASE_URL") 
+        llm_config = load_llm_config()
+        self.api_base_url = llm_config["api_base"]
+        # 进程内按 (model, api_base) 共享的 LLM client，复用连接池
+        self.llm_client = get_llm_client(model, self.api_base_url)
+        # 支持显式前缀缓存的 provider 在请求中标记 cache_control 断点
+        self.cache_control = cache_control_enabled(llm_config["prompt_cache_control"], self.llm_client.provider, model)
         self.executor = executor
         self.messages = None
-    
+        # 单次 run 允许的最大 LLM 轮次（每轮 = 一次模型调用 + 对应的工具执行）
+        self.max_turns = max_turns if max_turns is not None else int(os.getenv("AGENT_MAX_TURNS", DEFAULT_MAX_TURNS))
+        self.turn_durations: List[float] = []
+        # 每轮的 (prompt tokens, 命中缓存的 prompt tokens)
+        self.turn_prompt_tokens: List[tuple] = []
+        # 本次 run 开始时已有的消息数（system + 历史 + 本次用户消息），之前的部分在各轮之间保持不变
+        self._frozen_prefix = 0
+        self._has_next_turn = False
+        # 流式 content delta 合并（按时间窗口和/或字节数），默认关闭
+        self.chunk_coalesce_ms = chunk_coalesce_ms if chunk_coalesce_ms is not None else float(os.getenv("STREAM_COALESCE_MS", 0))
+        self.chunk_coalesce_bytes = chunk_coalesce_bytes if chunk_coalesce_bytes is not None else int(os.getenv("STREAM_COALESCE_BYTES", 0))
+        # 并行工具调用模式：允许模型一次返回多个 tool call，由 executor 并发执行
+        self.parallel_tool_calls = parallel_tool_calls if parallel_tool_calls is not None else os.getenv("PARALLEL_TOOL_CALLS", "false").lower() in ("1", "true", "yes")
+
     async def run(self, messages):
+        """
+        Run the agent loop iteratively.
+
+        Each turn calls the LLM once and executes the tool calls it returns; the
+        tool results are appended to ``messages`` and the next turn starts, until
+        the model stops calling tools or ``max_turns`` is reached. All events of
+        all turns are yielded from this single loop, so the per-chunk cost does
+        not grow with the number of turns.
+        """
         self.messages = messages
+        self.turn_durations = []
+        self.turn_prompt_tokens = []
+        self._frozen_prefix = len(messages)
+        self._has_next_turn = True
+        turn = 0
+
+        while self._has_next_turn:
+            turn += 1
+            self._has_next_turn = False
+            turn_start = time.time()
+
+            async for event in self._run_turn(turn):
+                yield event
+
+            turn_duration = time.time() - turn_start
+            self.turn_durations.append(turn_duration)
+            logger.info(
+                f"[{self.user_id}][{self.session_id}][{self.invocation_id}]Agent: {self.author} turn {turn} finished in {turn_duration:.2f}s"
+            )
+
+    async def _run_turn(self, turn: int):
+        """
+        Run a single turn: one streaming LLM call plus the tool calls it requests.
+
+        Sets ``self._has_next_turn`` when the tool results have been appended to the
+        history and the model should be called again.
+        """
+        chunk_id = None
+        if turn > self.max_turns:
+            logger.error(f"[{self.user_id}][{self.session_id}][{self.invocation_id}]Runner error: max turns ({self.max_turns}) exceeded")
+            yield Event(
+                type=EventType.ERROR,
+                event_id=str(uuid.uuid4()),
+                user_id=self.user_id,
+                session_id=self.session_id,
+                invocation_id=self.invocation_id,
+                author=self.author,
+                timestamp=time.time(),
+                model=self.model,
+                error=f"MaxTurnsExceeded: agent stopped after {self.max_turns} turns",
+            )
+            return
+
         try:
+            messages = self.messages
+            if self.cache_control:
+                # 断点：system（连同之前的 tools）、历史的最后一条、当前最后一条消息
+                messages = with_cache_breakpoints(self.messages, [0, self._frozen_prefix - 2, -1])
+
             completion_params = {
                 "model": self.model,
-                "messages": self.messages,
+                "messages": messages,
                 "api_base": self.api_base_url,
                 "temperature": 0.1,
-                "parallel_tool_calls": False,
+                "parallel_tool_calls": self.parallel_tool_calls,
                 "stream": True,
                 "stream_options": {"include_usage": True},
             }
             if self.tools:
-                completion_params["tools"] = self.tools
+                completion_params["tools"] = list(self.tools)
 
             # litellm._turn_on_debug()  # 调试时开启，上线时注释掉
 
-            response = await acompletion(**completion_params)
+            response = await self.llm_client.acompletion(**completion_params)
 
-            full_content = ""
+            content_parts = []
             tool_calls_dict = {}  # Accumulate tool calls by index
             completion_tokens = 0
+            prompt_usage = None
             final_finish_reason = None
-
+            coalescer = ChunkCoalescer(self.chunk_coalesce_ms, self.chunk_coalesce_bytes)
 
             async for chunk in response:
                 # print("chunck: ", json.dumps(chunk.model_dump(), indent=2, ensure_ascii=False))
+                # include_usage 时 usage 通常在最后一个不带 choices 的 chunk 中
+                usage = _get(chunk, "usage", None)
+                if usage:
+                    completion_tokens = _get(usage, "completion_tokens", 0) or 0
+                    prompt_usage = usage
+
                 choices = _get(chunk, "choices", [])
                 if not choices:
                     continue
                 
-                chunk_id = _get(chunk, "id", str(uuid.uuid4()))
+                chunk_id = _get(chunk, "id", None) or chunk_id or str(uuid.uuid4())
                 choice0 = choices[0]
                 delta = _get(choice0, "delta", None)
                 delta_tool_calls = getattr(delta, "tool_calls", None)
                 finish_reason = _get(choice0, "finish_reason", None)
 
-                usage = _get(chunk, "usage", None)
-                if usage:
-                    completion_tokens = usage.completion_tokens
-
                 content = _get(delta, "content", None) if delta is not None else None
                 if content:
-                    full_content += content
-                    yield Event(
+                    content_parts.append(content)
+                    chunk_event = ChunkEvent(
                         type=EventType.RESPONSE_CHUNK,
                         event_id=chunk_id,
                         user_id=self.user_id,
@@ -136,14 +187,23 @@ class runner():
                         invocation_id=self.invocation_id,
                         author=self.author,
                         timestamp=time.time(),
-                        content=convert_choices_to_json(choices),
+                        delta=content,
                         model=self.model,
+                        choices=choices,
                     )
+                    if coalescer.enabled:
+                        chunk_event = coalescer.add(chunk_event)
+                    if chunk_event is not None:
+                        yield chunk_event
                 
                 # Handle tool calls (they accumulate across chunks)   
                 if delta_tool_calls:
+                    pending = coalescer.flush()
+                    if pending is not None:
+                        yield pending
+
                     # emit the tool call event when tool call are detected
-                    yield Event(
+                    yield ChunkEvent(
                         type=EventType.TOOL_CALL,
                         event_id=chunk_id,
                         user_id=self.user_id,
@@ -151,8 +211,11 @@ class runner():
                         invocation_id=self.invocation_id,
                         author=self.author,
                         timestamp=time.time(),
-                        content=convert_choices_to_json(choices),
+                        delta="".join(
+                            _get(_get(tc, "function"), "arguments", None) or "" for tc in delta_tool_calls
+                        ),
                         model=self.model,
+                        choices=choices,
                     )
                     for tool_call in delta_tool_calls:
                         index = getattr(tool_call, "index", 0)
@@ -194,6 +257,19 @@ class runner():
                     final_finish_reason = finish_reason
                     # break
 
+            pending = coalescer.flush()
+            if pending is not None:
+                yield pending
+            full_content = "".join(content_parts)
+
+            if prompt_usage is not None:
+                prompt_tokens, cached_tokens = prompt_cache_usage(prompt_usage)
+                self.turn_prompt_tokens.append((prompt_tokens, cached_tokens))
+                logger.info(
+                    f"[{self.user_id}][{self.session_id}][{self.invocation_id}]Agent: {self.author} turn {turn} "
+                    f"prompt tokens: {prompt_tokens} (cached: {cached_tokens}, uncached: {prompt_tokens - cached_tokens})"
+                )
+
             ## handle tool calls
             tool_calls = None
             if tool_calls_dict:
@@ -212,7 +288,7 @@ class runner():
             # Emit complete event
             complete_event = Event(
                 type=EventType.COMPLETE_RESPONSE if final_finish_reason == "stop" else EventType.COMPLETE_CHOICE,
-                event_id=chunk_id,
+                event_id=chunk_id or str(uuid.uuid4()),
                 user_id=self.user_id,
                 session_id=self.session_id,
                 invocation_id=self.invocation_id,
@@ -241,17 +317,33 @@ class runner():
             tool_response = ToolCallResponse(content=full_content, tool_calls=tool_calls)
 
             # Execuate tool calls and collect results
-            tool_results: List[ToolCallResult] = []
+            # 并行执行时结果按完成顺序到达，先按 tool_call_id 收集，再按模型给出的调用顺序写入历史
+            results_by_id: Dict[str, ToolCallResult] = {}
+            tool_call_ids = {tc.id for tc in tool_calls}
 
             async for tool_event in self.executor.handle_tool_call_streaming(tool_response):
                 yield tool_event
 
-                # original_tool_call_ids = [tc.id for tc in tool_calls]
-                # event_tool_call_id = tool_event.tool_result.tool_call_id
+                if (tool_event.type in [EventType.TOOL_RESPONSE, EventType.TASK_COMPLETE, EventType.TASK_ERROR, EventType.ERROR]
+                and tool_event.tool_result is not None
+                and tool_event.tool_result.tool_call_id in tool_call_ids):
+                    results_by_id.setdefault(tool_event.tool_result.tool_call_id, tool_event.tool_result)
 
-                if (tool_event.type in [EventType.TOOL_RESPONSE, EventType.TASK_COMPLETE, EventType.TASK_ERROR]
-                and tool_event.tool_result.tool_call_id in [tc.id for tc in tool_calls]):
-                    tool_results.append(tool_event.tool_result)
+            tool_results: List[ToolCallResult] = []
+            for tc in tool_calls:
+                tool_result = results_by_id.get(tc.id)
+                if tool_result is None:
+                    # 每个 tool call 都必须有对应的 tool 消息，否则下一轮请求会被拒绝
+                    tool_result = ToolCallResult(
+                        tool_call_id=tc.id,
+                        function_name=tc.function.name,
+                        result=ToolExeResult(
+                            success=False,
+                            error="Tool call produced no result",
+                            result="Tool call produced no result",
+                        ),
+                    )
+                tool_results.append(tool_result)
 
             assistant_message = {"role": "assistant", "content": full_content}
             if tool_calls:
@@ -286,15 +378,15 @@ class runner():
             # print("*"*100)
             # print("messages: ", json.dumps(self.messages, indent=2, ensure_ascii=False))
             # print("*"*100)
-            print("")
-            async for chunk in self.run(self.messages):
-                    yield chunk
+
+            # 工具结果已写入历史，进入下一轮模型调用
+            self._has_next_turn = True
 
         except Exception as e:
             logger.error(f"[{self.user_id}][{self.session_id}][{self.invocation_id}]Runner error: {e}")
             yield Event(
                 type=EventType.ERROR,
-                event_id=chunk_id if "chunk_id" in locals() and chunk_id else str(uuid.uuid4()),
+                event_id=chunk_id or str(uuid.uuid4()),
                 user_id=self.user_id,
                 session_id=self.session_id,
                 invocation_id=self.invocation_id,
@@ -0,0 +1,5 @@
+PARALLEL_TOOL_CALLS_PROMPT = """
+Parallel tool calls are enabled:
+- When several tool calls do not depend on each other (e.g. uploading several files, or analyzing several already uploaded files), issue them together in a single response instead of one per response.
+- Tool calls that need the result of another call (e.g. MediaAnalyze needs the TOS URL returned by UploadToTOS) must still wait for that result in a later response.
+"""
@@ -0,0 +1,381 @@
+"""
+异步 MySQL 会话服务
+
+基于 SQLAlchemy asyncio（aiomysql / asyncmy 驱动），所有数据库操作都在事件循环中
+异步执行，慢查询或慢写入不会阻塞同一进程中其他用户的流式输出。
+SQL 与 MySQLSessionService 共用，同样支持事件写回模式。
+
+使用示例:
+    service = AsyncMySQLSessionService()  # 使用进程共享的异步引擎
+    session = await service.get_session(user_id="u1", session_id="s1")
+    ...
+    await service.aclose()
+"""
+
+import json
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from ..db.engine import get_async_engine
+from ..config.config import load_session_config
+from ..event.events import Event
+from ..logger.logging import logger
+from .base_session import BaseSessionService, MessagePage, SessionList
+from .mysql_service import (
+    ACCUMULATED_USAGE_SQL,
+    ADD_SESSION_USAGE_SQL,
+    CHECK_SESSION_SQL,
+    DELETE_EVENTS_SQL,
+    DELETE_SESSION_SQL,
+    GET_MESSAGES_SQL,
+    GET_SESSION_SQL,
+    INSERT_EVENT_SQL,
+    INSERT_MESSAGE_SQL,
+    INSERT_SESSION_SQL,
+    LIST_SESSIONS_SQL,
+    MESSAGE_ROLES,
+    UPDATE_SESSION_TIME_SQL,
+    WriteBehindMixin,
+    event_params,
+    events_sql,
+    fill_window,
+    message_cursor,
+    message_params,
+    messages_page_params,
+    messages_page_sql,
+    parse_state,
+    row_to_event,
+)
+from .types import Session
+
+
+class AsyncMySQLSessionService(WriteBehindMixin, BaseSessionService):
+    """
+    Async MySQL session service class
+    """
+
+    def __init__(
+        self,
+        db_url: Optional[str] = None,
+        write_behind: Optional[bool] = None,
+        flush_interval: Optional[float] = None,
+        max_batch_events: Optional[int] = None,
+        engine: Optional[Any] = None,
+        **kwargs,
+    ):
+        """
+        初始化异步MySQL会话服务（首次使用时才建立连接）
+
+        未传入 db_url 和 engine 时使用进程共享的异步引擎，只有服务自己创建的引擎才会在 aclose 时释放。
+
+        Args:
+            db_url: 数据库连接URL，需使用异步驱动，如 mysql+aiomysql://；传入时单独创建引擎
+            write_behind: 是否启用事件写回模式，默认 SESSION_WRITE_BEHIND
+            flush_interval: 写回模式下定时写入的间隔（秒），默认 SESSION_FLUSH_INTERVAL
+            max_batch_events: 写回模式下单个会话攒够多少事件立即写入，默认 SESSION_FLUSH_MAX_EVENTS
+            engine: 外部共享的异步引擎
+            **kwargs: create_async_engine 的参数
+        """
+        self._init_write_behind(write_behind, flush_interval, max_batch_events)
+        self._owns_engine = engine is None and db_url is not None
+        if self._owns_engine:
+            self.engine = create_async_engine(db_url, **kwargs)
+        else:
+            self.engine = engine if engine is not None else get_async_engine()
+        self.SessionLocal = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+
+    async def ping(self) -> None:
+        """测试连接"""
+        try:
+            async with self.engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            logger.info("MySQL连接成功")
+        except Exception as e:
+            logger.error(f"MySQL连接失败: {e}")
+            raise e
+
+    async def create_session(
+        self,
+        *,
+        user_id: str,
+        session_id: Optional[str] = None,
+        state: Optional[Dict[str, Any]] = None,
+    ) -> Session:
+        """创建会话"""
+        if session_id is None:
+            session_id = str(uuid.uuid4())
+
+        if state is None:
+            state = {}
+
+        current_time = time.time()
+
+        try:
+            async with self.SessionLocal() as db_session:
+                await db_session.execute(
+                    INSERT_SESSION_SQL,
+                    {
+                        "session_id": session_id,
+                        "user_id": user_id,
+                        "session_state": json.dumps(state, ensure_ascii=False),
+                        "current_time": current_time,
+                    }
+                )
+                await db_session.commit()
+        except SQLAlchemyError as e:
+            logger.error(f"[{user_id}][{session_id}]创建会话失败: {e}")
+            raise e
+
+        logger.info(f"[{user_id}][{session_id}]创建会话成功")
+        return Session(
+            session_id=session_id,
+            user_id=user_id,
+            state=state,
+            last_updated_time=current_time,
+        )
+
+    async def get_session(
+        self,
+        *,
+        user_id: str,
+        session_id: str,
+        config: Optional[Any] = None,
+    ) -> Optional[Session]:
+        """获取会话"""
+        try:
+            async with self.SessionLocal() as db_session:
+                session_result = (await db_session.execute(
+                    GET_SESSION_SQL,
+                    {"session_id": session_id, "user_id": user_id},
+                )).fetchone()
+
+                if not session_result:
+                    return None
+
+                event_results = (await db_session.execute(
+                    events_sql(config),
+                    {"session_id": session_id},
+                )).fetchall()
+
+            events = [row_to_event(event_row, user_id, session_id) for event_row in event_results]
+            session = Session(
+                session_id=session_id,
+                user_id=user_id,
+                events=events,
+                state=parse_state(session_result.session_state),
+                last_updated_time=float(session_result.last_update_time),
+            )
+
+            logger.info(f"[{user_id}][{session_id}]获取会话成功, event count: {len(events)}")
+            return session
+
+        except SQLAlchemyError as e:
+            logger.error(f"[{user_id}][{session_id}]获取会话失败: {e}")
+            raise e
+
+    async def list_sessions(self, *, user_id: str) -> SessionList:
+        """列出用户的会话"""
+        try:
+            async with self.SessionLocal() as db_session:
+                results = (await db_session.execute(LIST_SESSIONS_SQL, {"user_id": user_id})).fetchall()
+        except SQLAlchemyError as e:
+            logger.error(f"[{user_id}] Sessions listing failed: {e}")
+            raise ValueError(f"[{user_id}] Sessions listing failed: {e}")
+
+        sessions = [
+            Session(
+                session_id=row.session_id,
+                user_id=row.user_id,
+                state=parse_state(row.session_state),
+                last_updated_time=float(row.last_update_time),
+            )
+            for row in results
+        ]
+        logger.debug(f"[{user_id}] Sessions Listed successfully: {len(sessions)} sessions")
+        return SessionList(sessions=sessions)
+
+    async def delete_session(self, *, user_id: str, session_id: str) -> None:
+        """删除会话"""
+        try:
+            async with self.SessionLocal() as db_session:
+                # 删除会话相关的所有事件
+                events_result = await db_session.execute(
+                    DELETE_EVENTS_SQL, {"session_id": session_id, "user_id": user_id}
+                )
+                session_result = await db_session.execute(
+                    DELETE_SESSION_SQL, {"user_id": user_id, "session_id": session_id}
+                )
+                await db_session.commit()
+        except SQLAlchemyError as e:
+            logger.error(f"[{user_id}][{session_id}]删除会话失败: {e}")
+            raise ValueError(f"[{user_id}][{session_id}]删除会话失败: {e}")
+
+        if session_result.rowcount == 0:
+            raise ValueError(f"[{user_id}][{session_id}]会话不存在")
+
+        logger.info(f"[{user_id}][{session_id}]会话删除成功, 删除事件: {events_result.rowcount}")
+
+    async def _insert_messages(self, db_session, user_id: str, session_id: str, events: List[Event]) -> None:
+        """在当前事务中插入消息记录（只保留 user_message 和 complete_response）"""
+        events = [event for event in events if event.type in MESSAGE_ROLES]
+        if not events:
+            return
+
+        params = {"user_id": user_id, "session_id": session_id}
+        usage = sum(event.usage or 0 for event in events)
+        await db_session.execute(ADD_SESSION_USAGE_SQL, {**params, "usage": usage})
+        row = (await db_session.execute(ACCUMULATED_USAGE_SQL, params)).fetchone()
+        accumulated_usage = row.accumulated_usage - usage if row else 0
+
+        await db_session.execute(INSERT_MESSAGE_SQL, message_params(events, accumulated_usage))
+
+    async def _write_events(
+        self,
+        user_id: str,
+        session_id: str,
+        events: List[Event],
+        base_time: float,
+        current_time: float,
+    ) -> None:
+        """在一个事务中写入一批事件及其消息，并更新会话时间"""
+        async with self.SessionLocal() as db_session:
+            # 检查会话是否存在且未过期
+            session_result = (await db_session.execute(
+                CHECK_SESSION_SQL,
+                {"session_id": session_id, "user_id": user_id},
+            )).fetchone()
+
+            if not session_result:
+                raise ValueError(f"会话不存在: {session_id}")
+
+            # 检查会话是否过期（简单的并发控制）
+            if session_result.last_update_time > base_time + 1:  # 允许1秒误差
+                raise ValueError(f"会话已过期，请重新获取: {session_id}")
+
+            await db_session.execute(INSERT_EVENT_SQL, [event_params(event) for event in events])
+            await self._insert_messages(db_session, user_id, session_id, events)
+            await db_session.execute(
+                UPDATE_SESSION_TIME_SQL,
+                {"current_time": current_time, "session_id": session_id},
+            )
+            await db_session.commit()
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        """向会话添加事件
+
+        写回模式下事件先缓存在内存中，由 flush 批量写入数据库
+        """
+        if self.write_behind:
+            return await self._buffer_event(session, event)
+
+        try:
+            current_time = time.time()
+            await self._write_events(
+                session.user_id, session.session_id, [event], session.last_updated_time, current_time
+            )
+        except SQLAlchemyError as e:
+            logger.error(f"[{session.user_id}] [{session.session_id}] Event addition failed: {e}")
+            raise ValueError(f"添加事件失败: {e}") from e
+
+        # 更新内存中的会话对象
+        session.events.append(event)
+        session.last_updated_time = current_time
+
+        logger.debug(
+            f"[{session.user_id}] [{session.session_id}] Event added successfully: {event.event_id} to session"
+        )
+        return event
+
+    async def get_messages(self, user_id: str, session_id: str) -> List[Dict[str, Any]]:
+        """根据user_id和session_id获取指定会话的消息"""
+        try:
+            async with self.SessionLocal() as db_session:
+                result = await db_session.execute(
+                    GET_MESSAGES_SQL,
+                    {"user_id": user_id, "session_id": session_id},
+                )
+                return result.mappings().all()
+        except SQLAlchemyError as e:
+            logger.error(f"[{user_id}] [{session_id}] Message retrieval failed: {e}")
+            raise ValueError(f"Failed to retrieve messages: {e}") from e
+
+    async def aget_messages(self, user_id: str, session_id: str) -> List[Dict[str, Any]]:
+        return await self.get_messages(user_id, session_id)
+
+    async def get_messages_page(
+        self,
+        user_id: str,
+        session_id: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        descending: bool = False,
+    ) -> MessagePage:
+        """分页获取会话的消息，参数同 MySQLSessionService.get_messages_page"""
+        limit = limit or load_session_config()["history_page_size"]
+        try:
+            async with self.SessionLocal() as db_session:
+                result = await db_session.execute(
+                    messages_page_sql(cursor, descending),
+                    messages_page_params(user_id, session_id, limit, cursor),
+                )
+                messages = [dict(row) for row in result.mappings()]
+        except SQLAlchemyError as e:
+            logger.error(f"[{user_id}] [{session_id}] Message retrieval failed: {e}")
+            raise ValueError(f"Failed to retrieve messages: {e}") from e
+
+        next_cursor = message_cursor(messages[-1]) if len(messages) == limit else None
+        return MessagePage(messages=messages, next_cursor=next_cursor)
+
+    async def aget_recent_messages(
+        self,
+        user_id: str,
+        session_id: str,
+        max_tokens: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """从最新的消息往前加载，token 总量达到 max_tokens 时停止，返回按时间正序的消息"""
+        if max_tokens is None:
+            max_tokens = load_session_config()["history_max_tokens"]
+        if not max_tokens:
+            return await self.get_messages(user_id, session_id)
+
+        window: List[Dict[str, Any]] = []
+        cursor = None
+        while True:
+            page = await self.get_messages_page(user_id, session_id, cursor=cursor, descending=True)
+            if fill_window(window, page.messages, max_tokens) or page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+
+        window.reverse()
+        return window
+
+    async def aiter_messages(
+        self,
+        user_id: str,
+        session_id: str,
+        page_size: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """按时间正序逐页读取会话的全部消息（用于导出），内存中只保留一页"""
+        cursor = None
+        while True:
+            page = await self.get_messages_page(user_id, session_id, page_size, cursor)
+            for message in page.messages:
+                yield message
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+
+    async def aclose(self) -> None:
+        """写入缓存的事件并关闭数据库连接；共享引擎不释放"""
+        try:
+            await self.flush()
+        finally:
+            self._close_write_behind()
+            if self._owns_engine:
+                await self.engine.dispose()
+                logger.info("MySQL connection closed")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, AsyncIterator
 from .types import Session
 from abc import ABC, abstractmethod
 from ..event.events import Event
@@ -12,7 +12,18 @@ class SessionList(BaseModel):
     sessions: List[Session] = Field(default_factory=list, description="Sessions")
 
 class GetSessionConfig(BaseModel):
-    pass
+    """
+    Options for loading the events of a session
+    """
+    num_recent_events: Optional[int] = Field(None, description="Only load the most recent N events")
+    after_timestamp: Optional[float] = Field(None, description="Only load events after this unix timestamp")
+
+class MessagePage(BaseModel):
+    """
+    A page of conversation messages, ``next_cursor`` is None on the last page
+    """
+    messages: List[Dict[str, Any]] = Field(default_factory=list, description="Messages")
+    next_cursor: Optional[str] = Field(None, description="Cursor of the next page")
 
 class BaseSessionService(ABC):
     """
@@ -80,6 +91,42 @@ class BaseSessionService(ABC):
         """
         pass
 
+    async def flush(self, session: Optional[Session] = None) -> None:
+        """
+        Persist buffered events (no-op for services that write through)
+        """
+        pass
+
+    async def aget_messages(self, user_id: str, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Get the conversation messages of a session
+        """
+        return []
+
+    async def aget_recent_messages(
+        self,
+        user_id: str,
+        session_id: str,
+        max_tokens: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Get the most recent messages of a session that fit in ``max_tokens``
+        """
+        return await self.aget_messages(user_id, session_id)
+
+    async def aiter_messages(self, user_id: str, session_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over the whole conversation history of a session
+        """
+        for message in await self.aget_messages(user_id, session_id):
+            yield message
+
+    async def aclose(self) -> None:
+        """
+        Release resources, persisting buffered events first
+        """
+        await self.flush()
+
     def _update_session_state(
         self,
         session: Session,
@@ -0,0 +1,37 @@
+"""
+会话服务工厂
+
+按 SESSION_BACKEND 创建会话服务，服务使用进程共享的数据库引擎（见 src.db.engine），
+创建开销很小，可以为每个请求创建，也可以在应用启动时创建一个注入所有智能体。
+"""
+
+from typing import Any, Optional
+
+from ..config.config import load_session_config
+from .base_session import BaseSessionService
+
+
+def create_session_service(backend: Optional[str] = None, **kwargs: Any) -> BaseSessionService:
+    """
+    创建会话服务
+
+    Args:
+        backend: mysql 或 async_mysql，默认 SESSION_BACKEND
+        **kwargs: 会话服务的参数，如 write_behind、engine
+
+    Raises:
+        ValueError: 不支持的后端
+    """
+    backend = backend or load_session_config()["backend"]
+
+    if backend == "async_mysql":
+        # 异步驱动是可选依赖，只在启用时导入
+        from .async_mysql_service import AsyncMySQLSessionService
+
+        return AsyncMySQLSessionService(**kwargs)
+    if backend == "mysql":
+        from .mysql_service import MySQLSessionService
+
+        return MySQLSessionService(**kwargs)
+
+    raise ValueError(f"不支持的会话存储后端: {backend}")
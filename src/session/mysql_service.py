@@ -3,25 +3,492 @@ from ..logger.logging import logger
 from .base_session import BaseSessionService
 from ..session.types import Session
 from ..event.events import Event, EventType
-from .base_session import SessionList
-from typing import Optional, Dict, Any, List
+from .base_session import SessionList, MessagePage
+from typing import Optional, Dict, Any, List, AsyncIterator
 import uuid
+from abc import ABC, abstractmethod
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
+from ..config.config import load_session_config
+from ..db.engine import get_engine
+from ..utils.count_tokens import count_tokens
+import asyncio
 import time
 import json
 
-class MySQLSessionService(BaseSessionService):
+
+# 同步和异步会话服务共用的 SQL
+INSERT_SESSION_SQL = text(
+    """
+    INSERT INTO sessions
+    (session_id, user_id, session_state, created_at, updated_at)
+    VALUES (:session_id, :user_id, :session_state, FROM_UNIXTIME(:current_time), FROM_UNIXTIME(:current_time))
+    """
+)
+
+GET_SESSION_SQL = text(
+    """
+    SELECT session_id, user_id, session_state, UNIX_TIMESTAMP(updated_at) AS last_update_time
+    FROM sessions
+    WHERE user_id = :user_id AND session_id = :session_id
+    """
+)
+
+LIST_SESSIONS_SQL = text(
+    """
+    SELECT session_id, user_id, session_state, UNIX_TIMESTAMP(updated_at) AS last_update_time
+    FROM sessions
+    WHERE user_id = :user_id
+    ORDER BY updated_at DESC
+    """
+)
+
+DELETE_EVENTS_SQL = text(
+    """
+    DELETE FROM events
+    WHERE session_id = :session_id AND user_id = :user_id
+    """
+)
+
+DELETE_SESSION_SQL = text(
+    """
+    DELETE FROM sessions
+    WHERE user_id = :user_id AND session_id = :session_id
+    """
+)
+
+CHECK_SESSION_SQL = text(
+    """
+    SELECT UNIX_TIMESTAMP(updated_at) as last_update_time
+    FROM sessions
+    WHERE session_id = :session_id AND user_id = :user_id
+    """
+)
+
+# 多条参数执行时 pymysql / aiomysql 会合并为一条多行 INSERT
+INSERT_EVENT_SQL = text(
+    """
+    INSERT INTO events (
+        event_type, event_id, session_id, user_id, timestamp,
+        invocation_id, author, content, tool_calls, tool_result,
+        finish_reason, model, error
+    ) VALUES (
+        :p_type, :event_id, :session_id, :user_id, FROM_UNIXTIME(:timestamp),
+        :invocation_id, :author, :content, :tool_calls, :tool_result,
+        :finish_reason, :model, :error
+    )
+    """
+)
+
+UPDATE_SESSION_TIME_SQL = text(
+    """
+    UPDATE sessions
+    SET updated_at = FROM_UNIXTIME(:current_time)
+    WHERE session_id = :session_id
+    """
+)
+
+# 会话的累计token使用量记录在 sessions 表中，写入消息时在同一事务内原子递增，
+# UPDATE 持有行锁直到提交，并发写入同一会话时累计值不会错乱
+ADD_SESSION_USAGE_SQL = text(
+    """
+    UPDATE sessions
+    SET accumulated_usage = accumulated_usage + :usage
+    WHERE user_id = :user_id AND session_id = :session_id
+    """
+)
+
+ACCUMULATED_USAGE_SQL = text(
+    """
+    SELECT accumulated_usage
+    FROM sessions
+    WHERE user_id = :user_id AND session_id = :session_id
+    """
+)
+
+INSERT_MESSAGE_SQL = text(
+    """
+    INSERT INTO messages
+    (event_id, user_id, session_id, role, content, created_at, token_usage, accumulated_usage)
+    VALUES (:event_id, :user_id, :session_id, :role, :content, FROM_UNIXTIME(:timestamp), :token_usage, :accumulated_usage)
+    ON DUPLICATE KEY UPDATE
+        content = VALUES(content),
+        created_at = VALUES(created_at)
+    """
+)
+
+GET_MESSAGES_SQL = text(
+    """
+    SELECT event_id, user_id, session_id, role, content,
+        UNIX_TIMESTAMP(created_at) AS timestamp
+    FROM messages
+    WHERE user_id = :user_id AND session_id = :session_id
+    ORDER BY created_at ASC, event_id ASC
+    """
+)
+
+# 只有 user_message 和 complete_response 类型的事件写入消息表
+MESSAGE_ROLES = {EventType.USER_MESSAGE: "user", EventType.COMPLETE_RESPONSE: "assistant"}
+
+
+def events_sql(config: Optional[Any] = None):
+    """查询会话事件的 SQL（按时间倒序）"""
+    # 构造event查询条件
+    event_conditions = ["session_id = :session_id"]
+    if config and config.after_timestamp is not None:
+        event_conditions.append(f"timestamp > FROM_UNIXTIME({float(config.after_timestamp)})")
+
+    event_sql = f"""
+    SELECT event_type, event_id, UNIX_TIMESTAMP(timestamp) as timestamp, invocation_id, author, content,
+           tool_calls, tool_result, finish_reason, model, error
+    FROM events
+    WHERE {' AND '.join(event_conditions)}
+    ORDER BY timestamp DESC
+    """
+
+    if config and config.num_recent_events:
+        event_sql += f" LIMIT {int(config.num_recent_events)}"
+    return text(event_sql)
+
+
+def messages_page_sql(cursor: Optional[str] = None, descending: bool = False):
+    """
+    按 (created_at, event_id) 键集分页查询消息的 SQL
+
+    不使用 OFFSET，每页都沿 (user_id, session_id, created_at) 索引从游标处开始读取。
+    """
+    message_conditions = ["user_id = :user_id", "session_id = :session_id"]
+    if cursor is not None:
+        op = "<" if descending else ">"
+        message_conditions.append(
+            f"(created_at {op} FROM_UNIXTIME(:cursor_time) "
+            f"OR (created_at = FROM_UNIXTIME(:cursor_time) AND event_id {op} :cursor_id))"
+        )
+
+    order = "DESC" if descending else "ASC"
+    return text(
+        f"""
+        SELECT event_id, user_id, session_id, role, content, accumulated_usage,
+            UNIX_TIMESTAMP(created_at) AS timestamp
+        FROM messages
+        WHERE {' AND '.join(message_conditions)}
+        ORDER BY created_at {order}, event_id {order}
+        LIMIT :limit
+        """
+    )
+
+
+def messages_page_params(
+    user_id: str, session_id: str, limit: int, cursor: Optional[str] = None
+) -> Dict[str, Any]:
+    """messages_page_sql 的查询参数"""
+    params = {"user_id": user_id, "session_id": session_id, "limit": limit}
+    if cursor is not None:
+        # 游标格式: <created_at 的 unix 时间戳>|<event_id>
+        cursor_time, cursor_id = cursor.split("|", 1)
+        params.update(cursor_time=cursor_time, cursor_id=cursor_id)
+    return params
+
+
+def message_cursor(message: Dict[str, Any]) -> str:
+    """消息之后（或之前）一页的游标"""
+    return f"{message['timestamp']}|{message['event_id']}"
+
+
+def fill_window(window: List[Dict[str, Any]], messages: List[Dict[str, Any]], max_tokens: int) -> bool:
+    """
+    将按时间倒序的消息加入窗口，直到 token 总量达到上限
+
+    至少保留最近的一条消息。
+
+    Returns:
+        窗口是否已满
+    """
+    used = sum(count_tokens(message["content"] or "") for message in window)
+    for message in messages:
+        used += count_tokens(message["content"] or "")
+        if window and used > max_tokens:
+            return True
+        window.append(message)
+    return False
+
+
+def parse_state(session_state: Optional[str]) -> Dict[str, Any]:
+    """解析会话状态"""
+    try:
+        return json.loads(session_state)
+    except (json.JSONDecodeError, TypeError):
+        return {}
+
+
+def row_to_event(event_row, user_id: str, session_id: str) -> Event:
+    """events 表的一行转换为 Event"""
+    # 解析 JSON 字段
+    try:
+        tool_calls = json.loads(event_row.tool_calls) if event_row.tool_calls else None
+    except (json.JSONDecodeError, TypeError):
+        tool_calls = None
+
+    try:
+        tool_result = json.loads(event_row.tool_result) if event_row.tool_result else None
+    except (json.JSONDecodeError, TypeError):
+        tool_result = None
+
+    # 创建Event对象
+    # todo
+    # 不是所有的event都添加到events中，而是只保留user和main_agent的最终回复;
+    return Event(
+        type=event_row.event_type,
+        event_id=event_row.event_id,
+        user_id=user_id,
+        session_id=session_id,
+        invocation_id=event_row.invocation_id or "",
+        author=event_row.author or "main_agent",
+        timestamp=float(event_row.timestamp),
+        content=event_row.content,
+        tool_calls=tool_calls,
+        tool_result=tool_result,
+        finish_reason=event_row.finish_reason,
+        model=event_row.model,
+        error=event_row.error,
+    )
+
+
+def event_params(event: Event) -> Dict[str, Any]:
+    """events 表一行的插入参数"""
+    event_dict = event.model_dump()
+    tool_calls_json = json.dumps(event_dict.get("tool_calls"), ensure_ascii=False) if event_dict.get("tool_calls") else None
+    tool_result_json = json.dumps(event_dict.get("tool_result"), ensure_ascii=False) if event_dict.get("tool_result") else None
+    return {
+        "p_type": event.type,
+        "event_id": event.event_id,
+        "session_id": event.session_id,
+        "user_id": event.user_id,
+        "timestamp": event.timestamp,
+        "invocation_id": event.invocation_id,
+        "author": event.author,
+        "content": event.content,
+        "tool_calls": tool_calls_json,
+        "tool_result": tool_result_json,
+        "finish_reason": event.finish_reason,
+        "model": event.model,
+        "error": event.error,
+    }
+
+
+def message_params(events: List[Event], accumulated_usage: int) -> List[Dict[str, Any]]:
+    """
+    messages 表的插入参数
+
+    Args:
+        events: 需要写入消息表的事件（已过滤）
+        accumulated_usage: 写入前会话的累计token使用量
+    """
+    params = []
+    for event in events:
+        accumulated_usage += event.usage or 0
+        params.append({
+            "event_id": event.event_id,
+            "user_id": event.user_id,
+            "session_id": event.session_id,
+            "role": MESSAGE_ROLES[event.type],
+            "content": event.content,
+            "timestamp": event.timestamp,
+            "token_usage": event.usage or 0,
+            "accumulated_usage": accumulated_usage,
+        })
+    return params
+
+
+class _PendingEvents:
+    """写回模式下某个会话尚未写入的事件"""
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.events: List[Event] = []
+        # 写入前数据库中会话的更新时间，以及写入后的更新时间
+        self.base_time = session.last_updated_time
+        self.updated_time = session.last_updated_time
+        # 连续写入失败的次数
+        self.failures = 0
+
+
+class WriteBehindMixin(ABC):
+    """
+    事件写回：按会话缓冲事件，定时或攒够一批后在一个事务中写入
+
+    子类实现 _write_events 协程完成一批事件的写入。写入失败的批次在之后的写入中重试，
+    会话冲突（_write_events 抛出 ValueError）或连续失败 max_flush_retries 次后丢弃。
+    """
+
+    def _init_write_behind(
+        self,
+        write_behind: Optional[bool] = None,
+        flush_interval: Optional[float] = None,
+        max_batch_events: Optional[int] = None,
+    ) -> None:
+        config = load_session_config()
+        self.write_behind = config["write_behind"] if write_behind is None else write_behind
+        self.flush_interval = config["flush_interval"] if flush_interval is None else flush_interval
+        self.max_batch_events = config["max_batch_events"] if max_batch_events is None else max_batch_events
+        self.max_flush_retries = config["flush_max_retries"]
+        # session_id -> 未写入的事件
+        self._pending: Dict[str, _PendingEvents] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    @abstractmethod
+    async def _write_events(
+        self,
+        user_id: str,
+        session_id: str,
+        events: List[Event],
+        base_time: float,
+        current_time: float,
+    ) -> None:
+        """
+        在一个事务中写入一批事件及其消息，并更新会话时间
+
+        Raises:
+            ValueError: 会话不存在或已被其他请求修改，重试也无法写入
+        """
+        pass
+
+    async def _buffer_event(self, session: Session, event: Event) -> Event:
+        """缓存事件，攒够一批立即写入，否则等待定时写入"""
+        pending = self._pending.get(session.session_id)
+        if pending is None:
+            pending = _PendingEvents(session)
+            self._pending[session.session_id] = pending
+
+        current_time = time.time()
+        pending.events.append(event)
+        pending.updated_time = current_time
+
+        # 更新内存中的会话对象
+        session.events.append(event)
+        session.last_updated_time = current_time
+
+        if len(pending.events) >= self.max_batch_events:
+            await self.flush(session)
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+        return event
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self.flush_interval)
+        try:
+            await self.flush()
+        except Exception as e:
+            # 未写入的事件保留在缓冲区，下次定时写入时重试
+            logger.error(f"定时写入事件失败: {e}")
+        # 写入失败的事件和写入期间新缓存的事件由下一次定时写入处理
+        if self._pending:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def flush(self, session: Optional[Session] = None) -> None:
+        """
+        将缓存的事件写入数据库，每个会话一个事务
+
+        Args:
+            session: 只写入该会话的事件，默认写入全部会话
+
+        Raises:
+            ValueError: 写入失败时抛出异常，未写入的事件保留在缓冲区等待重试；会话冲突或
+                连续失败 max_flush_retries 次的事件被丢弃。某个会话写入失败时其他会话仍会继续写入
+        """
+        errors = []
+        async with self._flush_lock:
+            session_ids = [session.session_id] if session is not None else list(self._pending)
+            for session_id in session_ids:
+                pending = self._pending.pop(session_id, None)
+                if pending is None or not pending.events:
+                    continue
+                try:
+                    await self._write_events(
+                        pending.session.user_id,
+                        session_id,
+                        pending.events,
+                        pending.base_time,
+                        pending.updated_time,
+                    )
+                except Exception as e:
+                    errors.append(e)
+                    pending.failures += 1
+                    if isinstance(e, ValueError) or pending.failures >= self.max_flush_retries:
+                        # 会话冲突重试也无法写入；连续失败的批次也不再重试，以免之后的事件一直排在它后面。
+                        # 写入期间新缓存的事件单独成批，会话冲突时同样会被丢弃
+                        logger.error(
+                            f"[{pending.session.user_id}] [{session_id}] Event flush failed "
+                            f"({pending.failures} attempts), dropping {len(pending.events)} events: {e}"
+                        )
+                        continue
+
+                    # 写入期间新缓存的事件排在这批之后
+                    newer = self._pending.get(session_id)
+                    if newer is not None:
+                        pending.events.extend(newer.events)
+                        pending.updated_time = newer.updated_time
+                    self._pending[session_id] = pending
+                    logger.error(
+                        f"[{pending.session.user_id}] [{session_id}] Event flush failed "
+                        f"({pending.failures}/{self.max_flush_retries}): {e}"
+                    )
+                    continue
+
+                logger.debug(
+                    f"[{pending.session.user_id}] [{session_id}] Events flushed: {len(pending.events)}"
+                )
+
+        if errors:
+            raise ValueError(f"写入事件失败（{len(errors)} 个会话）: {errors[0]}") from errors[0]
+
+    def _close_write_behind(self) -> None:
+        if self._pending:
+            logger.warning(f"关闭连接时仍有 {sum(len(p.events) for p in self._pending.values())} 个事件未写入")
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+
+
+class MySQLSessionService(WriteBehindMixin, BaseSessionService):
     """
     MySQL session service class
     """
 
-    def __init__(self, db_url: str, **kwargs):
+    def __init__(
+        self,
+        db_url: Optional[str] = None,
+        write_behind: Optional[bool] = None,
+        flush_interval: Optional[float] = None,
+        max_batch_events: Optional[int] = None,
+        engine: Optional[Any] = None,
+        **kwargs,
+    ):
         """
         初始化MySQL会话服务
+
+        未传入 db_url 和 engine 时使用进程共享的引擎（见 src.db.engine），
+        只有服务自己创建的引擎才会在 close 时释放。
+
+        Args:
+            db_url: 数据库连接URL，传入时单独创建引擎
+            write_behind: 是否启用事件写回模式，默认 SESSION_WRITE_BEHIND
+            flush_interval: 写回模式下定时写入的间隔（秒），默认 SESSION_FLUSH_INTERVAL
+            max_batch_events: 写回模式下单个会话攒够多少事件立即写入，默认 SESSION_FLUSH_MAX_EVENTS
+            engine: 外部共享的引擎
+            **kwargs: create_engine 的参数
         """
+        self._init_write_behind(write_behind, flush_interval, max_batch_events)
+
+        # 共享引擎由 pool_pre_ping 保证连接可用，不再每次探测
+        self._owns_engine = engine is None and db_url is not None
+        if not self._owns_engine:
+            self.engine = engine if engine is not None else get_engine()
+            self.SessionLocal = sessionmaker(bind=self.engine)
+            return
+
         try:
             self.engine = create_engine(db_url, **kwargs)
             self.SessionLocal = sessionmaker(bind=self.engine)
@@ -46,26 +513,18 @@ class MySQLSessionService(BaseSessionService):
         """
         if session_id is None:
             session_id = str(uuid.uuid4())
-        
+
         if state is None:
             state = {}
-        
+
         current_time = time.time()
-        
+
         def _create_session_sync():
             try:
                 with self.SessionLocal() as db_session:
                     # 插入会话记录
-                    insert_sql = text(
-                        """
-                        INSERT INTO sessions
-                        (session_id, user_id, session_state, created_at, updated_at)
-                        VALUES (:session_id, :user_id, :session_state, FROM_UNIXTIME(:current_time), FROM_UNIXTIME(:current_time))
-                        """
-                    )
-
                     db_session.execute(
-                        insert_sql,
+                        INSERT_SESSION_SQL,
                         {
                             "session_id": session_id,
                             "user_id": user_id,
@@ -82,8 +541,6 @@ class MySQLSessionService(BaseSessionService):
 
         # 在线程池中执行数据库操作，避免阻塞事件循环
         try:
-            import asyncio
-
             await asyncio.to_thread(_create_session_sync)
 
             # 创建并返回Session对象
@@ -93,7 +550,7 @@ class MySQLSessionService(BaseSessionService):
                 state=state,
                 last_updated_time=current_time,
             )
-            
+
             logger.info(f"[{user_id}][{session_id}]创建会话成功")
             return session
         except Exception as e:
@@ -111,23 +568,8 @@ class MySQLSessionService(BaseSessionService):
         try:
             with self.SessionLocal() as db_session:
                 # 获取会话基本信息
-                # session_sql = text(
-                #     """
-                #     SELECT session_id, user_id, session_state, FROM_UNIXTIME(updated_at) as last_update_time
-                #     FROM sessions
-                #     WHERE user_id = :user_id AND session_id = :session_id
-                #     """
-                # )
-                session_sql = text(
-                    """
-                    SELECT session_id, user_id, session_state, UNIX_TIMESTAMP(updated_at) AS last_update_time
-                    FROM sessions
-                    WHERE user_id = :user_id AND session_id = :session_id
-                    """
-                )
-
                 session_result = db_session.execute(
-                    session_sql,
+                    GET_SESSION_SQL,
                     {
                         "session_id": session_id,
                         "user_id": user_id,
@@ -136,74 +578,20 @@ class MySQLSessionService(BaseSessionService):
 
                 if not session_result:
                     return None
-                
-                # 解析会话状态
-                try:
-                    state = json.loads(session_result.session_state)
-                except (json.JSONDecodeError, TypeError) as e:
-                    state = {}
-                
-                # 构造event查询条件
-                event_conditions = ["session_id = :session_id"]
-                event_params = {"session_id": session_id}
-
-                event_sql = f"""
-                SELECT event_type, event_id, UNIX_TIMESTAMP(timestamp) as timestamp, invocation_id, author, content,
-                       tool_calls, tool_result, finish_reason, model, error
-                FROM events
-                WHERE {' AND '.join(event_conditions)}
-                ORDER BY timestamp DESC
-                """
-                
-                if config and config.num_recent_events:
-                    event_sql += f" LIMIT {config.num_recent_events}"
-                
+
                 event_results = db_session.execute(
-                    text(event_sql),
-                    event_params,
+                    events_sql(config),
+                    {"session_id": session_id},
                 ).fetchall()
 
-                events = []
-                for event_row in event_results:
-                    # 解析 JSON 字段
-                    try:
-                        tool_calls = json.loads(event_row.tool_calls) if event_row.tool_calls else None
-                    except (json.JSONDecodeError, TypeError):
-                        tool_calls = None
-
-                    try:
-                        tool_result = json.loads(event_row.tool_result) if event_row.tool_result else None
-                    except (json.JSONDecodeError, TypeError):
-                        tool_result = None
-
-                    # 创建Event对象
-                    event = Event(
-                        type=event_row.event_type,
-                        event_id=event_row.event_id,
-                        user_id=user_id,
-                        session_id=session_id,
-                        invocation_id=event_row.invocation_id or "",
-                        author=event_row.author or "main_agent",
-                        timestamp=float(event_row.timestamp),
-                        content=event_row.content,
-                        tool_calls=tool_calls,
-                        tool_result=tool_result,
-                        finish_reason=event_row.finish_reason,
-                        model=event_row.model,
-                        error=event_row.error,
-                    )
-
-                    # todo
-                    # 不是所有的event都添加到events中，而是只保留user和main_agent的最终回复;
+                events = [row_to_event(event_row, user_id, session_id) for event_row in event_results]
 
-                    events.append(event)
-                
                 # 创建Session对象
                 session = Session(
                     session_id=session_id,
                     user_id=user_id,
                     events=events,
-                    state=state,
+                    state=parse_state(session_result.session_state),
                     last_updated_time=float(session_result.last_update_time),
                 )
 
@@ -222,39 +610,25 @@ class MySQLSessionService(BaseSessionService):
         """列出用户的会话"""
         try:
             with self.SessionLocal() as db_session:
-                list_sql = text(
-                    """
-                    SELECT session_id, user_id, session_state, UNIX_TIMESTAMP(updated_at) AS last_update_time
-                    FROM sessions
-                    WHERE user_id = :user_id
-                    ORDER BY updated_at DESC
-                    """
-                )
-
                 results = db_session.execute(
-                    list_sql, 
+                    LIST_SESSIONS_SQL,
                     {"user_id": user_id}
                 ).fetchall()
 
                 sessions = []
                 for row in results:
-                    try:
-                        state = json.loads(row.session_state)
-                    except (json.JSONDecodeError, TypeError) as e:
-                        state = {}
-
                     session = Session(
                         session_id=row.session_id,
                         user_id=row.user_id,
-                        state=state,
+                        state=parse_state(row.session_state),
                         last_updated_time=float(row.last_update_time),
                     )
                     sessions.append(session)
-                
+
                 logger.debug(f"[{user_id}] Sessions Listed successfully: {len(sessions)} sessions")
 
                 return SessionList(sessions=sessions)
-                
+
         except SQLAlchemyError as e:
             logger.error(f"[{user_id}] Sessions listing failed: {e}")
             raise ValueError(f"[{user_id}] Sessions listing failed: {e}")
@@ -264,26 +638,11 @@ class MySQLSessionService(BaseSessionService):
         try:
             with self.SessionLocal() as db_session:
                 # 删除会话相关的所有事件
-                delete_events_sql = text(
-                    """
-                    DELETE FROM events
-                    WHERE session_id = :session_id AND user_id = :user_id
-                    """
-                )
-
                 events_result = db_session.execute(
-                    delete_events_sql,
+                    DELETE_EVENTS_SQL,
                     {"session_id": session_id, "user_id": user_id}
                 )
-                db_session.execute(delete_events_sql, {"session_id": session_id})
-
-                delete_session_sql = text(
-                    """
-                    DELETE FROM sessions
-                    WHERE user_id = :user_id AND session_id = :session_id
-                    """
-                )
-                session_result =db_session.execute(delete_session_sql, {"user_id": user_id, "session_id": session_id})
+                session_result = db_session.execute(DELETE_SESSION_SQL, {"user_id": user_id, "session_id": session_id})
 
                 db_session.commit()
 
@@ -299,200 +658,141 @@ class MySQLSessionService(BaseSessionService):
             logger.error(f"[{user_id}][{session_id}]删除会话失败: {e}")
             raise ValueError(f"[{user_id}][{session_id}]删除会话失败: {e}")
 
-    async def append_event(self, session: Session, event: Event) -> Event:
-        """向会话添加事件"""
-        try:
-            current_time = time.time()
+    def _insert_messages(self, db_session, user_id: str, session_id: str, events: List[Event]) -> None:
+        """在当前事务中插入消息记录（只保留 user_message 和 complete_response）"""
+        events = [event for event in events if event.type in MESSAGE_ROLES]
+        if not events:
+            return
 
-            with self.SessionLocal() as db_session:
-                # 检查会话是否存在且未过期
-                check_sql = text(
-                    """
-                    SELECT UNIX_TIMESTAMP(updated_at) as last_update_time
-                    FROM sessions 
-                    WHERE session_id = :session_id AND user_id = :user_id
-                """
-                )
+        # 先递增会话的累计token使用量，再由递增后的值反推这批消息之前的累计值，
+        # 依次加上每条消息的 usage 得到每条消息的累计token使用量
+        params = {"user_id": user_id, "session_id": session_id}
+        usage = sum(event.usage or 0 for event in events)
+        db_session.execute(ADD_SESSION_USAGE_SQL, {**params, "usage": usage})
+        row = db_session.execute(ACCUMULATED_USAGE_SQL, params).fetchone()
+        accumulated_usage = row.accumulated_usage - usage if row else 0
 
-                session_result = db_session.execute(
-                    check_sql,
-                    {
-                        "session_id": session.session_id,
-                        "user_id": session.user_id,
-                    },
-                ).fetchone()
+        db_session.execute(INSERT_MESSAGE_SQL, message_params(events, accumulated_usage))
 
-                if not session_result:
-                    raise ValueError(f"会话不存在: {session.session_id}")
-
-                # 检查会话是否过期（简单的并发控制）
-                if (
-                    session_result.last_update_time > session.last_updated_time + 1
-                ):  # 允许1秒误差
-                    raise ValueError(f"会话已过期，请重新获取: {session.session_id}")
-
-                # 插入事件记录
-                # 解析 Event 对象中的 JSON 字段
-                event_dict = event.model_dump()
-                tool_calls_json = json.dumps(event_dict.get("tool_calls"), ensure_ascii=False) if event_dict.get("tool_calls") else None
-                tool_result_json = json.dumps(event_dict.get("tool_result"), ensure_ascii=False) if event_dict.get("tool_result") else None
-
-                event_sql = text(
-                    """
-                    INSERT INTO events (
-                        event_type, event_id, session_id, user_id, timestamp,
-                        invocation_id, author, content, tool_calls, tool_result,
-                        finish_reason, model, error
-                    ) VALUES (
-                        :p_type, :event_id, :session_id, :user_id, FROM_UNIXTIME(:timestamp),
-                        :invocation_id, :author, :content, :tool_calls, :tool_result,
-                        :finish_reason, :model, :error
-                    )
-                    """
-                )
+    def _write_events_sync(
+        self,
+        user_id: str,
+        session_id: str,
+        events: List[Event],
+        base_time: float,
+        current_time: float,
+    ) -> None:
+        """
+        在一个事务中写入一批事件及其消息，并更新会话时间
 
-                db_session.execute(event_sql, {
-                    "p_type": event.type,
-                    "event_id": event.event_id,
-                    "session_id": event.session_id,
-                    "user_id": event.user_id,
-                    "timestamp": event.timestamp,
-                    "invocation_id": event.invocation_id,
-                    "author": event.author,
-                    "content": event.content,
-                    "tool_calls": tool_calls_json,
-                    "tool_result": tool_result_json,
-                    "finish_reason": event.finish_reason,
-                    "model": event.model,
-                    "error": event.error,
-                })
-
-                # 更新时间戳
-                update_time_sql = text(
-                    """
-                    UPDATE sessions 
-                    SET updated_at = FROM_UNIXTIME(:current_time)
-                    WHERE session_id = :session_id
-                """
-                )
+        Args:
+            base_time: 写入前内存中会话的更新时间，用于检查会话是否被其他请求修改
+            current_time: 写入后会话的更新时间
+        """
+        with self.SessionLocal() as db_session:
+            # 检查会话是否存在且未过期
+            session_result = db_session.execute(
+                CHECK_SESSION_SQL,
+                {
+                    "session_id": session_id,
+                    "user_id": user_id,
+                },
+            ).fetchone()
+
+            if not session_result:
+                raise ValueError(f"会话不存在: {session_id}")
+
+            # 检查会话是否过期（简单的并发控制）
+            if session_result.last_update_time > base_time + 1:  # 允许1秒误差
+                raise ValueError(f"会话已过期，请重新获取: {session_id}")
+
+            # 插入事件记录
+            db_session.execute(INSERT_EVENT_SQL, [event_params(event) for event in events])
+
+            # 更新消息表
+            self._insert_messages(db_session, user_id, session_id, events)
+
+            # 更新时间戳
+            db_session.execute(
+                UPDATE_SESSION_TIME_SQL,
+                {"current_time": current_time, "session_id": session_id},
+            )
 
-                db_session.execute(
-                    update_time_sql,
-                    {"current_time": current_time, "session_id": session.session_id},
-                )
+            db_session.commit()
 
-                db_session.commit()
+    async def _write_events(
+        self,
+        user_id: str,
+        session_id: str,
+        events: List[Event],
+        base_time: float,
+        current_time: float,
+    ) -> None:
+        await asyncio.to_thread(self._write_events_sync, user_id, session_id, events, base_time, current_time)
 
-                # 更新内存中的会话对象
-                session.events.append(event)
-                session.last_updated_time = current_time
+    async def append_event(self, session: Session, event: Event) -> Event:
+        """向会话添加事件
 
-                logger.debug(
-                    f"[{session.user_id}] [{session.session_id}] Event added successfully: {event.event_id} to session"
-                )
+        写回模式下事件先缓存在内存中，由 flush 批量写入数据库
+        """
+        if self.write_behind:
+            return await self._buffer_event(session, event)
 
-                # 更新消息表, 只保留 user_message 和 complete_response 类型的事件
-                if event.type in [EventType.USER_MESSAGE, EventType.COMPLETE_RESPONSE]:
-                    await self.append_message(session, event)
+        try:
+            current_time = time.time()
+            # 数据库写入放到线程中执行，单次写入不阻塞事件循环上的其他流
+            await self._write_events(
+                session.user_id, session.session_id, [event], session.last_updated_time, current_time
+            )
+
+            # 更新内存中的会话对象
+            session.events.append(event)
+            session.last_updated_time = current_time
+
+            logger.debug(
+                f"[{session.user_id}] [{session.session_id}] Event added successfully: {event.event_id} to session"
+            )
 
-                return event
+            return event
 
         except SQLAlchemyError as e:
             logger.error(
                 f"[{session.user_id}] [{session.session_id}] Event addition failed: {e}"
             )
             raise ValueError(f"添加事件失败: {e}") from e
-    
+
     async def append_message(self, session: Session, event: Event):
         """向会话添加消息
 
         根据 event 的 type 过滤 user_message 和 complete_response，
         将相应内容存到 messages 表中
         """
-
-
         try:
             # 只处理 user_message 和 complete_response 类型的事件
-            if event.type == EventType.USER_MESSAGE:
-                role = "user"
-            elif event.type == EventType.COMPLETE_RESPONSE:
-                role = "assistant"
-            else:
-                # 忽略其他类型的事件
+            if event.type not in MESSAGE_ROLES:
                 return
 
             with self.SessionLocal() as db_session:
-
-                # 首先查询特定user_id和session_id的累计token使用量，得到其最新的累计token使用量
-                # 然后加上event.usage，得到新的累计token使用量
-                query_accumulated_sql = text(
-                    """
-                    SELECT COALESCE(MAX(accumulated_usage), 0) AS accumulated_usage
-                    FROM messages
-                    WHERE user_id = :user_id AND session_id = :session_id
-                """
-                )
-                result = db_session.execute(
-                    query_accumulated_sql,
-                    {"user_id": event.user_id, "session_id": event.session_id}
-                )
-                row = result.fetchone()
-                accumulated_usage = (row.accumulated_usage if row else 0) + event.usage
-
-                # 插入消息记录
-                insert_sql = text(
-                    """
-                    INSERT INTO messages
-                    (event_id, user_id, session_id, role, content, created_at, token_usage, accumulated_usage)
-                    VALUES (:event_id, :user_id, :session_id, :role, :content, FROM_UNIXTIME(:timestamp), :token_usage, :accumulated_usage)
-                    ON DUPLICATE KEY UPDATE
-                        content = VALUES(content),
-                        created_at = VALUES(created_at)
-                    """
-                )
-
-                db_session.execute(
-                    insert_sql,
-                    {
-                        "event_id": event.event_id,
-                        "user_id": event.user_id,
-                        "session_id": event.session_id,
-                        "role": role,
-                        "content": event.content,
-                        "timestamp": event.timestamp,
-                        "token_usage": event.usage,
-                        "accumulated_usage": accumulated_usage,
-                    }
-                )
+                self._insert_messages(db_session, event.user_id, event.session_id, [event])
                 db_session.commit()
 
                 logger.info(
                     f"[{session.user_id}] [{session.session_id}] Message added successfully: "
-                    f"event_id={event.event_id}, role={role}"
+                    f"event_id={event.event_id}, role={MESSAGE_ROLES[event.type]}"
                 )
 
         except SQLAlchemyError as e:
             logger.error(f"[{session.user_id}] [{session.session_id}] Message addition failed: {e}")
             raise ValueError(f"添加消息失败: {e}") from e
-    
+
     def get_messages(self, user_id: str, session_id: str) -> List[Dict[str, Any]]:
         """
         根据user_id和session_id获取指定会话的消息
         """
         try:
             with self.SessionLocal() as db_session:
-                messages_sql = text(
-                    """
-                    SELECT event_id, user_id, session_id, role, content, 
-                        UNIX_TIMESTAMP(created_at) AS timestamp
-                    FROM messages
-                    WHERE user_id = :user_id AND session_id = :session_id
-                    ORDER BY created_at ASC
-                """
-                )
-
                 result = db_session.execute(
-                    messages_sql,
+                    GET_MESSAGES_SQL,
                     {"user_id": user_id, "session_id": session_id},
                 )
                 rows = result.mappings().all()
@@ -502,8 +802,106 @@ class MySQLSessionService(BaseSessionService):
             logger.error(f"[{user_id}] [{session_id}] Message retrieval failed: {e}")
             raise ValueError(f"Failed to retrieve messages: {e}") from e
 
+    async def aget_messages(self, user_id: str, session_id: str) -> List[Dict[str, Any]]:
+        """get_messages 的异步版本（在线程池中执行）"""
+        return await asyncio.to_thread(self.get_messages, user_id, session_id)
+
+    def get_messages_page(
+        self,
+        user_id: str,
+        session_id: str,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        descending: bool = False,
+    ) -> MessagePage:
+        """
+        分页获取会话的消息
+
+        Args:
+            limit: 每页条数，默认 SESSION_HISTORY_PAGE_SIZE
+            cursor: 上一页返回的 next_cursor，为空时从第一条（descending 时从最新一条）开始
+            descending: 是否从最新的消息往前翻页
+        """
+        limit = limit or load_session_config()["history_page_size"]
+        try:
+            with self.SessionLocal() as db_session:
+                result = db_session.execute(
+                    messages_page_sql(cursor, descending),
+                    messages_page_params(user_id, session_id, limit, cursor),
+                )
+                messages = [dict(row) for row in result.mappings()]
+        except SQLAlchemyError as e:
+            logger.error(f"[{user_id}] [{session_id}] Message retrieval failed: {e}")
+            raise ValueError(f"Failed to retrieve messages: {e}") from e
+
+        next_cursor = message_cursor(messages[-1]) if len(messages) == limit else None
+        return MessagePage(messages=messages, next_cursor=next_cursor)
+
+    def get_recent_messages(
+        self,
+        user_id: str,
+        session_id: str,
+        max_tokens: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        从最新的消息往前加载，token 总量达到 max_tokens 时停止，返回按时间正序的消息
+
+        Args:
+            max_tokens: token 上限，默认 SESSION_HISTORY_MAX_TOKENS，0 表示加载全部
+        """
+        if max_tokens is None:
+            max_tokens = load_session_config()["history_max_tokens"]
+        if not max_tokens:
+            return self.get_messages(user_id, session_id)
+
+        window: List[Dict[str, Any]] = []
+        cursor = None
+        while True:
+            page = self.get_messages_page(user_id, session_id, cursor=cursor, descending=True)
+            if fill_window(window, page.messages, max_tokens) or page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+
+        window.reverse()
+        return window
+
+    async def aget_recent_messages(
+        self,
+        user_id: str,
+        session_id: str,
+        max_tokens: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """get_recent_messages 的异步版本（在线程池中执行）"""
+        return await asyncio.to_thread(self.get_recent_messages, user_id, session_id, max_tokens)
+
+    async def aiter_messages(
+        self,
+        user_id: str,
+        session_id: str,
+        page_size: Optional[int] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """按时间正序逐页读取会话的全部消息（用于导出），内存中只保留一页"""
+        cursor = None
+        while True:
+            page = await asyncio.to_thread(
+                self.get_messages_page, user_id, session_id, page_size, cursor
+            )
+            for message in page.messages:
+                yield message
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+
+    async def aclose(self) -> None:
+        """写入缓存的事件并关闭数据库连接"""
+        try:
+            await self.flush()
+        finally:
+            self.close()
+
     def close(self):
-        """关闭数据库连接"""
-        if hasattr(self, "engine"):
+        """关闭数据库连接（写回模式下应先调用 flush）；共享引擎不释放"""
+        self._close_write_behind()
+        if getattr(self, "_owns_engine", False):
             self.engine.dispose()
-            logger.info("MySQL connection closed")
\ No newline at end of file
+            logger.info("MySQL connection closed")
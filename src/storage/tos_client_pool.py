@@ -0,0 +1,276 @@
+"""
+Process-wide TOS client pool.
+
+``TosClientV2`` is thread-safe and keeps its own keep-alive HTTP connection pool,
+so clients are shared instead of leased exclusively: ``acquire`` hands out the
+pooled clients round-robin, spreading concurrent uploads over at most
+``max_size`` connection pools, and ``release`` returns them. A client is
+replaced when it is reported unhealthy after a connection-level failure, fails
+the periodic ``check_health`` probe, or is older than ``max_age``; replaced
+clients are closed once no upload is using them.
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import requests
+import tos
+
+from ..config.config import load_tos_config, load_upload_config
+from ..logger import logger
+
+
+def is_connection_error(error: Exception) -> bool:
+    """Whether a TOS error was caused by the connection (network, TLS, timeout) rather than the request"""
+    if isinstance(error, tos.exceptions.TosClientError):
+        return isinstance(error.cause, (requests.RequestException, OSError))
+    return isinstance(error, (requests.RequestException, OSError))
+
+
+class _PooledClient:
+    __slots__ = ("client", "created_at", "healthy", "in_use", "retired")
+
+    def __init__(self, client: tos.TosClientV2):
+        self.client = client
+        self.created_at = time.monotonic()
+        self.healthy = True
+        self.in_use = 0
+        self.retired = False
+
+
+class TosClientPool:
+    """Bounded, thread-safe pool of long-lived TOS clients"""
+
+    def __init__(
+        self,
+        access_key: str,
+        secret_key: str,
+        endpoint: str,
+        region: str,
+        bucket_name: str,
+        max_size: int = 4,
+        max_connections: int = 64,
+        max_age: float = 3600,
+        health_check_interval: float = 300,
+    ):
+        """
+        Args:
+            access_key / secret_key / endpoint / region / bucket_name: TOS configuration
+            max_size: Max number of clients in the pool
+            max_connections: Max HTTP connections of each client
+            max_age: Seconds after which a client is recreated, 0 to keep forever
+            health_check_interval: Seconds between background health probes, 0 to disable
+        """
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.endpoint = endpoint
+        self.region = region
+        self.bucket_name = bucket_name
+        self.max_size = max(1, max_size)
+        self.max_connections = max_connections
+        self.max_age = max_age
+        self.health_check_interval = health_check_interval
+
+        self._slots: List[Optional[_PooledClient]] = [None] * self.max_size
+        # id(client) -> 池中或已替换但仍在使用的 client
+        self._clients: Dict[int, _PooledClient] = {}
+        self._next = 0
+        self._lock = threading.Lock()
+        self._last_health_check = time.monotonic()
+        self._health_check_running = False
+
+    def _create(self) -> _PooledClient:
+        client = tos.TosClientV2(
+            self.access_key,
+            self.secret_key,
+            self.endpoint,
+            self.region,
+            max_connections=self.max_connections,
+        )
+        pooled = _PooledClient(client)
+        self._clients[id(client)] = pooled
+        return pooled
+
+    def _is_usable(self, pooled: Optional[_PooledClient]) -> bool:
+        if pooled is None or not pooled.healthy:
+            return False
+        return not self.max_age or time.monotonic() - pooled.created_at < self.max_age
+
+    @staticmethod
+    def _close(pooled: Optional[_PooledClient]) -> None:
+        if pooled is None:
+            return
+        try:
+            pooled.client.close()
+        except Exception:
+            pass
+
+    def _retire(self, pooled: Optional[_PooledClient]) -> Optional[_PooledClient]:
+        """
+        Take a replaced client out of service (caller holds the lock)
+
+        Returns:
+            The client if it is idle and should be closed now, otherwise None;
+            a client still used by an upload is closed on its last ``release``.
+        """
+        if pooled is None or pooled.retired:
+            return None
+        pooled.retired = True
+        if pooled.in_use:
+            return None
+        self._clients.pop(id(pooled.client), None)
+        return pooled
+
+    def acquire(self) -> tos.TosClientV2:
+        """
+        Get a client from the pool, replacing it first if it is unhealthy or expired
+
+        Every ``acquire`` must be paired with a ``release``, see ``lease``.
+        """
+        with self._lock:
+            index = self._next
+            self._next = (self._next + 1) % self.max_size
+            pooled = self._slots[index]
+            stale = None
+            if not self._is_usable(pooled):
+                stale = self._retire(pooled)
+                pooled = self._create()
+                self._slots[index] = pooled
+            pooled.in_use += 1
+            check_health = self._health_check_due()
+        self._close(stale)
+        if check_health:
+            threading.Thread(target=self._run_health_check, name="tos-health-check", daemon=True).start()
+        return pooled.client
+
+    def release(self, client: tos.TosClientV2) -> None:
+        """Return a client obtained from ``acquire``, closing it if it was replaced meanwhile"""
+        with self._lock:
+            pooled = self._clients.get(id(client))
+            if pooled is None or pooled.client is not client:
+                return
+            pooled.in_use = max(0, pooled.in_use - 1)
+            stale = None
+            if pooled.retired and not pooled.in_use:
+                self._clients.pop(id(client), None)
+                stale = pooled
+        self._close(stale)
+
+    @contextmanager
+    def lease(self) -> Iterator[tos.TosClientV2]:
+        """``acquire`` / ``release`` as a context manager"""
+        client = self.acquire()
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    def report_failure(self, client: tos.TosClientV2) -> None:
+        """Mark a client unhealthy after a connection-level error, it is replaced on next acquire"""
+        with self._lock:
+            pooled = self._clients.get(id(client))
+            if pooled is not None and pooled.client is client and not pooled.retired:
+                pooled.healthy = False
+                logger.warning(f"TOS client marked unhealthy, endpoint: {self.endpoint}")
+
+    def _health_check_due(self) -> bool:
+        """Whether a background health check should start now (caller holds the lock)"""
+        if not self.health_check_interval or self._health_check_running:
+            return False
+        if time.monotonic() - self._last_health_check < self.health_check_interval:
+            return False
+        self._health_check_running = True
+        return True
+
+    def _run_health_check(self) -> None:
+        try:
+            replaced = self.check_health()
+            if replaced:
+                logger.info(f"TOS health check replaced {replaced} client(s), endpoint: {self.endpoint}")
+        except Exception as e:
+            logger.warning(f"TOS health check failed: {e}")
+        finally:
+            with self._lock:
+                self._last_health_check = time.monotonic()
+                self._health_check_running = False
+
+    def check_health(self) -> int:
+        """
+        Probe every pooled client with a HEAD bucket request, returns the number replaced
+
+        Only connection-level failures mark a client unhealthy; server errors
+        (e.g. 403) mean the connection itself works. Called in the background
+        from ``acquire`` every ``health_check_interval`` seconds.
+        """
+        with self._lock:
+            slots = [(index, pooled) for index, pooled in enumerate(self._slots) if pooled is not None]
+            for _, pooled in slots:
+                pooled.in_use += 1
+
+        for _, pooled in slots:
+            try:
+                pooled.client.head_bucket(self.bucket_name)
+            except tos.exceptions.TosServerError:
+                pass
+            except Exception as e:
+                if is_connection_error(e):
+                    pooled.healthy = False
+            finally:
+                self.release(pooled.client)
+
+        replaced = 0
+        stale = []
+        with self._lock:
+            for index, pooled in slots:
+                if self._slots[index] is pooled and not self._is_usable(pooled):
+                    self._slots[index] = None
+                    stale.append(self._retire(pooled))
+                    replaced += 1
+        for pooled in stale:
+            self._close(pooled)
+        return replaced
+
+    def close(self) -> None:
+        """Close all pooled clients"""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._slots = [None] * self.max_size
+            self._clients.clear()
+        for pooled in clients:
+            self._close(pooled)
+
+
+# 全局 TOS client 池
+_tos_client_pool: Optional[TosClientPool] = None
+_pool_lock = threading.RLock()
+
+
+def get_tos_client_pool() -> TosClientPool:
+    """
+    获取全局唯一的 TOS client 池（配置只在首次调用时加载）
+
+    Raises:
+        ValueError: When required TOS configuration is missing.
+    """
+    global _tos_client_pool
+
+    if _tos_client_pool is None:
+        with _pool_lock:
+            if _tos_client_pool is None:
+                tos_config = load_tos_config()
+                upload_config = load_upload_config()
+                _tos_client_pool = TosClientPool(
+                    access_key=tos_config["access_key"],
+                    secret_key=tos_config["secret_key"],
+                    endpoint=tos_config["endpoint"],
+                    region=tos_config["region"],
+                    bucket_name=tos_config["bucket_name"],
+                    max_size=upload_config["client_pool_size"],
+                    max_connections=upload_config["client_max_connections"],
+                    max_age=upload_config["client_max_age"],
+                    health_check_interval=upload_config["client_health_check_interval"],
+                )
+
+    return _tos_client_pool
@@ -0,0 +1,191 @@
+"""
+Streaming multipart upload to TOS.
+
+Parts are read from disk and uploaded inside a dedicated thread pool, so the
+event loop is never blocked and at most ``max_workers`` parts are held in memory
+at a time. The upload state is kept between retries, so a retried upload only
+sends the parts that have not completed yet.
+"""
+
+import os
+import asyncio
+import tos
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Optional
+
+from pydantic import BaseModel, Field
+from tos.models2 import PartInfo
+
+from ..config.config import load_upload_config
+from ..logger import logger
+
+# TOS 要求除最后一个分片外，每个分片不小于 5MB
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class MultipartUploadState(BaseModel):
+    """Resumable multipart upload state"""
+    bucket: str = Field(..., description="Bucket name")
+    key: str = Field(..., description="Object key")
+    local_path: str = Field(..., description="Local file path")
+    file_size: int = Field(..., description="File size in bytes")
+    part_size: int = Field(..., description="Part size in bytes")
+    upload_id: Optional[str] = Field(None, description="Multipart upload ID")
+    completed_parts: Dict[int, str] = Field(default_factory=dict, description="Completed parts, part_number -> etag")
+
+    @property
+    def part_count(self) -> int:
+        return max(1, (self.file_size + self.part_size - 1) // self.part_size)
+
+    def pending_parts(self):
+        return [n for n in range(1, self.part_count + 1) if n not in self.completed_parts]
+
+
+class TosMultipartUploader:
+    """Async TOS uploader, multipart for large files and a single streamed PUT for small ones"""
+
+    def __init__(
+        self,
+        part_size: int = 16 * 1024 * 1024,
+        multipart_threshold: int = 64 * 1024 * 1024,
+        max_workers: int = 4,
+    ):
+        """
+        Args:
+            part_size: Part size in bytes, at least 5MB
+            multipart_threshold: Files smaller than this are uploaded with a single PUT
+            max_workers: Number of parts uploaded in parallel
+        """
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.multipart_threshold = max(multipart_threshold, self.part_size)
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tos-upload")
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    def new_state(self, bucket: str, key: str, local_path: str) -> MultipartUploadState:
+        """Create the upload state of a file (raises FileNotFoundError if missing)"""
+        return MultipartUploadState(
+            bucket=bucket,
+            key=key,
+            local_path=local_path,
+            file_size=os.path.getsize(local_path),
+            part_size=self.part_size,
+        )
+
+    async def exists(self, client, bucket: str, key: str) -> bool:
+        """HEAD the object, False if it does not exist"""
+        try:
+            await self._run(client.head_object, bucket, key)
+            return True
+        except tos.exceptions.TosServerError as e:
+            if e.status_code == 404:
+                return False
+            raise
+
+    def is_multipart(self, state: MultipartUploadState) -> bool:
+        return state.file_size >= self.multipart_threshold
+
+    async def upload(self, client, state: MultipartUploadState) -> None:
+        """
+        Upload (or resume uploading) the file described by ``state``.
+
+        On failure the exception is raised and ``state`` keeps the completed
+        parts, so calling ``upload`` again with the same state resumes the upload.
+        """
+        if not self.is_multipart(state):
+            await self._run(self._put_object, client, state)
+            return
+
+        if state.upload_id is None:
+            output = await self._run(client.create_multipart_upload, state.bucket, state.key)
+            state.upload_id = output.upload_id
+            state.completed_parts = {}
+            logger.info(
+                f"TOS multipart upload created: {state.key}, upload_id: {state.upload_id}, parts: {state.part_count}"
+            )
+
+        pending = state.pending_parts()
+        if len(pending) < state.part_count:
+            logger.info(f"TOS multipart upload resumed: {state.key}, remaining parts: {len(pending)}/{state.part_count}")
+
+        # 分片在线程池中读取和上传，线程数即为同时驻留内存的分片数上限
+        results = await asyncio.gather(
+            *[self._run(self._upload_part, client, state, part_number) for part_number in pending],
+            return_exceptions=True,
+        )
+
+        error = None
+        for part_number, result in zip(pending, results):
+            if isinstance(result, BaseException):
+                error = error or result
+            else:
+                state.completed_parts[part_number] = result
+        if error is not None:
+            raise error
+
+        parts = [
+            PartInfo(
+                part_number=part_number,
+                part_size=None,
+                offset=None,
+                etag=state.completed_parts[part_number],
+                hash_crc64_ecma=None,
+                is_completed=None,
+            )
+            for part_number in sorted(state.completed_parts)
+        ]
+        await self._run(client.complete_multipart_upload, state.bucket, state.key, state.upload_id, parts)
+
+    async def abort(self, client, state: MultipartUploadState) -> None:
+        """Abort an unfinished multipart upload so its parts are released (best effort)"""
+        if state.upload_id is None:
+            return
+        try:
+            await self._run(client.abort_multipart_upload, state.bucket, state.key, state.upload_id)
+        except Exception as e:
+            logger.warning(f"TOS multipart upload abort failed: {state.key}, upload_id: {state.upload_id}, error: {e}")
+        state.upload_id = None
+        state.completed_parts = {}
+
+    def _put_object(self, client, state: MultipartUploadState) -> None:
+        with open(state.local_path, "rb") as f:
+            # 直接传入文件对象，由 SDK 流式读取
+            client.put_object(state.bucket, state.key, content_length=state.file_size, content=f)
+
+    def _upload_part(self, client, state: MultipartUploadState, part_number: int) -> str:
+        offset = (part_number - 1) * state.part_size
+        size = min(state.part_size, state.file_size - offset)
+        with open(state.local_path, "rb") as f:
+            f.seek(offset)
+            data = f.read(size)
+        output = client.upload_part(
+            state.bucket, state.key, state.upload_id, part_number, content_length=size, content=data
+        )
+        return output.etag
+
+
+# 全局上传器实例（共享上传线程池）
+_tos_uploader: Optional[TosMultipartUploader] = None
+_uploader_lock = threading.RLock()
+
+
+def get_tos_uploader() -> TosMultipartUploader:
+    """获取全局唯一的 TOS 上传器实例"""
+    global _tos_uploader
+
+    if _tos_uploader is None:
+        with _uploader_lock:
+            if _tos_uploader is None:
+                config = load_upload_config()
+                _tos_uploader = TosMultipartUploader(
+                    part_size=config["part_size"],
+                    multipart_threshold=config["multipart_threshold"],
+                    max_workers=config["max_workers"],
+                )
+
+    return _tos_uploader
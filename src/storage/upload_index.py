@@ -0,0 +1,159 @@
+"""
+Content-addressed upload index.
+
+Uploaded objects are keyed by the SHA-256 of their content, so the same file is
+stored once no matter its name or how many sessions upload it. A local SQLite
+index maps object keys to URLs (with a TTL), and remembers the hash of every
+file it has seen by (path, size, mtime), so a repeat upload of an unchanged
+file costs a ``stat`` and two indexed lookups instead of hashing and uploading.
+"""
+
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional
+from urllib.parse import urlsplit
+
+from ..config.config import load_upload_config
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# content_addressed_key 生成的 object key：{folder}/{sha256}{ext}
+_CONTENT_HASH_RE = re.compile(r"/([0-9a-f]{64})(\.[^/]*)?$")
+
+
+def hash_file(local_path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """Streamed SHA-256 of a file, read in ``chunk_size`` chunks"""
+    digest = hashlib.sha256()
+    with open(local_path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_addressed_key(folder: str, content_hash: str, local_path: str) -> str:
+    """Object key of a file, the original extension is kept for content-type detection"""
+    ext = os.path.splitext(local_path)[1].lower()
+    return f"{folder}/{content_hash}{ext}"
+
+
+def content_hash_from_url(url: str) -> Optional[str]:
+    """Content hash of a content-addressed object URL, None for any other URL"""
+    match = _CONTENT_HASH_RE.search(urlsplit(url).path)
+    return match.group(1) if match else None
+
+
+class UploadIndex:
+    """SQLite index of uploaded objects and of local file hashes"""
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600):
+        """
+        Args:
+            path: SQLite file path, ":memory:" for an in-process index
+            ttl: Seconds an uploaded object is trusted without an existence check
+        """
+        self.path = path
+        self.ttl = ttl
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS uploads (
+                bucket TEXT NOT NULL,
+                object_key TEXT NOT NULL,
+                url TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                uploaded_at REAL NOT NULL,
+                PRIMARY KEY (bucket, object_key)
+            )
+            """
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS file_hashes (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL
+            )
+            """
+        )
+
+    def file_hash(self, local_path: str) -> str:
+        """
+        Content hash of a local file, reused while its size and mtime are unchanged.
+
+        Raises FileNotFoundError if the file does not exist.
+        """
+        path = os.path.abspath(local_path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash FROM file_hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, stat.st_size, stat.st_mtime_ns),
+            ).fetchone()
+        if row is not None:
+            return row[0]
+
+        content_hash = hash_file(path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, content_hash) VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, content_hash),
+            )
+        return content_hash
+
+    def get_url(self, bucket: str, object_key: str) -> Optional[str]:
+        """URL of an uploaded object, None if unknown or older than the TTL"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, uploaded_at FROM uploads WHERE bucket = ? AND object_key = ?",
+                (bucket, object_key),
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return row[0]
+
+    def put_url(self, bucket: str, object_key: str, url: str, size: int) -> None:
+        """Record an object as present in the bucket"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO uploads (bucket, object_key, url, size, uploaded_at) VALUES (?, ?, ?, ?, ?)",
+                (bucket, object_key, url, size, time.time()),
+            )
+
+    def invalidate(self, bucket: str, object_key: str) -> None:
+        """Forget an object, e.g. after it was found missing in the bucket"""
+        with self._lock:
+            self._conn.execute("DELETE FROM uploads WHERE bucket = ? AND object_key = ?", (bucket, object_key))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# 全局上传索引实例
+_upload_index: Optional[UploadIndex] = None
+_index_lock = threading.RLock()
+
+
+def get_upload_index() -> UploadIndex:
+    """获取全局唯一的上传索引实例"""
+    global _upload_index
+
+    if _upload_index is None:
+        with _index_lock:
+            if _upload_index is None:
+                config = load_upload_config()
+                _upload_index = UploadIndex(config["index_path"], ttl=config["index_ttl"])
+
+    return _upload_index
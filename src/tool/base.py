@@ -2,6 +2,7 @@
 Base class for all tools.
 """
 
+import copy
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
 
@@ -14,6 +15,7 @@ class BaseTool(ABC):
         self.description: str = ""
         self.parameters: Dict[str, Any] = {}
         self.introduction: str = ""  # 新增字段用于UI展示
+        self.max_concurrency: Optional[int] = None  # 同一工具的最大并发执行数，None 表示不限制
 
     @abstractmethod
     async def execute(self, **kwargs) -> Dict[str, Any]:
@@ -48,7 +50,8 @@ class BaseTool(ABC):
 
     def get_enhanced_parameters(self) -> Dict[str, Any]:
         """Get enhanced parameters with introduction field"""
-        enhanced_parameters = self.parameters.copy()
+        # 深拷贝，不修改工具自身的 parameters
+        enhanced_parameters = copy.deepcopy(self.parameters)
         if "properties" not in enhanced_parameters:
             enhanced_parameters["properties"] = {}
 
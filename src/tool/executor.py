@@ -1,14 +1,102 @@
+import os
 import json
 import asyncio
-from typing import List, Tuple, Dict, Any
+import threading
+from contextlib import asynccontextmanager
+from typing import List, Tuple, Dict, Any, Optional
 from ..event.events import EventType
 from ..tool.types import ToolCall
-from .registor import TOOLS
+from .registor import get_tool
 from ..tool.types import ToolCallResult, ToolExeResult
 from ..event.events import Event
 import time
 import uuid
 
+# 不占用全局并发槽位的工具：Task 会启动子 agent，子 agent 的工具调用同样需要全局槽位，
+# 若 Task 也占用槽位，并发 Task 数达到上限时会互相等待而死锁
+GLOBAL_LIMIT_EXEMPT_TOOLS = {"Task"}
+
+
+class ToolConcurrencyLimiter:
+    """
+    Process-wide concurrency limits for tool execution.
+
+    Every tool call holds a slot of the global semaphore (except orchestration
+    tools in GLOBAL_LIMIT_EXEMPT_TOOLS) and, when the tool defines
+    ``max_concurrency``, a slot of its own per-tool semaphore. asyncio
+    semaphores belong to one event loop, so they are rebuilt when the running
+    loop changes.
+    """
+
+    def __init__(self, max_concurrency: int = 8):
+        self.max_concurrency = max_concurrency
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._global: Optional[asyncio.Semaphore] = None
+        self._per_tool: Dict[str, asyncio.Semaphore] = {}
+        self._lock = threading.RLock()
+
+    def _semaphores(self) -> Tuple[asyncio.Semaphore, Dict[str, asyncio.Semaphore]]:
+        """获取当前事件循环中的全局信号量和工具级信号量"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._loop is not loop:
+                self._loop = loop
+                self._global = asyncio.Semaphore(self.max_concurrency)
+                self._per_tool = {}
+            return self._global, self._per_tool
+
+    def _tool_semaphore(self, tool_name: str, per_tool: Dict[str, asyncio.Semaphore]) -> Optional[asyncio.Semaphore]:
+        semaphore = per_tool.get(tool_name)
+        if semaphore is None:
+            tool = get_tool(tool_name)
+            limit = getattr(tool, "max_concurrency", None)
+            if not limit:
+                return None
+            semaphore = per_tool.setdefault(tool_name, asyncio.Semaphore(limit))
+        return semaphore
+
+    @asynccontextmanager
+    async def slot(self, tool_name: str):
+        """Hold the per-tool and global slots while the tool runs"""
+        global_semaphore, per_tool = self._semaphores()
+        tool_semaphore = self._tool_semaphore(tool_name, per_tool)
+        if tool_name in GLOBAL_LIMIT_EXEMPT_TOOLS:
+            global_semaphore = None
+
+        # 先获取工具级槽位，再获取全局槽位，避免排队中的同名工具占用全局槽位
+        if tool_semaphore is not None:
+            await tool_semaphore.acquire()
+        try:
+            if global_semaphore is not None:
+                await global_semaphore.acquire()
+            try:
+                yield
+            finally:
+                if global_semaphore is not None:
+                    global_semaphore.release()
+        finally:
+            if tool_semaphore is not None:
+                tool_semaphore.release()
+
+
+# 全局工具并发限制实例
+_tool_limiter: Optional[ToolConcurrencyLimiter] = None
+_limiter_lock = threading.RLock()
+
+def get_tool_limiter() -> ToolConcurrencyLimiter:
+    """获取全局唯一的工具并发限制实例"""
+    global _tool_limiter
+
+    if _tool_limiter is None:
+        with _limiter_lock:
+            if _tool_limiter is None:
+                _tool_limiter = ToolConcurrencyLimiter(
+                    max_concurrency=int(os.getenv("TOOL_MAX_CONCURRENCY", 8))
+                )
+
+    return _tool_limiter
+
+
 class executor():
     def __init__(self,user_id:str,session_id:str,invocation_id:str,author:str):
         self.user_id = user_id
@@ -17,14 +105,14 @@ class executor():
         self.author = author
     
     async def execute_tool(self, tool_name: str, **kwargs) -> Dict[str, Any]:
-        if tool_name not in TOOLS:
+        tool = get_tool(tool_name)
+        if tool is None:
             return ToolExeResult(
                 success=False,
                 error=f"Unknown tool: {tool_name}",
                 result=f"Unknown tool: {tool_name}",
             )
 
-        tool = TOOLS[tool_name]
         result = await tool.execute(**kwargs)
         return result
     
@@ -37,11 +125,12 @@ class executor():
         """
         function_id = tool_call.id
         function_name = tool_call.function.name
-        function_arguments = json.loads(tool_call.function.arguments)
 
         try:
+            function_arguments = json.loads(tool_call.function.arguments or "{}")
+
             if function_name == "Task":
-                task_tool = TOOLS["Task"]
+                task_tool = get_tool("Task")
                 task_arguments = {
                     "description": function_arguments["description"],
                     "prompt": function_arguments["prompt"],
@@ -103,6 +192,17 @@ class executor():
             return
 
 
+    async def execute_limited_tool_streaming(
+        self,
+        tool_call: ToolCall,
+    ):
+        """
+        Execute single tool call streaming under the tool concurrency limits
+        """
+        async with get_tool_limiter().slot(tool_call.function.name):
+            async for event in self.execute_single_tool_streaming(tool_call):
+                yield event
+
     async def merge_tool_calls_run(
         self,
         tool_runs: List[Tuple[str, object]],
@@ -119,48 +219,60 @@ class executor():
         tasks = [asyncio.create_task(generator.__anext__()) for generator in generators]
         pending_tasks = set(tasks)
 
-        while pending_tasks:
-            done, pending_tasks = await asyncio.wait(pending_tasks, return_when=asyncio.FIRST_COMPLETED)
+        try:
+            while pending_tasks:
+                done, pending_tasks = await asyncio.wait(pending_tasks, return_when=asyncio.FIRST_COMPLETED)
 
-            for task in done:
-                try:
-                    event = task.result()
-                    yield event
-
-                    # 继续处理下一步
-                    for i, original_task in enumerate(tasks):
-                        if task == original_task:
-                            new_task = asyncio.create_task(generators[i].__anext__())
-                            tasks[i] = new_task
-                            pending_tasks.add(new_task)
-                            break
-
-                except StopAsyncIteration:
-                    # 该生成器已经完成
-                    continue
-                except Exception as e:
-                    # 该生成器发生异常
-                    toolcall_result = ToolCallResult(
-                        tool_call_id="",
-                        function_name="",
-                        result=ToolExeResult(
-                            success=False,
+                for task in done:
+                    try:
+                        event = task.result()
+                        yield event
+
+                        # 继续处理下一步
+                        for i, original_task in enumerate(tasks):
+                            if task == original_task:
+                                new_task = asyncio.create_task(generators[i].__anext__())
+                                tasks[i] = new_task
+                                pending_tasks.add(new_task)
+                                break
+
+                    except StopAsyncIteration:
+                        # 该生成器已经完成
+                        continue
+                    except Exception as e:
+                        # 该生成器发生异常
+                        toolcall_result = ToolCallResult(
+                            tool_call_id="",
+                            function_name="",
+                            result=ToolExeResult(
+                                success=False,
+                                error=str(e),
+                                result=str(e),
+                            ),
+                        )
+                        yield Event(
+                            type=EventType.ERROR,
+                            event_id=str(uuid.uuid4()),
+                            user_id=self.user_id,
+                            session_id=self.session_id,
+                            invocation_id=self.invocation_id,
+                            author=self.author,
+                            timestamp=time.time(),
+                            tool_result=toolcall_result,
                             error=str(e),
-                            result=str(e),
-                        ),
-                    )
-                    yield Event(
-                        type=EventType.ERROR,
-                        event_id=str(uuid.uuid4()),
-                        user_id=self.user_id,
-                        session_id=self.session_id,
-                        invocation_id=self.invocation_id,
-                        author=self.author,
-                        timestamp=time.time(),
-                        tool_result=toolcall_result,
-                        error=str(e),
-                    )
-                    continue
+                        )
+                        continue
+        finally:
+            # 运行被中止（调用方取消或关闭生成器）时，取消仍在执行的工具并关闭其生成器
+            for task in pending_tasks:
+                task.cancel()
+            if pending_tasks:
+                await asyncio.gather(*pending_tasks, return_exceptions=True)
+            for generator in generators:
+                try:
+                    await generator.aclose()
+                except Exception:
+                    pass
 
     async def handle_tool_call_streaming(
         self,
@@ -180,7 +292,7 @@ class executor():
         for tool_call in choice.message.tool_calls:
             tool_call_id = getattr(tool_call, "id", f"tool_{len(tool_runs)}")
             # produce single tool call streaming generator
-            generator = self.execute_single_tool_streaming(tool_call)
+            generator = self.execute_limited_tool_streaming(tool_call)
             tool_runs.append((tool_call_id, generator))
         
         # merge tool calls run
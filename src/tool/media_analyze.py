@@ -1,11 +1,79 @@
+import os
+import json
+import hashlib
+import threading
+import unicodedata
 from .base import BaseTool
 from ..logger import logger
-from typing import Optional
+from typing import Dict, Optional
 import asyncio
-from functools import partial
 
 from ..tool.types import ToolExeResult
 from ..model.vlm.qwen_vlm import QwenVLM
+from ..model.vlm.frame_sampler import get_frame_sampler, sample_keyframes
+from ..config.config import load_media_cache_config
+from ..utils.cache import MemoryCache, DiskCache, TieredCache
+from ..storage.upload_index import content_hash_from_url
+
+def media_cache_key(
+    media_url: str,
+    prompt: str,
+    model: str,
+    media_type: str,
+    fps: Optional[float],
+    sampling: Optional[str] = None,
+) -> str:
+    """
+    Cache key of a VLM analysis.
+
+    The media is identified by its content hash when the URL is content-addressed,
+    otherwise by the URL itself. The prompt is normalized (NFKC, collapsed
+    whitespace) so trivially different phrasings of the same query share a key.
+    """
+    content_hash = content_hash_from_url(media_url)
+    media_id = f"sha256:{content_hash}" if content_hash else f"url:{media_url}"
+    normalized_prompt = " ".join(unicodedata.normalize("NFKC", prompt).split())
+    raw = json.dumps(
+        [
+            media_id,
+            normalized_prompt,
+            model,
+            media_type,
+            fps if media_type == "video" else None,
+            sampling if media_type == "video" else None,
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# 全局 MediaAnalyze 结果缓存
+_media_cache: Optional[TieredCache] = None
+_media_cache_loaded = False
+_media_cache_lock = threading.RLock()
+
+
+def get_media_analyze_cache() -> Optional[TieredCache]:
+    """获取全局 MediaAnalyze 结果缓存，未启用时返回 None"""
+    global _media_cache, _media_cache_loaded
+
+    if not _media_cache_loaded:
+        with _media_cache_lock:
+            if not _media_cache_loaded:
+                config = load_media_cache_config()
+                if config["enabled"]:
+                    memory = MemoryCache(
+                        max_entries=config["max_entries"],
+                        max_bytes=config["max_bytes"],
+                        ttl=config["ttl"],
+                    )
+                    disk = None
+                    if config["disk_path"]:
+                        disk = DiskCache(config["disk_path"], max_bytes=config["disk_max_bytes"], ttl=config["ttl"])
+                    _media_cache = TieredCache(memory, disk)
+                _media_cache_loaded = True
+
+    return _media_cache
 
 
 class MediaAnalyze(BaseTool):
@@ -32,8 +100,11 @@ class MediaAnalyze(BaseTool):
             },
             "required": ["media_url", "user_query", "media_type"]
         }
+        self.max_concurrency = int(os.getenv("TOOL_MAX_CONCURRENCY_MEDIA_ANALYZE", 4))
 
         self.vlm = QwenVLM()
+        # 进行中的分析，相同请求并发时只调用一次模型；cache_key -> (task, 等待者数量)
+        self._inflight: Dict[str, list] = {}
 
     async def execute(
         self,
@@ -42,6 +113,7 @@ class MediaAnalyze(BaseTool):
         media_type: str,
         introduction: Optional[str] = None,
         max_retries: int = 3,
+        fps: float = 2.0,
         **kwargs
     ) -> ToolExeResult:
 
@@ -69,24 +141,71 @@ class MediaAnalyze(BaseTool):
                 error=f"Media type must be 'image' or 'video', got '{media_type}'",
             )
 
-        # ---------- 执行 ----------
-        for attempt in range(max_retries):
-            try:
-                loop = asyncio.get_running_loop()
-
-                # ⭐ 关键修复点：用 partial 封装关键字参数
-                func = partial(
-                    self.vlm.call_model,
-                    media_url=media_url,
-                    prompt=user_query,
-                    media_type=media_type,
-                )
-
-                response = await loop.run_in_executor(None, func)
+        # ---------- 缓存 ----------
+        cache = get_media_analyze_cache()
+        sampler = get_frame_sampler()
+        cache_key = media_cache_key(
+            media_url, user_query, self.vlm.model, media_type, fps, sampler.signature if sampler else None
+        )
+        if cache is not None:
+            # 磁盘层是 SQLite，查询放到线程中执行，不阻塞事件循环
+            cached = await asyncio.to_thread(cache.get, cache_key)
+            if cached is not None:
+                logger.info(f"✅ MediaAnalyze cache hit, metrics: {cache.metrics()}")
+                return ToolExeResult(success=True, result={"analysis_result": cached})
+
+        entry = self._inflight.get(cache_key)
+        if entry is None:
+            task = asyncio.ensure_future(
+                self._analyze(media_url, user_query, media_type, fps, max_retries, cache, cache_key)
+            )
+            entry = [task, 0]
+            self._inflight[cache_key] = entry
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        else:
+            logger.info("MediaAnalyze joined an in-flight identical request")
+
+        # shield：单个调用方被取消时不影响共享同一结果的其他调用方，最后一个调用方被取消时才取消模型调用
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            entry[1] -= 1
+            if entry[1] == 0:
+                task.cancel()
+            raise
+
+    async def _analyze(
+        self,
+        media_url: str,
+        user_query: str,
+        media_type: str,
+        fps: float,
+        max_retries: int,
+        cache: Optional[TieredCache],
+        cache_key: str,
+    ) -> ToolExeResult:
+        # ---------- 关键帧采样 ----------
+        # 本地抽取关键帧，代替服务端按固定 fps 解码整个视频；不可用时发送原视频
+        frames = await sample_keyframes(media_url) if media_type == "video" else None
+
+        try:
+            # ---------- 执行 ----------
+            for attempt in range(max_retries):
+                try:
+                    # 异步调用：按模型限流、超时，agent 运行中止时请求随之取消
+                    response = await self.vlm.acall_model(
+                        media_url=media_url,
+                        prompt=user_query,
+                        media_type=media_type,
+                        fps=fps,
+                        frames=frames,
+                    )
 
-                # print("="*80)
-                # print("MediaAnalyze response: ", response)
-                # print("="*80)
+                    # print("="*80)
+                    # print("MediaAnalyze response: ", response)
+                    # print("="*80)
 
 #                 response = """
 #   "description": "A close-up portrait of a small, fluffy orange tabby kitten sitting upright and looking directly at the camera with wide, curious greenish-yellow eyes. The kitten has prominent white whiskers, a pink nose, and soft fur with subtle striped markings. Its ears are perked up attentively. The background is softly blurred (bokeh effect), suggesting an indoor or rustic setting—possibly wooden planks or flooring—with warm, natural lighting that highlights the kitten’s fur texture and expressive face.",
@@ -96,29 +215,34 @@ class MediaAnalyze(BaseTool):
 #   "expression": "Alert, curious, innocent",
 #   "style": "High-detail, photorealistic (likely AI-generated or professionally photographed)"
 # """
-                # print("="*80)
-                # print("response: ", response)
-                # print("="*80)
-                logger.info("✅ MediaAnalyze executed successfully")
-
-                return ToolExeResult(
-                    success=True,
-                    result={"analysis_result": response},
-                )
-
-            except Exception as e:
-                error_msg = f"Media analyze failed: {e}"
-
-                if attempt < max_retries - 1:
-                    wait_time = (attempt + 1) * 2
-                    logger.error(
-                        f"⚠ {error_msg}，{wait_time}s 后重试 "
-                        f"({attempt + 1}/{max_retries})"
+                    # print("="*80)
+                    # print("response: ", response)
+                    # print("="*80)
+                    logger.info("✅ MediaAnalyze executed successfully")
+                    if cache is not None:
+                        await asyncio.to_thread(cache.set, cache_key, response)
+
+                    return ToolExeResult(
+                        success=True,
+                        result={"analysis_result": response},
                     )
-                    await asyncio.sleep(wait_time)
-                else:
-                    logger.exception("✗ MediaAnalyze failed after max retries")
-                    return ToolExeResult(success=False, error=error_msg)
+
+                except Exception as e:
+                    error_msg = f"Media analyze failed: {e}"
+
+                    if attempt < max_retries - 1:
+                        wait_time = (attempt + 1) * 2
+                        logger.error(
+                            f"⚠ {error_msg}，{wait_time}s 后重试 "
+                            f"({attempt + 1}/{max_retries})"
+                        )
+                        await asyncio.sleep(wait_time)
+                    else:
+                        logger.exception("✗ MediaAnalyze failed after max retries")
+                        return ToolExeResult(success=False, error=error_msg)
+        finally:
+            if frames is not None:
+                frames.cleanup()
 
         return ToolExeResult(
             success=False,
@@ -1,40 +1,114 @@
-import os
-from .upload_to_tos import UploadToTOS
-from .media_analyze import MediaAnalyze
-from .task import Task
-from .todo import TodoWrite
-from typing import List, Dict, Any
-
-TOOLS = {
-    "UploadToTOS": UploadToTOS(),
-    "MediaAnalyze": MediaAnalyze(),
-    "TodoWrite": TodoWrite(),
-    "Task": Task(),
-}
-
-AVAILABLE_TOOLS = {
-    "main_agent": [
-        ("UploadToTOS", UploadToTOS()),
-        ("MediaAnalyze", MediaAnalyze()),
-        ("TodoWrite", TodoWrite()),
-        ("Task", Task()),
-
-    ],
-    "analyzer_agent": [
-        ("UploadToTOS", UploadToTOS()),
-        ("MediaAnalyze", MediaAnalyze()),
-        ("TodoWrite", TodoWrite()),
-    ],
-}
-
-def get_tool_schema(agent_type) -> List[Dict[str, Any]]:
-    if agent_type not in AVAILABLE_TOOLS:
+"""
+Tool registry.
+
+Every tool is instantiated once, on first use, and shared by all agents. The
+per-agent schema lists are built once at the same time and cached as
+serialized JSON together with their token count, so constructing an agent only
+parses a cached string instead of rebuilding schemas. The registry is read-only
+after initialization; every caller gets its own copy of the schemas.
+"""
+
+import json
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from ..utils.count_tokens import count_tokens
+from .base import BaseTool
+
+# 各类 agent 可用的工具，按 schema 中的顺序排列（顺序固定，保证 prompt 前缀不变）
+AGENT_TOOLS: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    "main_agent": ("UploadToTOS", "MediaAnalyze", "TodoWrite", "Task"),
+    "analyzer_agent": ("UploadToTOS", "MediaAnalyze", "TodoWrite"),
+})
+
+
+def _create_tools() -> Dict[str, BaseTool]:
+    # 工具模块在首次使用时才导入，导入本模块不会创建模型客户端
+    from .media_analyze import MediaAnalyze
+    from .task import Task
+    from .todo import TodoWrite
+    from .upload_to_tos import UploadToTOS
+
+    return {tool.name: tool for tool in (UploadToTOS(), MediaAnalyze(), TodoWrite(), Task())}
+
+
+@dataclass(frozen=True)
+class ToolRegistry:
+    """Tools and precomputed per-agent schemas"""
+
+    tools: Mapping[str, BaseTool]
+    schema_json: Mapping[str, str]
+    schema_tokens: Mapping[str, int]
+
+    @classmethod
+    def build(cls) -> "ToolRegistry":
+        tools = _create_tools()
+        schema_json, schema_tokens = {}, {}
+        for agent_type, tool_names in AGENT_TOOLS.items():
+            schemas = [tools[name].get_schema() for name in tool_names]
+            schema_json[agent_type] = json.dumps(schemas, ensure_ascii=False)
+            schema_tokens[agent_type] = count_tokens(schema_json[agent_type])
+        return cls(
+            tools=MappingProxyType(tools),
+            schema_json=MappingProxyType(schema_json),
+            schema_tokens=MappingProxyType(schema_tokens),
+        )
+
+
+_registry: Optional[ToolRegistry] = None
+_registry_lock = threading.RLock()
+
+
+def get_tool_registry() -> ToolRegistry:
+    """获取全局唯一的工具注册表（首次调用时创建工具）"""
+    global _registry
+
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ToolRegistry.build()
+
+    return _registry
+
+
+def get_tool(tool_name: str) -> Optional[BaseTool]:
+    """按名称获取工具实例，不存在时返回 None"""
+    return get_tool_registry().tools.get(tool_name)
+
+
+def get_tool_schema(agent_type) -> Tuple[Dict[str, Any], ...]:
+    """
+    获取 agent 可用工具的 schema
+
+    每次返回由缓存的 JSON 解析出的新副本，调用方（或 LLM SDK）修改它不会影响注册表和其他 agent
+    """
+    return tuple(json.loads(get_tool_schema_json(agent_type)))
+
+
+def get_tool_schema_json(agent_type) -> str:
+    """agent 可用工具 schema 的 JSON"""
+    registry = get_tool_registry()
+    if agent_type not in registry.schema_json:
         raise ValueError(f"Invalid agent type: {agent_type}")
-    return [tool[1].get_schema() for tool in AVAILABLE_TOOLS[agent_type]]
+    return registry.schema_json[agent_type]
 
-class registor():
-    def __init__(self):
-        pass
 
+def get_tool_schema_tokens(agent_type) -> int:
+    """agent 可用工具 schema 的 token 数（估算）"""
+    registry = get_tool_registry()
+    if agent_type not in registry.schema_tokens:
+        raise ValueError(f"Invalid agent type: {agent_type}")
+    return registry.schema_tokens[agent_type]
 
 
+def __getattr__(name: str):
+    # 兼容旧的模块属性：TOOLS / AVAILABLE_TOOLS 在首次访问时才创建工具
+    if name == "TOOLS":
+        return get_tool_registry().tools
+    if name == "AVAILABLE_TOOLS":
+        tools = get_tool_registry().tools
+        return {agent_type: [(tool_name, tools[tool_name]) for tool_name in tool_names]
+                for agent_type, tool_names in AGENT_TOOLS.items()}
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,3 +1,4 @@
+import os
 import time
 import uuid
 from typing import TYPE_CHECKING, Any, Dict, Optional
@@ -65,6 +66,7 @@ class Task(BaseTool):
             },
             "required": ["description", "prompt", "subagent_type"],
         }
+        self.max_concurrency = int(os.getenv("TOOL_MAX_CONCURRENCY_TASK", 4))
 
         # 可用 subagent 类型
         self.available_agents = {
@@ -1,11 +1,13 @@
 from .base import BaseTool
-from ..config.config import load_tos_config
 from ..logger import logger
 from typing import Dict, Any, Optional
 import os
 import tos
-import time
+import asyncio
 from ..tool.types import ToolExeResult
+from ..storage.tos_client_pool import get_tos_client_pool, is_connection_error
+from ..storage.tos_multipart import get_tos_uploader
+from ..storage.upload_index import get_upload_index, content_addressed_key
 
 class UploadToTOS(BaseTool):
     def __init__(self):
@@ -19,6 +21,7 @@ class UploadToTOS(BaseTool):
             },
             "required": ["local_path"],
         }
+        self.max_concurrency = int(os.getenv("TOOL_MAX_CONCURRENCY_UPLOAD_TO_TOS", 4))
     
     async def execute(
         self, 
@@ -37,35 +40,67 @@ class UploadToTOS(BaseTool):
             return ToolExeResult(
                 success=False,
                 error=validation["error"],
+                result=validation["error"],
             )
 
-        tos_config = load_tos_config()
-        ak = tos_config["access_key"]
-        sk = tos_config["secret_key"]
-        endpoint = tos_config["endpoint"]
-        region = tos_config["region"]
-        bucket_name = tos_config["bucket_name"]
-
-        if not ak or not sk or not bucket_name:
-            logger.error("Missing required TOS configuration")
+        # client 池只在首次调用时加载配置并创建，之后复用长连接
+        try:
+            pool = get_tos_client_pool()
+        except ValueError as e:
+            logger.error(f"Missing required TOS configuration: {e}")
             return ToolExeResult(
                 success=False,
                 error="Missing required TOS configuration",
+                result="Missing required TOS configuration",
+            )
+        endpoint = pool.endpoint
+        bucket_name = pool.bucket_name
+
+        # 按内容哈希生成对象 key，相同内容只上传一次，不同文件同名也不会冲突
+        index = get_upload_index()
+        try:
+            content_hash = await asyncio.to_thread(index.file_hash, local_path)
+        except FileNotFoundError:
+            logger.error(f"✗ 文件不存在: {local_path}")
+            return ToolExeResult(
+                success=False,
+                error=f"File not found: {local_path}",
+                result=f"File not found: {local_path}",
             )
-        
-        object_key = f"{folder}/{os.path.basename(local_path)}"
 
-        # 重试循环
+        object_key = content_addressed_key(folder, content_hash, local_path)
+        file_url = f"https://{bucket_name}.{endpoint}/{object_key}"
+        if await asyncio.to_thread(index.get_url, bucket_name, object_key):
+            logger.info(f"✓ 文件已存在（本地索引命中）: {file_url}")
+            return ToolExeResult(
+                success=True,
+                result={"file_url": file_url},
+            )
+
+        uploader = get_tos_uploader()
+        state = None
+
+        # 重试循环（分片上传的状态在重试间保留，从已完成的分片继续）
         for attempt in range(max_retries):
-            client = None
+            client = pool.acquire()
             try:
-                # 创建客户端（每次重试都创建新的）
-                client = tos.TosClientV2(ak, sk, endpoint, region)
+                if state is None:
+                    # 索引未命中时先 HEAD 检查，对象已存在则无需上传
+                    if await uploader.exists(client, bucket_name, object_key):
+                        await asyncio.to_thread(
+                            index.put_url, bucket_name, object_key, file_url, os.path.getsize(local_path)
+                        )
+                        logger.info(f"✓ 文件已存在: {file_url}")
+                        return ToolExeResult(
+                            success=True,
+                            result={"file_url": file_url},
+                        )
+                    # 对象不存在：清除索引中过期的记录
+                    await asyncio.to_thread(index.invalidate, bucket_name, object_key)
+                    state = uploader.new_state(bucket_name, object_key, local_path)
+                await uploader.upload(client, state)
 
-                with open(local_path, "rb") as f:
-                    client.put_object(bucket_name, object_key, content=f.read())
-
-                file_url = f"https://{bucket_name}.{endpoint}/{object_key}"
+                await asyncio.to_thread(index.put_url, bucket_name, object_key, file_url, state.file_size)
                 logger.info(f"✓ 文件上传成功: {file_url}")
                 return ToolExeResult(
                     success=True,
@@ -74,12 +109,15 @@ class UploadToTOS(BaseTool):
 
             except tos.exceptions.TosClientError as e:
                 error_msg = f"TOS客户端错误: {e.message}"
+                if is_connection_error(e):
+                    # 连接层错误，下次重试换用新的 client；参数等错误不影响 client 本身
+                    pool.report_failure(client)
                 if "SSL" in str(e.cause) or "timeout" in str(e.message).lower():
                     # SSL 或超时错误，值得重试
                     if attempt < max_retries - 1:
                         wait_time = (attempt + 1) * 2  # 递增等待时间：2秒、4秒、6秒
                         logger.error(f"⚠ {error_msg}，{wait_time}秒后重试 ({attempt + 1}/{max_retries})...")
-                        time.sleep(wait_time)
+                        await asyncio.sleep(wait_time)
                         continue
                     else:
                         logger.error(f"✗ {error_msg}，已达最大重试次数")
@@ -89,6 +127,11 @@ class UploadToTOS(BaseTool):
                     
             except tos.exceptions.TosServerError as e:
                 logger.error(f"✗ TOS服务端错误, 错误码: {e.code}; 请求ID: {e.request_id}; 错误信息: {e.message}")
+                if e.code == "NoSuchUpload" and state is not None and attempt < max_retries - 1:
+                    # 分片上传已失效，从头开始
+                    state.upload_id = None
+                    state.completed_parts = {}
+                    continue
                 break
                 
             except FileNotFoundError:
@@ -100,20 +143,21 @@ class UploadToTOS(BaseTool):
                 if attempt < max_retries - 1:
                     wait_time = (attempt + 1) * 2
                     logger.error(f"⚠ {error_msg}，{wait_time}秒后重试 ({attempt + 1}/{max_retries})...")
-                    time.sleep(wait_time)
+                    await asyncio.sleep(wait_time)
                     continue
                 else:
                     logger.error(f"✗ {error_msg}，已达最大重试次数")
-                    
+
             finally:
-                # 清理客户端连接
-                if client:
-                    try:
-                        client.close()
-                    except:
-                        pass
+                pool.release(client)
+
+        # 上传最终失败，释放未完成的分片
+        if state is not None and state.upload_id is not None:
+            with pool.lease() as client:
+                await uploader.abort(client, state)
         
         return ToolExeResult(
             success=False,
             error="File upload failed after max retries",
+            result="File upload failed after max retries",
         )
\ No newline at end of file
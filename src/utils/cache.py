@@ -0,0 +1,281 @@
+"""
+Pluggable result cache.
+
+``MemoryCache`` is an in-process LRU with entry-count, size and TTL eviction,
+``DiskCache`` a SQLite tier that survives restarts and is shared by processes on
+the same host, and ``TieredCache`` chains them (memory first, disk hits are
+promoted). Values must be JSON serializable. Every cache keeps hit/miss metrics.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class CacheStats:
+    """Thread-safe hit/miss counters"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def record(self, name: str, count: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + count)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "sets": self.sets,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+class BaseCache(ABC):
+    """Cache interface"""
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value, None on a miss"""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> None:
+        """Store a value"""
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a key"""
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove all keys"""
+        pass
+
+
+def _sizeof(value: Any) -> int:
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+class MemoryCache(BaseCache):
+    """In-memory LRU cache with entry-count, byte-size and TTL eviction"""
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 64 * 1024 * 1024, ttl: Optional[float] = None):
+        """
+        Args:
+            max_entries: Max number of entries
+            max_bytes: Max total size of the cached values in bytes, 0 for no limit
+            ttl: Seconds an entry stays valid, None for no expiry
+        """
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (value, size, expires_at)
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[2] is not None and item[2] <= time.time():
+                self._pop(key)
+                item = None
+            if item is None:
+                self.stats.record("misses")
+                return None
+            self._data.move_to_end(key)
+        self.stats.record("hits")
+        return item[0]
+
+    def set(self, key: str, value: Any) -> None:
+        size = _sizeof(value)
+        if self.max_bytes and size > self.max_bytes:
+            return
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (value, size, expires_at)
+            self._bytes += size
+            evicted = 0
+            while len(self._data) > self.max_entries or (self.max_bytes and self._bytes > self.max_bytes):
+                self._pop(next(iter(self._data)))
+                evicted += 1
+        self.stats.record("sets")
+        if evicted:
+            self.stats.record("evictions", evicted)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _pop(self, key: str) -> None:
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+
+class DiskCache(BaseCache):
+    """SQLite cache tier with TTL and least-recently-used size eviction"""
+
+    def __init__(self, path: str, max_bytes: int = 512 * 1024 * 1024, ttl: Optional[float] = None):
+        """
+        Args:
+            path: SQLite file path
+            max_bytes: Max total size of the cached values in bytes, 0 for no limit
+            ttl: Seconds an entry stays valid, None for no expiry
+        """
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed_at ON cache (accessed_at)")
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] is not None and row[1] <= now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        if row is None:
+            self.stats.record("misses")
+            return None
+        self.stats.record("hits")
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, data, size, expires_at, now),
+            )
+            evicted = self._evict(now)
+        self.stats.record("sets")
+        if evicted:
+            self.stats.record("evictions", evicted)
+
+    def _evict(self, now: float) -> int:
+        evicted = self._conn.execute(
+            "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+        ).rowcount
+        if not self.max_bytes:
+            return evicted
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return evicted
+        # 按最近访问时间从旧到新淘汰，直到总大小回到上限以内
+        for key, size in self._conn.execute("SELECT key, size FROM cache ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        return evicted
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache(BaseCache):
+    """Memory tier in front of an optional disk tier"""
+
+    def __init__(self, memory: MemoryCache, disk: Optional[DiskCache] = None):
+        super().__init__()
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        self.stats.record("misses" if value is None else "hits")
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+        self.stats.record("sets")
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hit/miss metrics of the cache and of each tier"""
+        metrics = {**self.stats.to_dict(), "memory": self.memory.stats.to_dict()}
+        if self.disk is not None:
+            metrics["disk"] = self.disk.stats.to_dict()
+        return metrics
@@ -0,0 +1,69 @@
+"""
+Async ffmpeg helpers shared by the local media preprocessing stages.
+"""
+
+import os
+import re
+import shutil
+import asyncio
+from typing import List, Optional, Tuple
+
+_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+class FFmpegError(Exception):
+    """ffmpeg failed, timed out or is not installed"""
+
+
+def get_ffmpeg_bin() -> Optional[str]:
+    """Path of the ffmpeg binary (FFMPEG_BIN or PATH), None if not installed"""
+    return shutil.which(os.getenv("FFMPEG_BIN", "ffmpeg"))
+
+
+def ffmpeg_available() -> bool:
+    return get_ffmpeg_bin() is not None
+
+
+async def run_ffmpeg(args: List[str], timeout: Optional[float] = None) -> Tuple[int, str]:
+    """
+    Run ffmpeg with ``args`` and return (returncode, stderr).
+
+    The process is killed on timeout or when the awaiting task is cancelled.
+
+    Raises:
+        FFmpegError: If ffmpeg is not installed or times out.
+    """
+    ffmpeg = get_ffmpeg_bin()
+    if ffmpeg is None:
+        raise FFmpegError("ffmpeg not found, install it or set FFMPEG_BIN")
+
+    process = await asyncio.create_subprocess_exec(
+        ffmpeg, "-hide_banner", "-nostdin", *args,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        raise FFmpegError(f"ffmpeg timed out after {timeout}s")
+    finally:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+    return process.returncode, stderr.decode("utf-8", errors="replace")
+
+
+async def probe_duration(source: str, timeout: Optional[float] = None) -> float:
+    """
+    Duration of a local or remote media file in seconds.
+
+    Raises:
+        FFmpegError: If the duration cannot be read.
+    """
+    # 不指定输出时 ffmpeg 只打印输入信息（返回码非 0），从中解析时长
+    _, stderr = await run_ffmpeg(["-i", source], timeout=timeout)
+    match = _DURATION_RE.search(stderr)
+    if match is None:
+        raise FFmpegError(f"Cannot read media duration: {source}")
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
@@ -0,0 +1,121 @@
+"""
+Cold-start import time of the entry points.
+
+Every sample imports one entry point in a fresh interpreter with
+``python -X importtime`` and reports the cumulative import time of the entry
+module, plus the heaviest top-level packages it pulled in. Provider SDKs
+(litellm, dashscope, tos) and SQLAlchemy should not show up here: they load
+on first use.
+
+Results can be saved and compared against a previous run to track regressions:
+
+    python test/bench_import_time.py [iterations] [--save before.json] [--compare before.json]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 入口模块：智能体包、命令行入口、建库脚本
+ENTRY_POINTS = ["src.agent.main", "main", "src.config.setup_database"]
+
+# 导入时不应加载的重量级 SDK
+LAZY_PACKAGES = ["litellm", "openai", "dashscope", "tos", "sqlalchemy"]
+
+
+def import_once(module: str) -> Tuple[float, Dict[str, float]]:
+    """
+    在新进程中导入模块一次
+
+    Returns:
+        (入口模块累计导入耗时 ms, 顶层包 -> 累计导入耗时 ms)
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    env.setdefault("DASHSCOPE_API_KEY", "bench")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    total = 0.0
+    packages: Dict[str, float] = defaultdict(float)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue  # 表头
+        ms = int(cumulative) / 1000
+        stripped = name.strip()
+        if stripped == module:
+            total = ms
+        # 每个包只在第一次（最外层）导入时计入
+        top = stripped.split(".")[0]
+        if stripped == top and top not in packages:
+            packages[top] = ms
+    return total, packages
+
+
+def bench(module: str, iterations: int) -> Dict:
+    totals: List[float] = []
+    packages: Dict[str, float] = {}
+    for _ in range(iterations):
+        total, packages = import_once(module)
+        totals.append(total)
+    heaviest = sorted(
+        ((name, ms) for name, ms in packages.items() if name != module.split(".")[0]),
+        key=lambda item: item[1], reverse=True,
+    )[:8]
+    return {
+        "median_ms": statistics.median(totals),
+        "min_ms": min(totals),
+        "heaviest": heaviest,
+        "lazy_violations": [name for name in LAZY_PACKAGES if name in packages],
+    }
+
+
+def report(module: str, result: Dict, baseline: Dict = None) -> None:
+    line = f"{module:<28} median {result['median_ms']:8.1f} ms   min {result['min_ms']:8.1f} ms"
+    if baseline and module in baseline:
+        before = baseline[module]["median_ms"]
+        line += f"   ({result['median_ms'] - before:+.1f} ms vs baseline {before:.1f} ms)"
+    print(line)
+    print("    heaviest: " + ", ".join(f"{name} {ms:.0f}ms" for name, ms in result["heaviest"]))
+    if result["lazy_violations"]:
+        print(f"    [WARN] imported eagerly: {', '.join(result['lazy_violations'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("iterations", nargs="?", type=int, default=5)
+    parser.add_argument("--module", action="append", help="entry point to measure (repeatable)")
+    parser.add_argument("--save", help="write results to a JSON file")
+    parser.add_argument("--compare", help="compare against a JSON file written by --save")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    for module in args.module or ENTRY_POINTS:
+        results[module] = bench(module, args.iterations)
+        report(module, results[module], baseline)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import sys
+import asyncio
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.model.asr import audio_preprocess as audio_module
+from src.model.asr import chunked as chunked_module
+from src.model.asr.audio_preprocess import AudioPreprocessor
+from src.model.asr.base_asr import ASRResult
+from src.model.asr.chunked import AudioChunk, extract_sentences, plan_chunks, stitch_transcriptions, transcribe_chunked
+from src.tool import upload_to_tos as upload_module
+from src.tool.types import ToolExeResult
+
+
+def test_plan_chunks_cuts_at_longest_silence_near_target():
+    # 目标切点 100s 附近有两段静音，取较长的一段；200s 附近没有静音，硬切并重叠
+    silences = [(95.0, 95.5), (104.0, 106.0), (150.0, 151.0)]
+    chunks = plan_chunks(silences, 320.0, chunk_seconds=100, search_window=10, overlap=1.0)
+
+    assert [(c.own_start, c.own_end) for c in chunks] == [(0.0, 105.0), (105.0, 205.0), (205.0, 320.0)]
+    assert (chunks[0].start, chunks[0].end) == (0.0, 105.0)
+    assert (chunks[1].start, chunks[1].end) == (105.0, 206.0)
+    assert (chunks[2].start, chunks[2].end) == (204.0, 320.0)
+
+    # 短音频不切分
+    assert len(plan_chunks([], 120.0, chunk_seconds=100)) == 1
+
+
+def test_extract_sentences_from_all_providers():
+    qwen = {"result": {"sentences": [{"sentence_id": 1, "text": "你好", "begin_time": 0, "end_time": 900, "language": "zh"}]}}
+    bytedance = {"result": {"text": "你好", "utterances": [{"text": "你好", "start_time": 0, "end_time": 900}]}}
+    funasr = {"transcripts": [{"channel_id": 0, "sentences": [{"text": "你好", "begin_time": 0, "end_time": 900}]}]}
+
+    for transcription in (qwen, bytedance, funasr):
+        sentence = extract_sentences(transcription)[0]
+        assert (sentence["text"], sentence["begin_time"], sentence["end_time"]) == ("你好", 0, 900)
+        assert set(sentence) == {"channel_id", "sentence_id", "text", "begin_time", "end_time", "language", "emotion"}
+
+
+def test_stitch_offsets_and_dedupes_overlap():
+    chunks = [AudioChunk(0, 0.0, 11.0, 0.0, 10.0), AudioChunk(1, 9.0, 20.0, 10.0, 20.0)]
+
+    def sentences(*items):
+        return {"result": {"sentences": [
+            {"text": text, "begin_time": begin, "end_time": end} for text, begin, end in items
+        ]}, "usage": {"model": "qwen3-asr-flash-filetrans", "seconds": 10}}
+
+    transcriptions = [
+        # 第一段在硬切处截到半句（8.5-11s）
+        sentences(("first", 1000, 5000), ("cut", 8500, 11000)),
+        # 第二段从 9s 开始：开头的半句中点在负责区间外，完整的句子（8.5-12s）保留
+        sentences(("ut", 0, 500), ("cut sentence", 0, 3000), ("last", 5000, 9000)),
+    ]
+    result = stitch_transcriptions(chunks, transcriptions, "/data/a.mp4")
+
+    assert [(s["sentence_id"], s["text"], s["begin_time"], s["end_time"]) for s in result["result"]["sentences"]] == [
+        (1, "first", 1000, 5000),
+        (2, "cut sentence", 9000, 12000),
+        (3, "last", 14000, 18000),
+    ]
+    assert result["result"]["text"] == "first cut sentence last"
+    assert result["usage"] == {"model": "qwen3-asr-flash-filetrans", "total_duration_ms": 18000, "seconds": 20}
+    assert result["audio_info"]["file_url"] == "/data/a.mp4"
+
+
+def test_chunk_cuts_and_uploads_are_bounded(monkeypatch):
+    running = {"ffmpeg": 0, "upload": 0}
+    peak = {"ffmpeg": 0, "upload": 0}
+
+    async def hold(kind, seconds):
+        running[kind] += 1
+        peak[kind] = max(peak[kind], running[kind])
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            running[kind] -= 1
+
+    async def fake_run_ffmpeg(args, timeout=None):
+        await hold("ffmpeg", 0.01)
+        if args[-1] != "-":
+            Path(args[-1]).write_bytes(b"audio")
+        # 10 分钟且没有静音的音频
+        return 0, "size=1kB time=00:10:00.00 bitrate=1kbit/s"
+
+    class FakeUpload:
+        async def execute(self, local_path, **kwargs):
+            await hold("upload", 0.05)
+            return ToolExeResult(success=True, result={"file_url": f"https://bucket/{Path(local_path).name}"})
+
+    class FakeASR:
+        async def atranscribe(self, urls, language_hints=None, **kwargs):
+            sentences = [{"text": "hi", "begin_time": 50000, "end_time": 51000}]
+            return [ASRResult(url, 'success', transcription={"result": {"sentences": sentences}}).to_dict() for url in urls]
+
+    monkeypatch.setattr(audio_module, "run_ffmpeg", fake_run_ffmpeg)
+    monkeypatch.setattr(chunked_module, "ffmpeg_available", lambda: True)
+    monkeypatch.setattr(upload_module, "UploadToTOS", FakeUpload)
+    preprocessor = AudioPreprocessor(concurrency=2, upload_concurrency=3)
+    monkeypatch.setattr(chunked_module, "get_audio_preprocessor", lambda: preprocessor)
+
+    result = asyncio.run(transcribe_chunked(FakeASR(), "/data/long.mp4", chunk_seconds=100))
+    assert result["status"] == "success"
+    assert len(result["transcription"]["result"]["sentences"]) == 6
+    # 各分段的裁剪和上传在预处理器的并发上限内排队
+    assert peak == {"ffmpeg": 2, "upload": 3}
+
+
+if __name__ == "__main__":
+    test_plan_chunks_cuts_at_longest_silence_near_target()
+    test_extract_sentences_from_all_providers()
+    test_stitch_offsets_and_dedupes_overlap()
+    with pytest.MonkeyPatch.context() as mp:
+        test_chunk_cuts_and_uploads_are_bounded(mp)
+    print("[OK] chunked asr")
@@ -0,0 +1,69 @@
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.model.asr import http_client
+from src.model.asr.http_client import fetch_json, get_http_session
+
+PAYLOAD = {"transcripts": [{"channel_id": 0, "sentences": [
+    {"sentence_id": i, "text": "你好" * 20, "begin_time": i * 1000, "end_time": i * 1000 + 900.5}
+    for i in range(2000)
+]}]}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    client_ports = set()
+
+    def do_GET(self):
+        Handler.client_ports.add(self.client_address[1])
+        body = json.dumps(PAYLOAD, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/result.json"
+
+
+def test_fetch_json_reuses_connection():
+    server, url = serve()
+    Handler.client_ports.clear()
+    try:
+        for _ in range(3):
+            assert fetch_json(url, "test") == PAYLOAD
+        # keep-alive：三次下载只建立一个连接
+        assert len(Handler.client_ports) == 1
+        assert get_http_session("test") is get_http_session("test")
+        assert get_http_session("test") is not get_http_session("other")
+    finally:
+        server.shutdown()
+        http_client.close_http_sessions()
+
+
+def test_fetch_json_without_ijson(monkeypatch):
+    monkeypatch.setattr(http_client, "ijson", None)
+    server, url = serve()
+    try:
+        assert fetch_json(url, "test") == PAYLOAD
+    finally:
+        server.shutdown()
+        http_client.close_http_sessions()
+
+
+if __name__ == "__main__":
+    test_fetch_json_reuses_connection()
+    print("[OK] asr http client")
@@ -0,0 +1,113 @@
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.model.asr.base_asr import BaseASR, ASRJob, ASRResult
+from src.model.asr.job_engine import ASRJobEngine
+
+
+class FakeASR(BaseASR):
+    """每个文件在 durations[file_url] 秒后完成的假 ASR 服务"""
+
+    use_cache = False
+
+    def __init__(self, durations):
+        super().__init__()
+        self.durations = durations
+        self.polls = 0
+
+    def submit_job(self, file_url, **kwargs):
+        if file_url == "bad":
+            raise Exception("submit failed")
+        return ASRJob(file_url, f"task-{file_url}", kwargs=kwargs)
+
+    def poll_job(self, job):
+        self.polls += 1
+        if job.elapsed < self.durations[job.file_url]:
+            return None
+        return ASRResult(job.file_url, 'success', transcription={"text": job.file_url}).to_dict()
+
+
+def make_engine(**kwargs):
+    return ASRJobEngine(poll_initial_interval=0.01, poll_max_interval=0.05, poll_backoff=2, **kwargs)
+
+
+def test_jobs_run_concurrently_and_yield_as_completed():
+    asr = FakeASR({"slow": 0.3, "fast": 0.05, "mid": 0.15})
+    engine = make_engine()
+
+    async def run():
+        start = time.monotonic()
+        order = [r["file_url"] async for r in engine.transcribe_iter(asr, ["slow", "fast", "mid"])]
+        return order, time.monotonic() - start
+
+    order, elapsed = asyncio.run(run())
+    assert order == ["fast", "mid", "slow"]
+    # 并发轮询：总耗时接近最慢的任务，而不是三者之和
+    assert elapsed < 0.5
+
+
+def test_results_keep_input_order_and_report_failures():
+    asr = FakeASR({"a": 0.05, "b": 0.0})
+    results = asyncio.run(make_engine().transcribe(asr, ["a", "bad", "b"], language_hints=["zh"]))
+    assert [r["file_url"] for r in results] == ["a", "bad", "b"]
+    assert [r["status"] for r in results] == ["success", "failed", "success"]
+
+
+def test_job_timeout():
+    asr = FakeASR({"never": 60})
+    results = asyncio.run(make_engine(job_timeout=0.1).transcribe(asr, "never"))
+    assert results[0]["status"] == "failed"
+
+
+def test_sync_transcribe_uses_jobs():
+    asr = FakeASR({"a": 0.05, "b": 0.05})
+    results = asr.transcribe(["a", "b"])
+    assert [asr.extract_text(r) for r in results] == ["a", "b"]
+
+
+class FlakyASR(FakeASR):
+    """查询前 failures[file_url] 次抛出异常"""
+
+    def __init__(self, failures):
+        super().__init__({file_url: 0 for file_url in failures})
+        self.failures = dict(failures)
+
+    def poll_job(self, job):
+        if self.failures[job.file_url] > 0:
+            self.failures[job.file_url] -= 1
+            self.polls += 1
+            raise Exception("poll failed")
+        return super().poll_job(job)
+
+
+def test_poll_errors_fail_a_job_only_after_the_budget(monkeypatch):
+    monkeypatch.setenv("ASR_POLL_INITIAL_INTERVAL", "0.01")
+    monkeypatch.setenv("ASR_MAX_POLL_ERRORS", "3")
+
+    # 同步接口与 ASRJobEngine 使用相同的出错预算
+    asr = FlakyASR({"flaky": 2, "broken": 100})
+    results = asr.transcribe(["flaky", "broken"])
+    assert [r["status"] for r in results] == ["success", "failed"]
+    assert results[1]["error"] == "poll failed"
+    assert asr.failures["broken"] == 97
+
+    asr = FlakyASR({"flaky": 2, "broken": 100})
+    results = asyncio.run(make_engine(max_poll_errors=3).transcribe(asr, ["flaky", "broken"]))
+    assert [r["status"] for r in results] == ["success", "failed"]
+    assert asr.failures["broken"] == 97
+
+
+if __name__ == "__main__":
+    test_jobs_run_concurrently_and_yield_as_completed()
+    test_results_keep_input_order_and_report_failures()
+    test_job_timeout()
+    test_sync_transcribe_uses_jobs()
+    import pytest
+    with pytest.MonkeyPatch.context() as mp:
+        test_poll_errors_fail_a_job_only_after_the_budget(mp)
+    print("[OK] asr job engine")
@@ -0,0 +1,110 @@
+import sys
+import asyncio
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+sys.path.append(str(PROJECT_ROOT / "test"))
+
+from src.model.asr import audio_preprocess, result_cache
+from src.model.asr.audio_preprocess import PreparedAudio, TimestampMap, transcribe_media
+from src.model.asr.base_asr import ASRResult
+from src.model.asr.result_cache import ASRResultCache, audio_fingerprint
+from src.utils.cache import DiskCache, MemoryCache, TieredCache
+from test_asr_job_engine import FakeASR
+
+HASH = "ab" * 32
+
+
+class CachedFakeASR(FakeASR):
+    use_cache = True
+
+    def __init__(self, durations):
+        super().__init__(durations)
+        self.submitted = []
+
+    def submit_job(self, file_url, **kwargs):
+        self.submitted.append(file_url)
+        return super().submit_job(file_url, **kwargs)
+
+
+def use_cache(monkeypatch, tmp_path):
+    cache = ASRResultCache(TieredCache(MemoryCache(), DiskCache(str(tmp_path / "asr_cache.db"))))
+    monkeypatch.setattr(result_cache, "_asr_result_cache", cache)
+    monkeypatch.setattr(result_cache, "_asr_cache_loaded", True)
+    return cache
+
+
+def test_fingerprint_uses_content_hash():
+    assert audio_fingerprint(f"https://bucket.tos.com/asr_audio/{HASH}.ogg?X-Sig=1") == f"sha256:{HASH}"
+    assert audio_fingerprint(f"https://bucket.tos.com/other/{HASH}.ogg") == f"sha256:{HASH}"
+    assert audio_fingerprint("https://example.com/a.mp3") == "url:https://example.com/a.mp3"
+
+
+def test_repeat_transcribe_hits_cache(monkeypatch, tmp_path):
+    cache = use_cache(monkeypatch, tmp_path)
+    url = f"https://bucket.tos.com/asr_audio/{HASH}.ogg"
+    asr = CachedFakeASR({url: 0.0, "b": 0.0})
+
+    first = asr.transcribe([url, "b"], language_hints=["zh"])
+    assert asr.submitted == [url, "b"]
+    second = asr.transcribe([url, "b"], language_hints=["zh"])
+    assert asr.submitted == [url, "b"]
+    assert second == first
+
+    # 语言提示或识别参数不同则不命中
+    asr.transcribe([url], language_hints=["en"])
+    asr.transcribe([url], language_hints=["zh"], diarization_enabled=True)
+    assert asr.submitted == [url, "b", url, url]
+    assert cache.metrics()["hits"] == 2
+
+
+def test_async_transcribe_mixes_hits_and_misses(monkeypatch, tmp_path):
+    use_cache(monkeypatch, tmp_path)
+    asr = CachedFakeASR({"a": 0.0, "b": 0.0})
+    asr.transcribe(["a"])
+
+    results = asyncio.run(asr.atranscribe(["b", "bad", "a"]))
+    assert [r["file_url"] for r in results] == ["b", "bad", "a"]
+    assert [r["status"] for r in results] == ["success", "failed", "success"]
+    assert asr.submitted == ["a", "b", "bad"]
+
+    # 失败的结果不缓存
+    asyncio.run(asr.atranscribe(["b", "bad"]))
+    assert asr.submitted == ["a", "b", "bad", "bad"]
+
+
+class SentenceFakeASR(CachedFakeASR):
+    def poll_job(self, job):
+        return ASRResult(job.file_url, 'success', transcription={
+            "result": {"sentences": [{"begin_time": 1000, "end_time": 2000}]},
+        }).to_dict()
+
+
+class FakePreprocessor:
+    async def prepare(self, source):
+        # 裁剪后的音频从原始媒体的第 10 秒开始
+        return PreparedAudio(source, f"https://bucket.tos.com/asr_audio/{HASH}.ogg", TimestampMap([(10.0, 100.0)]), 100.0)
+
+
+def test_cached_results_are_not_shared(monkeypatch, tmp_path):
+    cache = use_cache(monkeypatch, tmp_path)
+    monkeypatch.setattr(audio_preprocess, "get_audio_preprocessor", lambda: FakePreprocessor())
+    asr = SentenceFakeASR({})
+
+    # 时间戳映射修改的是副本，重复识别同一媒体结果一致
+    results = [asyncio.run(transcribe_media(asr, "/data/video.mp4"))[0] for _ in range(3)]
+    assert results[0] == results[1] == results[2]
+    assert results[0]["transcription"]["result"]["sentences"][0]["begin_time"] == 11000
+    assert len(asr.submitted) == 1
+
+    # 缓存中保存的是未映射的原始结果，且不含本次请求的结果序号
+    [key] = list(cache.cache.memory._data)
+    stored = cache.cache.get(key)
+    assert "index" not in stored
+    assert stored["transcription"]["result"]["sentences"][0]["begin_time"] == 1000
+
+
+if __name__ == "__main__":
+    test_fingerprint_uses_content_hash()
+    print("[OK] asr result cache")
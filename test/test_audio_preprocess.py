@@ -0,0 +1,125 @@
+import sys
+import copy
+import asyncio
+import hashlib
+import tempfile
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.model.asr import audio_preprocess as audio_module
+from src.model.asr.audio_preprocess import AudioPreprocessor, TimestampMap, transcribe_media
+from src.model.asr.base_asr import ASRResult
+from src.tool import upload_to_tos as upload_module
+from src.tool.types import ToolExeResult
+from src.utils.ffmpeg import ffmpeg_available, run_ffmpeg
+
+
+def test_keep_segments_drops_edges_and_long_gaps():
+    preprocessor = AudioPreprocessor(padding=0.2)
+    # 开头 2s 静音，中间 5-10s 静音，结尾 12-15s 静音
+    segments = preprocessor.keep_segments([(0.0, 2.0), (5.0, 10.0), (12.0, 15.0)], 15.0)
+    assert segments == [(1.8, 5.2), (9.8, 12.2)]
+    assert preprocessor.keep_segments([], 8.0) == [(0.0, 8.0)]
+
+
+def test_timestamp_map_remaps_all_providers():
+    timestamp_map = TimestampMap([(1.8, 5.2), (9.8, 12.2)])
+    assert abs(timestamp_map.duration - 5.8) < 1e-9
+
+    qwen = {"result": {"sentences": [{"begin_time": 0, "end_time": 3400}, {"begin_time": 3400, "end_time": 5500}]}}
+    original = copy.deepcopy(qwen)
+    sentences = timestamp_map.remap(qwen)["result"]["sentences"]
+    # 返回副本，原结果（可能在缓存中）保持不变
+    assert qwen == original
+    # 区间边界上的开始时间属于后一段，结束时间属于前一段
+    assert [(s["begin_time"], s["end_time"]) for s in sentences] == [(1800, 5200), (9800, 11900)]
+
+    bytedance = {"result": {"utterances": [{"start_time": 100, "end_time": 500, "words": [{"start_time": 100, "end_time": 200}]}]}}
+    utterance = timestamp_map.remap(bytedance)["result"]["utterances"][0]
+    assert (utterance["start_time"], utterance["end_time"]) == (1900, 2300)
+    assert utterance["words"][0] == {"start_time": 1900, "end_time": 2000}
+
+
+def test_empty_map_is_identity():
+    data = {"begin_time": 1234, "end_time": 5678}
+    assert TimestampMap([]).remap(data) == {"begin_time": 1234, "end_time": 5678}
+
+
+@pytest.mark.skipif(not ffmpeg_available(), reason="ffmpeg not installed")
+def test_extracted_audio_is_deterministic():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            source = str(Path(tmp) / "tone.wav")
+            await run_ffmpeg(["-f", "lavfi", "-i", "sine=d=3", "-y", source])
+            preprocessor = AudioPreprocessor()
+            digests = []
+            for name in ("a", "b"):
+                workdir = Path(tmp) / name
+                workdir.mkdir()
+                path, _, _ = await preprocessor.extract(source, str(workdir))
+                digests.append(hashlib.sha256(Path(path).read_bytes()).hexdigest())
+            # 相同输入得到相同内容，上传去重和识别缓存才能命中
+            assert digests[0] == digests[1]
+
+    asyncio.run(run())
+
+
+class Peak:
+    """记录同时进行的调用数"""
+
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+
+    async def hold(self, seconds):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self.running -= 1
+
+
+def test_media_preprocessing_is_bounded(monkeypatch):
+    ffmpeg, uploads = Peak(), Peak()
+
+    async def fake_run_ffmpeg(args, timeout=None):
+        await ffmpeg.hold(0.01)
+        Path(args[-1]).write_bytes(b"audio")
+        return 0, "size=1kB time=00:00:05.00 bitrate=1kbit/s"
+
+    class FakeUpload:
+        async def execute(self, local_path, **kwargs):
+            await uploads.hold(0.05)
+            return ToolExeResult(success=True, result={"file_url": f"https://bucket/{kwargs['folder']}"})
+
+    class FakeASR:
+        async def atranscribe(self, urls, language_hints=None, **kwargs):
+            return [ASRResult(url, 'success', transcription={"text": ""}).to_dict() for url in urls]
+
+    monkeypatch.setattr(audio_module, "run_ffmpeg", fake_run_ffmpeg)
+    monkeypatch.setattr(audio_module, "ffmpeg_available", lambda: True)
+    monkeypatch.setattr(upload_module, "UploadToTOS", FakeUpload)
+    monkeypatch.setattr(audio_module, "_audio_preprocessor", AudioPreprocessor(concurrency=2, upload_concurrency=3))
+
+    sources = [f"/data/clip{i}.mp4" for i in range(8)]
+    results = asyncio.run(transcribe_media(FakeASR(), sources))
+    assert [r["file_url"] for r in results] == sources
+    assert all(r["status"] == "success" for r in results)
+    # ffmpeg 进程数和上传数不超过各自的上限
+    assert ffmpeg.peak == 2
+    assert uploads.peak == 3
+
+
+if __name__ == "__main__":
+    test_keep_segments_drops_edges_and_long_gaps()
+    test_timestamp_map_remaps_all_providers()
+    test_empty_map_is_identity()
+    test_extracted_audio_is_deterministic()
+    with pytest.MonkeyPatch.context() as mp:
+        test_media_preprocessing_is_bounded(mp)
+    print("[OK] audio preprocess")
@@ -0,0 +1,55 @@
+import sys
+import json
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.event.events import ChunkEvent, EventType
+from src.orchestration.coalescer import ChunkCoalescer
+
+
+def make_chunk(delta: str) -> ChunkEvent:
+    return ChunkEvent(
+        type=EventType.RESPONSE_CHUNK,
+        event_id="chunk_001",
+        user_id="user_123",
+        session_id="session_456",
+        invocation_id="invocation_001",
+        author="main_agent",
+        timestamp=time.time(),
+        delta=delta,
+        model="dashscope/qwen-max-latest",
+    )
+
+
+def test_chunk_event_content_is_lazy():
+    chunk = make_chunk("你好")
+    assert chunk._content is None
+    assert json.loads(chunk.content)[0]["delta"]["content"] == "你好"
+    assert chunk.to_event().content == chunk.content
+
+
+def test_coalesce_by_bytes():
+    coalescer = ChunkCoalescer(max_bytes=8)
+    assert coalescer.add(make_chunk("abc")) is None
+    merged = coalescer.add(make_chunk("defgh"))
+    assert merged is not None and merged.delta == "abcdefgh"
+    assert coalescer.flush() is None
+
+
+def test_coalesce_flush_remaining():
+    coalescer = ChunkCoalescer(window_ms=60_000)
+    coalescer.add(make_chunk("hello "))
+    coalescer.add(make_chunk("world"))
+    merged = coalescer.flush()
+    assert merged.delta == "hello world"
+    assert json.loads(merged.content)[0]["delta"]["content"] == "hello world"
+
+
+if __name__ == "__main__":
+    test_chunk_event_content_is_lazy()
+    test_coalesce_by_bytes()
+    test_coalesce_flush_remaining()
+    print("[OK] chunk coalescer")
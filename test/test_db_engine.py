@@ -0,0 +1,74 @@
+import sys
+import asyncio
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from sqlalchemy import text
+
+from src.config.config import load_db_config
+from src.db import engine as db_engine
+from src.db.engine import dispose_engines, get_engine
+from src.session.factory import create_session_service
+from src.session.mysql_service import MySQLSessionService
+
+
+def test_engine_is_shared_and_configured(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'a.db'}"
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "4")
+    monkeypatch.setenv("DB_POOL_RECYCLE", "120")
+    try:
+        engine = get_engine(url)
+        assert get_engine(url) is engine
+        assert get_engine(f"sqlite:///{tmp_path / 'b.db'}") is not engine
+        assert engine.pool.size() == 3
+        assert engine.pool._max_overflow == 4
+        assert engine.pool._recycle == 120
+        assert engine.pool._pre_ping
+    finally:
+        dispose_engines()
+    assert db_engine._engines == {}
+
+
+def test_async_url_defaults_to_aiomysql(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "mysql+pymysql://u:p@db:3306/video_agent")
+    monkeypatch.delenv("DATABASE_ASYNC_URL", raising=False)
+    assert load_db_config()["async_url"] == "mysql+aiomysql://u:p@db:3306/video_agent"
+
+
+def test_services_do_not_dispose_shared_engine(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'shared.db'}")
+    try:
+        engine = get_engine()
+        for _ in range(3):
+            service = create_session_service("mysql", write_behind=False)
+            assert service.engine is engine
+            asyncio.run(service.aclose())
+
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+        # 只建立过一个连接，并一直留在池中复用
+        assert engine.pool.checkedin() == 1
+
+        # 自己创建的引擎仍在 close 时释放
+        owned = MySQLSessionService(f"sqlite:///{tmp_path / 'owned.db'}")
+        assert owned.engine is not engine
+        owned.close()
+    finally:
+        dispose_engines()
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    import pytest
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with pytest.MonkeyPatch.context() as mp:
+            test_engine_is_shared_and_configured(Path(tmp), mp)
+            test_async_url_defaults_to_aiomysql(mp)
+        with pytest.MonkeyPatch.context() as mp:
+            test_services_do_not_dispose_shared_engine(Path(tmp), mp)
+    print("[OK] db engine")
@@ -0,0 +1,52 @@
+import sys
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.model.vlm.frame_sampler import FrameSampler
+from src.utils.ffmpeg import ffmpeg_available, run_ffmpeg
+
+
+def test_trim_to_budget_keeps_first_and_spreads_evenly():
+    sampler = FrameSampler(max_frames=4)
+    frames = [(f"{i}.jpg", float(i)) for i in range(10)]
+    kept = sampler._trim_to_budget(frames)
+    assert len(kept) == 4
+    assert kept[0] == frames[0]
+    assert [ts for _, ts in kept] == sorted(ts for _, ts in kept)
+    assert sampler._trim_to_budget(frames[:3]) == frames[:3]
+
+
+@pytest.mark.skipif(not ffmpeg_available(), reason="ffmpeg not installed")
+def test_sample_scene_changes():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            video = os.path.join(tmp, "scenes.mp4")
+            # 20s 红色 + 10s 测试图 + 30s 蓝色，场景切换在 20s 和 30s
+            await run_ffmpeg([
+                "-f", "lavfi", "-i", "color=c=red:s=320x240:d=20",
+                "-f", "lavfi", "-i", "testsrc=s=320x240:d=10",
+                "-f", "lavfi", "-i", "color=c=blue:s=320x240:d=30",
+                "-filter_complex", "[0][1][2]concat=n=3:v=1[v]", "-map", "[v]", "-r", "10", video,
+            ])
+            frames = await FrameSampler(max_frames=16).sample(video)
+            assert frames is not None
+            assert 4 <= len(frames.frames) <= 16
+            assert any(20.0 <= ts < 21.0 for ts in frames.timestamps)
+            assert any(30.0 <= ts < 31.0 for ts in frames.timestamps)
+            frames.cleanup()
+            assert not os.path.exists(frames.workdir)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_trim_to_budget_keeps_first_and_spreads_evenly()
+    test_sample_scene_changes()
+    print("[OK] frame sampler")
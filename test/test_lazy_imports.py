@@ -0,0 +1,43 @@
+import os
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.logger.logging import LogConfig, logger
+
+
+def loaded_modules(module: str):
+    """在新进程中导入模块，返回已加载的顶层包"""
+    code = f"import sys, json; import {module}; print(json.dumps(sorted({{m.split('.')[0] for m in sys.modules}})))"
+    env = dict(os.environ)
+    env.setdefault("DASHSCOPE_API_KEY", "test")
+    proc = subprocess.run(
+        [sys.executable, "-c", code], cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return set(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+
+def test_agent_import_does_not_load_provider_sdks():
+    # 智能体包和命令行入口
+    for entry_point in ("src.agent.main", "main"):
+        modules = loaded_modules(entry_point)
+        assert "src" in modules
+        for sdk in ("litellm", "openai", "dashscope", "tos", "sqlalchemy"):
+            assert sdk not in modules, (entry_point, sdk)
+
+
+def test_init_logger_is_idempotent():
+    # 模块导入时已初始化，入口脚本再次调用不会重建 sink
+    handlers = dict(logger._core.handlers)
+    assert LogConfig.init_logger() is False
+    assert dict(logger._core.handlers) == handlers
+
+
+if __name__ == "__main__":
+    test_agent_import_does_not_load_provider_sdks()
+    test_init_logger_is_idempotent()
+    print("[OK] lazy imports")
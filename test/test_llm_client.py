@@ -0,0 +1,86 @@
+import sys
+import asyncio
+import threading
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.model.llm import client as client_module
+
+MODEL = "dashscope/qwen-max-latest"
+
+
+def setup_env(monkeypatch):
+    # 使用 litellm 自带的价格表，不访问网络
+    monkeypatch.setenv("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "test")
+    monkeypatch.setattr(client_module, "_llm_clients", {})
+
+
+def test_client_is_shared_per_model_and_api_base(monkeypatch):
+    setup_env(monkeypatch)
+    first = client_module.get_llm_client(MODEL)
+    assert client_module.get_llm_client(MODEL) is first
+    other = client_module.get_llm_client(MODEL, api_base="http://localhost:8000/v1")
+    assert other is not first
+    assert client_module.get_llm_client(MODEL, api_base="http://localhost:8000/v1") is other
+    assert first.supports_client and other.base_url == "http://localhost:8000/v1"
+
+
+def test_client_rebinds_and_closes_pool_on_loop_change(monkeypatch):
+    setup_env(monkeypatch)
+    llm_client = client_module.get_llm_client(MODEL)
+
+    async def pooled():
+        openai_client = await llm_client._get_openai_client()
+        # 同一事件循环内复用
+        assert await llm_client._get_openai_client() is openai_client
+        return llm_client._http_client
+
+    first = asyncio.run(pooled())
+    # asyncio.run 结束时在原事件循环中关闭连接池
+    assert first.is_closed
+    second = asyncio.run(pooled())
+    assert second is not first and second.is_closed
+
+
+def test_pool_of_running_loop_is_closed_on_rebind(monkeypatch):
+    setup_env(monkeypatch)
+    llm_client = client_module.get_llm_client(MODEL)
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(llm_client._get_openai_client(), loop).result(timeout=5)
+        first = llm_client._http_client
+
+        async def rebind():
+            await llm_client._get_openai_client()
+            # 旧连接池在另一个线程的事件循环中关闭
+            for _ in range(50):
+                if first.is_closed:
+                    break
+                await asyncio.sleep(0.01)
+            await llm_client.aclose()
+            return first.is_closed
+
+        assert asyncio.run(rebind())
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+        loop.close()
+
+
+if __name__ == "__main__":
+    import pytest
+
+    for test in (
+        test_client_is_shared_per_model_and_api_base,
+        test_client_rebinds_and_closes_pool_on_loop_change,
+        test_pool_of_running_loop_is_closed_on_rebind,
+    ):
+        with pytest.MonkeyPatch.context() as mp:
+            test(mp)
+    print("[OK] llm client")
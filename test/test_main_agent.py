@@ -0,0 +1,118 @@
+import sys
+import time
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.agent import main as main_module
+from src.event.events import Event, EventType
+from src.orchestration import runner as runner_module
+from src.session.types import Session
+
+
+class FakeSessionService:
+    def __init__(self, flush_error=None):
+        self.flush_error = flush_error
+        self.calls = []
+
+    async def get_session(self, user_id, session_id):
+        return Session(session_id=session_id, user_id=user_id)
+
+    async def aget_recent_messages(self, user_id, session_id):
+        return []
+
+    async def append_event(self, session, event):
+        self.calls.append(("append_event", event.event_id))
+
+    async def flush(self, session):
+        self.calls.append(("flush", session.session_id))
+        if self.flush_error is not None:
+            raise self.flush_error
+
+    async def aclose(self):
+        self.calls.append(("aclose",))
+
+
+class FakeMemoryService:
+    def __init__(self):
+        self.scheduled = []
+
+    async def aload_history(self, user_id, session_id):
+        return []
+
+    def schedule_compaction(self, user_id, session_id):
+        self.scheduled.append(session_id)
+
+
+def make_agent(monkeypatch, service, fail=False):
+    # 不创建真实的工具和 LLM client
+    monkeypatch.setattr(main_module, "get_tool_schema", lambda name: ())
+    llm_client = SimpleNamespace(provider="dashscope")
+    monkeypatch.setattr(runner_module, "get_llm_client", lambda model, api_base=None: llm_client)
+    monkeypatch.setattr(main_module, "create_session_service", lambda: service)
+    agent = main_module.MainAgent(
+        user_id="u1", session_id="s1", invocation_id="i1", memory_service=FakeMemoryService(), user_message="hi",
+    )
+
+    async def execute():
+        yield Event(
+            type=EventType.COMPLETE_RESPONSE, event_id="e1", user_id="u1", session_id="s1",
+            invocation_id="i1", author="main_agent", timestamp=time.time(), content="done",
+        )
+        if fail:
+            raise RuntimeError("llm down")
+
+    agent.execute = execute
+    return agent
+
+
+async def consume(agent):
+    return [event async for event in agent.handle_user_message()]
+
+
+def test_success_flushes_closes_and_schedules_compaction(monkeypatch):
+    service = FakeSessionService()
+    agent = make_agent(monkeypatch, service)
+
+    events = asyncio.run(consume(agent))
+    assert [e.event_id for e in events] == ["e1"]
+    assert service.calls == [("append_event", "e1"), ("flush", "s1"), ("aclose",)]
+    assert agent.session_service is None
+    assert agent.memory_service.scheduled == ["s1"]
+
+
+def test_failure_closes_service_without_compaction(monkeypatch):
+    service = FakeSessionService()
+    agent = make_agent(monkeypatch, service, fail=True)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(consume(agent))
+    assert service.calls[-2:] == [("flush", "s1"), ("aclose",)]
+    assert agent.session_service is None
+    assert agent.memory_service.scheduled == []
+
+
+def test_flush_failure_still_closes_service(monkeypatch):
+    service = FakeSessionService(flush_error=ValueError("写入事件失败"))
+    agent = make_agent(monkeypatch, service)
+
+    with pytest.raises(ValueError):
+        asyncio.run(consume(agent))
+    assert service.calls[-1] == ("aclose",)
+    assert agent.memory_service.scheduled == []
+
+
+if __name__ == "__main__":
+    for test in (
+        test_success_flushes_closes_and_schedules_compaction,
+        test_failure_closes_service_without_compaction,
+        test_flush_failure_still_closes_service,
+    ):
+        with pytest.MonkeyPatch.context() as mp:
+            test(mp)
+    print("[OK] main agent")
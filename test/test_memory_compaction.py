@@ -0,0 +1,145 @@
+import sys
+import asyncio
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from sqlalchemy import create_engine, event, text
+
+from src.memory import MySQL_Abstractor
+from src.memory.MySQL_Abstractor import MySQLAbstractor, split_for_compaction
+
+# 每条消息 12 个 token
+CONTENT = "x" * 36
+
+
+def make_abstractor(tmp_path, monkeypatch, count):
+    # 用 SQLite 模拟 MySQL 表，时间直接保存 unix 时间戳
+    engine = create_engine(f"sqlite:///{tmp_path / 'memory.db'}")
+
+    @event.listens_for(engine, "connect")
+    def register_functions(conn, _):
+        conn.create_function("FROM_UNIXTIME", 1, float)
+        conn.create_function("UNIX_TIMESTAMP", 1, lambda value: value)
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE sessions (session_id TEXT PRIMARY KEY, user_id TEXT, accumulated_usage INTEGER)"))
+        conn.execute(text(
+            "CREATE TABLE messages (event_id TEXT PRIMARY KEY, user_id TEXT, session_id TEXT, "
+            "role TEXT, content TEXT, created_at REAL, accumulated_usage INTEGER)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE session_summaries (session_id TEXT PRIMARY KEY, user_id TEXT, summary TEXT, "
+            "watermark_event_id TEXT, watermark_time REAL, watermark_usage INTEGER, token_usage INTEGER)"
+        ))
+        conn.execute(text("INSERT INTO sessions VALUES ('s1', 'u1', :usage)"), {"usage": 12 * count})
+        conn.execute(
+            text("INSERT INTO messages VALUES (:event_id, 'u1', 's1', :role, :content, :created_at, :usage)"),
+            [
+                {"event_id": f"e{i:03d}", "role": "user" if i % 2 == 0 else "assistant",
+                 "content": f"{i:03d}" + CONTENT[3:], "created_at": 1000.0 + i, "usage": 12 * (i + 1)}
+                for i in range(count)
+            ],
+        )
+
+    monkeypatch.setattr(MySQL_Abstractor, "UPSERT_SUMMARY_SQL", text(
+        "INSERT OR REPLACE INTO session_summaries VALUES (:session_id, :user_id, :summary, "
+        ":watermark_event_id, :watermark_time, :watermark_usage, :token_usage)"
+    ))
+    monkeypatch.setenv("MEMORY_KEEP_RECENT_TOKENS", "50")
+    monkeypatch.setenv("MEMORY_COMPACTION_THRESHOLD", "100")
+    monkeypatch.setenv("SESSION_HISTORY_PAGE_SIZE", "4")
+    monkeypatch.setenv("SESSION_HISTORY_MAX_TOKENS", "0")
+    return MySQLAbstractor(engine=engine)
+
+
+def test_split_keeps_recent_turns():
+    messages = [{"role": "user" if i % 2 == 0 else "assistant", "content": CONTENT} for i in range(10)]
+    span, recent = split_for_compaction(messages, keep_recent_tokens=50)
+    # 50 个 token 可以保留 4 条，最近部分从用户消息开始
+    assert len(span) == 6 and len(recent) == 4 and recent[0]["role"] == "user"
+    assert split_for_compaction(messages[:2], keep_recent_tokens=50) == ([], messages[:2])
+
+
+def test_compaction_moves_watermark(tmp_path, monkeypatch):
+    abstractor = make_abstractor(tmp_path, monkeypatch, 10)
+    calls, keys = [], []
+
+    class RecordingSummarizer:
+        async def asummarize(self, messages_content, key=None):
+            calls.append(messages_content)
+            keys.append(key)
+            return f"summary{len(calls)}"
+
+    abstractor.summarizer = RecordingSummarizer()
+
+    async def run():
+        await abstractor.schedule_compaction("u1", "s1")
+        await abstractor.wait_for_compactions()
+
+    assert abstractor.uncompacted_usage("u1", "s1") == 120
+    asyncio.run(run())
+    assert [m["content"][:3] for m in calls[0]] == ["000", "001", "002", "003", "004", "005"]
+
+    history = abstractor.load_history("u1", "s1")
+    assert history[0] == {"role": "assistant", "content": "[abstract]summary1"}
+    assert [m["event_id"] for m in history[1:]] == ["e006", "e007", "e008", "e009"]
+    assert abstractor.uncompacted_usage("u1", "s1") == 48
+
+    # 低于阈值时不压缩
+    asyncio.run(run())
+    assert len(calls) == 1
+
+    # 增量压缩：上次摘要作为第一条消息
+    assert asyncio.run(abstractor.acompact("u1", "s1")) is None
+    with abstractor.engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO messages VALUES (:event_id, 'u1', 's1', :role, 'new', :created_at, 0)"),
+            [{"event_id": f"f{i}", "role": "user" if i % 2 == 0 else "assistant", "created_at": 2000.0 + i}
+             for i in range(2)],
+        )
+    monkeypatch.setenv("MEMORY_KEEP_RECENT_TOKENS", "2")
+    assert asyncio.run(abstractor.acompact("u1", "s1")) == "summary2"
+    assert calls[1][0]["content"] == "[abstract]summary1"
+    # 合并键包含消息区间，区间不同的压缩不会共用摘要
+    assert keys == [("s1", "e000", "e005"), ("s1", "e006", "e009")]
+    assert [m["event_id"] for m in abstractor.load_history("u1", "s1")[1:]] == ["f0", "f1"]
+
+
+def test_history_window_stops_at_budget_and_watermark(tmp_path, monkeypatch):
+    abstractor = make_abstractor(tmp_path, monkeypatch, 20)
+    pages = []
+
+    @event.listens_for(abstractor.engine, "before_cursor_execute")
+    def count_pages(conn, cursor, statement, parameters, context, executemany):
+        if "FROM messages" in statement:
+            pages.append(statement)
+
+    # 没有摘要：从最新的消息往前读，读满 token 上限即停止，不读取整个会话
+    history = abstractor.load_history("u1", "s1", max_tokens=20)
+    assert [m["event_id"] for m in history] == ["e018", "e019"]
+    assert len(pages) == 1
+
+    # 有摘要：读到水位线即停止
+    abstractor._save_summary("u1", "s1", "summary", {"event_id": "e013", "timestamp": 1013.0, "accumulated_usage": 168})
+    pages.clear()
+    history = abstractor.load_history("u1", "s1", max_tokens=1000)
+    assert history[0]["content"] == "[abstract]summary"
+    assert [m["event_id"] for m in history[1:]] == [f"e{i:03d}" for i in range(14, 20)]
+    assert len(pages) == 2
+    # 不限制 token 时读取水位线之后的全部消息
+    assert abstractor.load_history("u1", "s1", max_tokens=0)[1:] == abstractor.load_history("u1", "s1")[1:]
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    import pytest
+
+    test_split_keeps_recent_turns()
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as mp:
+        test_compaction_moves_watermark(Path(tmp), mp)
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as mp:
+        test_history_window_stops_at_budget_and_watermark(Path(tmp), mp)
+    print("[OK] memory compaction")
@@ -0,0 +1,52 @@
+import sys
+import json
+import asyncio
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.memory.summarizer import Summarizer
+
+MESSAGES = [
+    {"role": "user", "content": "把视频剪成 30 秒"},
+    {"role": "assistant", "content": "已剪辑完成"},
+]
+
+
+def test_local_model_summary():
+    summarizer = Summarizer(model="local")
+    summary = json.loads(asyncio.run(summarizer.asummarize(MESSAGES)))
+    assert summary["user_intent"] == "把视频剪成 30 秒"
+    assert summary["key_responses"] == ["已剪辑完成"]
+    assert summarizer.summarize(MESSAGES) == asyncio.run(summarizer.asummarize(MESSAGES))
+
+
+def test_concurrent_requests_are_coalesced():
+    summarizer = Summarizer(model="local")
+    calls = []
+
+    async def slow_summarize(messages_content):
+        calls.append(messages_content)
+        await asyncio.sleep(0.05)
+        return f"summary{len(calls)}"
+
+    summarizer._asummarize = slow_summarize
+
+    async def run():
+        same = await asyncio.gather(*(summarizer.asummarize(MESSAGES, key="s1") for _ in range(5)))
+        other = await summarizer.asummarize(MESSAGES, key="s2")
+        # 上一次完成后再次触发会重新生成
+        again = await summarizer.asummarize(MESSAGES, key="s1")
+        return same, other, again
+
+    same, other, again = asyncio.run(run())
+    assert same == ["summary1"] * 5
+    assert (other, again) == ("summary2", "summary3")
+    assert summarizer._inflight == {}
+
+
+if __name__ == "__main__":
+    test_local_model_summary()
+    test_concurrent_requests_are_coalesced()
+    print("[OK] memory summarizer")
@@ -0,0 +1,100 @@
+import sys
+import json
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.agent.base import history_message
+from src.orchestration.prompt_cache import cache_control_enabled, prompt_cache_usage, with_cache_breakpoints
+from src.orchestration import runner as runner_module
+
+MESSAGES = [
+    {"role": "system", "content": "system prompt"},
+    {"role": "user", "content": "first"},
+    {"role": "assistant", "content": "", "tool_calls": [{"id": "c1"}]},
+    {"role": "user", "content": [{"type": "text", "text": "second"}]},
+]
+
+
+def test_breakpoints_do_not_touch_history():
+    original = json.dumps(MESSAGES)
+    marked = with_cache_breakpoints(MESSAGES, [0, 2, -1])
+    assert json.dumps(MESSAGES) == original
+
+    assert marked[0]["content"] == [{"type": "text", "text": "system prompt", "cache_control": {"type": "ephemeral"}}]
+    # 没有文本的消息，断点移到前一条
+    assert marked[1]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    assert marked[2] is MESSAGES[2]
+    assert marked[3]["content"] == [{"type": "text", "text": "second", "cache_control": {"type": "ephemeral"}}]
+
+
+def test_cache_control_modes_and_usage():
+    assert cache_control_enabled("auto", "anthropic")
+    assert not cache_control_enabled("auto", "dashscope", "dashscope/qwen-max-latest")
+    assert cache_control_enabled("true", "dashscope")
+    assert not cache_control_enabled("false", "anthropic")
+
+    assert prompt_cache_usage({"prompt_tokens": 100, "prompt_tokens_details": {"cached_tokens": 80}}) == (100, 80)
+    assert prompt_cache_usage(SimpleNamespace(prompt_tokens=50, cache_read_input_tokens=20)) == (50, 20)
+    assert prompt_cache_usage({"prompt_tokens": 10}) == (10, 0)
+
+
+def test_history_message_matches_sent_message():
+    sent = {"role": "user", "content": [{"type": "text", "text": "剪辑视频"}]}
+    stored = {"role": "user", "content": json.dumps(sent["content"], ensure_ascii=False), "event_id": "e1"}
+    assert json.dumps(history_message(stored)) == json.dumps(sent)
+    assert history_message({"role": "assistant", "content": "[abstract]..."})["content"] == "[abstract]..."
+
+
+class FakeLLMClient:
+    provider = "dashscope"
+
+    def __init__(self):
+        self.requests = []
+
+    async def acompletion(self, **params):
+        self.requests.append(params)
+
+        async def stream():
+            delta = SimpleNamespace(content="done", tool_calls=None)
+            yield SimpleNamespace(id="r1", choices=[SimpleNamespace(delta=delta, finish_reason="stop")], usage=None)
+            usage = {"prompt_tokens": 120, "completion_tokens": 3, "prompt_tokens_details": {"cached_tokens": 96}}
+            yield SimpleNamespace(id="r1", choices=[], usage=usage)
+
+        return stream()
+
+
+def test_runner_marks_prefix_and_records_cached_tokens(monkeypatch):
+    monkeypatch.setenv("PROMPT_CACHE_CONTROL", "true")
+    # 不创建真实的 LLM client（也就不导入 litellm）
+    client = FakeLLMClient()
+    monkeypatch.setattr(runner_module, "get_llm_client", lambda model, api_base=None: client)
+    agent_runner = runner_module.runner(user_id="u1", session_id="s1", invocation_id="i1", model="dashscope/qwen-max-latest")
+    messages = [dict(message) for message in MESSAGES]
+
+    async def run():
+        return [event async for event in agent_runner.run(messages)]
+
+    events = asyncio.run(run())
+    sent = agent_runner.llm_client.requests[0]["messages"]
+    assert [isinstance(m["content"], list) and "cache_control" in m["content"][-1] for m in sent] == [
+        True, True, False, True,
+    ]
+    assert messages == MESSAGES
+    assert agent_runner.turn_prompt_tokens == [(120, 96)]
+    # usage 在不带 choices 的最后一个 chunk 中
+    assert events[-1].usage == 3
+
+
+if __name__ == "__main__":
+    import pytest
+
+    test_breakpoints_do_not_touch_history()
+    test_cache_control_modes_and_usage()
+    test_history_message_matches_sent_message()
+    with pytest.MonkeyPatch.context() as mp:
+        test_runner_marks_prefix_and_records_cached_tokens(mp)
+    print("[OK] prompt cache")
@@ -0,0 +1,112 @@
+import sys
+import time
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.model.vlm import qwen_vlm as qwen_module
+
+
+def ok_response(text="{}"):
+    message = SimpleNamespace(content=[{"text": text}])
+    return SimpleNamespace(status_code=200, output=SimpleNamespace(choices=[SimpleNamespace(message=message)]))
+
+
+class FakeConversation:
+    """替代 dashscope 的多模态接口，记录并发数和被取消的请求"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+        self.cancelled = 0
+
+    async def acall(self, **kwargs):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            return ok_response()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.running -= 1
+
+    def call(self, **kwargs):
+        time.sleep(self.delay)
+        return ok_response()
+
+
+def make_vlm(monkeypatch, delay, native_async=True, max_concurrency=4):
+    conversation = FakeConversation(delay)
+    monkeypatch.setenv("DASHSCOPE_API_KEY", "test")
+    monkeypatch.setenv("VLM_NATIVE_ASYNC", "true" if native_async else "false")
+    monkeypatch.setenv("VLM_MAX_CONCURRENCY", str(max_concurrency))
+    monkeypatch.setattr(qwen_module, "_model_semaphores", {})
+    monkeypatch.setattr(
+        qwen_module.dashscope, "AioMultiModalConversation", SimpleNamespace(call=conversation.acall), raising=False
+    )
+    monkeypatch.setattr(qwen_module.dashscope, "MultiModalConversation", SimpleNamespace(call=conversation.call))
+    return qwen_module.QwenVLM(model="qwen-vl-test"), conversation
+
+
+@pytest.mark.parametrize("native_async", [True, False])
+def test_call_times_out(monkeypatch, native_async):
+    vlm, conversation = make_vlm(monkeypatch, delay=0.5, native_async=native_async)
+    assert vlm.native_async is native_async
+
+    async def run():
+        started = time.monotonic()
+        with pytest.raises(asyncio.TimeoutError):
+            await vlm.acall_model("https://example.com/v.mp4", "describe", timeout=0.05)
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < 0.4
+    if native_async:
+        # 超时会中断原生异步请求
+        assert conversation.cancelled == 1
+
+
+def test_cancellation_reaches_request_and_caller(monkeypatch):
+    vlm, conversation = make_vlm(monkeypatch, delay=5)
+
+    async def run():
+        task = asyncio.create_task(vlm.acall_model("https://example.com/v.mp4", "describe"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # 取消后释放信号量，后续调用不受影响
+        conversation.delay = 0
+        return await vlm.acall_model("https://example.com/v.mp4", "describe")
+
+    assert asyncio.run(run()) == "{}"
+    assert conversation.cancelled == 1
+
+
+def test_concurrency_is_capped_per_model(monkeypatch):
+    vlm, conversation = make_vlm(monkeypatch, delay=0.02, max_concurrency=2)
+
+    async def run():
+        calls = [vlm.acall_model("https://example.com/i.png", "describe", media_type="image") for _ in range(6)]
+        return await asyncio.gather(*calls)
+
+    assert asyncio.run(run()) == ["{}"] * 6
+    assert conversation.peak == 2
+
+
+if __name__ == "__main__":
+    for native_async in (True, False):
+        with pytest.MonkeyPatch.context() as mp:
+            test_call_times_out(mp, native_async)
+    with pytest.MonkeyPatch.context() as mp:
+        test_cancellation_reaches_request_and_caller(mp)
+    with pytest.MonkeyPatch.context() as mp:
+        test_concurrency_is_capped_per_model(mp)
+    print("[OK] qwen vlm")
@@ -0,0 +1,95 @@
+import sys
+import time
+import tempfile
+import os
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+import pytest
+
+from src.utils.cache import BaseCache, MemoryCache, DiskCache, TieredCache
+from src.tool.media_analyze import media_cache_key
+
+
+def test_memory_cache_lru_and_ttl():
+    cache = MemoryCache(max_entries=2, max_bytes=0, ttl=None)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")  # b 最久未使用，被淘汰
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+    assert cache.stats.evictions == 1
+
+    cache = MemoryCache(max_entries=10, max_bytes=8)
+    cache.set("a", "12345")
+    cache.set("b", "12345")
+    assert cache.get("a") is None and cache.get("b") == "12345"
+
+    cache = MemoryCache(ttl=0.01)
+    cache.set("a", "1")
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_disk_cache_size_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DiskCache(os.path.join(tmp, "cache.db"), max_bytes=20)
+        cache.set("a", "x" * 8)
+        time.sleep(0.01)
+        cache.set("b", "y" * 8)
+        time.sleep(0.01)
+        assert cache.get("a") == "x" * 8  # a 变为最近访问
+        cache.set("c", "z" * 8)
+        assert cache.get("b") is None
+        assert cache.get("a") == "x" * 8
+        cache.close()
+
+
+def test_tiered_cache_promotes_disk_hits():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.db")
+        TieredCache(MemoryCache(), DiskCache(path)).set("k", {"v": 1})
+
+        # 新进程：内存为空，磁盘命中后回填内存
+        cache = TieredCache(MemoryCache(), DiskCache(path))
+        assert cache.get("k") == {"v": 1}
+        assert cache.memory.get("k") == {"v": 1}
+        metrics = cache.metrics()
+        assert metrics["hits"] == 1 and metrics["disk"]["hits"] == 1
+
+
+def test_media_cache_key():
+    digest = "ab" * 32
+    a = media_cache_key(f"https://b.tos.com/files/{digest}.mp4", "描述 这个视频", "qwen3-vl-plus", "video", 2.0)
+    b = media_cache_key(f"https://other.cdn.com/x/{digest}.mp4?sig=1", " 描述  这个视频\n", "qwen3-vl-plus", "video", 2.0)
+    assert a == b
+    assert a != media_cache_key(f"https://b.tos.com/files/{digest}.mp4", "描述 这个视频", "qwen3-vl-plus", "video", 1.0)
+    assert a != media_cache_key(f"https://b.tos.com/files/{digest}.mp4", "描述 这个视频", "qwen-vl-max", "video", 2.0)
+    # 图片与 fps 无关
+    assert media_cache_key("https://a.com/cat.jpg", "q", "m", "image", 1.0) == media_cache_key(
+        "https://a.com/cat.jpg", "q", "m", "image", 2.0
+    )
+
+
+def test_base_cache_is_abstract():
+    with pytest.raises(TypeError):
+        BaseCache()
+
+    class PartialCache(BaseCache):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        PartialCache()
+
+
+if __name__ == "__main__":
+    test_memory_cache_lru_and_ttl()
+    test_disk_cache_size_eviction()
+    test_tiered_cache_promotes_disk_hits()
+    test_media_cache_key()
+    test_base_cache_is_abstract()
+    print("[OK] result cache")
@@ -0,0 +1,107 @@
+import sys
+import time
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.event.events import Event, EventType
+from src.orchestration import runner as runner_module
+from src.tool.types import ToolCallResult, ToolExeResult
+
+
+class ScriptedLLMClient:
+    """每次调用返回一轮：前 tool_turns 轮调用工具，之后直接回答"""
+
+    provider = "dashscope"
+
+    def __init__(self, tool_turns):
+        self.tool_turns = tool_turns
+        self.requests = []
+
+    async def acompletion(self, **params):
+        self.requests.append([dict(m) for m in params["messages"]])
+        turn = len(self.requests)
+
+        async def stream():
+            if turn <= self.tool_turns:
+                function = SimpleNamespace(name="Echo", arguments=f'{{"turn": {turn}}}')
+                tool_call = SimpleNamespace(index=0, id=f"call{turn}", type="function", function=function)
+                delta = SimpleNamespace(content=None, tool_calls=[tool_call])
+                yield SimpleNamespace(id=f"r{turn}", choices=[SimpleNamespace(delta=delta, finish_reason="tool_calls")], usage=None)
+            else:
+                delta = SimpleNamespace(content="done", tool_calls=None)
+                yield SimpleNamespace(id=f"r{turn}", choices=[SimpleNamespace(delta=delta, finish_reason="stop")], usage=None)
+
+        return stream()
+
+
+class EchoExecutor:
+    def __init__(self):
+        self.calls = []
+
+    async def handle_tool_call_streaming(self, response):
+        for tool_call in response.choices[0].message.tool_calls:
+            self.calls.append(tool_call.id)
+            yield Event(
+                type=EventType.TOOL_RESPONSE, event_id=tool_call.id, user_id="u1", session_id="s1",
+                invocation_id="i1", author="main_agent", timestamp=time.time(),
+                tool_result=ToolCallResult(
+                    tool_call_id=tool_call.id, function_name=tool_call.function.name,
+                    result=ToolExeResult(success=True, result="ok"),
+                ),
+            )
+
+
+def make_runner(monkeypatch, tool_turns, max_turns):
+    client = ScriptedLLMClient(tool_turns)
+    # 不创建真实的 LLM client（也就不导入 litellm）
+    monkeypatch.setattr(runner_module, "get_llm_client", lambda model, api_base=None: client)
+    monkeypatch.setenv("PROMPT_CACHE_CONTROL", "false")
+    agent_runner = runner_module.runner(
+        user_id="u1", session_id="s1", invocation_id="i1", executor=EchoExecutor(), max_turns=max_turns,
+    )
+    return agent_runner, client
+
+
+def run_events(agent_runner):
+    async def run():
+        return [event async for event in agent_runner.run([{"role": "system", "content": "sys"}])]
+
+    return asyncio.run(run())
+
+
+def test_turns_run_until_model_stops_calling_tools(monkeypatch):
+    agent_runner, client = make_runner(monkeypatch, tool_turns=2, max_turns=5)
+    events = run_events(agent_runner)
+
+    assert len(client.requests) == 3
+    assert agent_runner.executor.calls == ["call1", "call2"]
+    # 每轮请求都带上之前各轮的 assistant 和 tool 消息
+    assert [m["role"] for m in client.requests[2]] == ["system", "assistant", "tool", "assistant", "tool"]
+    assert client.requests[2][2]["tool_call_id"] == "call1"
+    assert len(agent_runner.turn_durations) == 3
+    assert events[-1].type == EventType.COMPLETE_RESPONSE and events[-1].content == "done"
+    assert not [e for e in events if e.type == EventType.ERROR]
+
+
+def test_max_turns_yields_one_error_and_stops(monkeypatch):
+    agent_runner, client = make_runner(monkeypatch, tool_turns=10, max_turns=2)
+    events = run_events(agent_runner)
+
+    assert len(client.requests) == 2
+    errors = [e for e in events if e.type == EventType.ERROR]
+    assert len(errors) == 1 and errors[0].error.startswith("MaxTurnsExceeded")
+    assert events[-1] is errors[0]
+
+
+if __name__ == "__main__":
+    import pytest
+
+    with pytest.MonkeyPatch.context() as mp:
+        test_turns_run_until_model_stops_calling_tools(mp)
+    with pytest.MonkeyPatch.context() as mp:
+        test_max_turns_yields_one_error_and_stops(mp)
+    print("[OK] runner turns")
@@ -0,0 +1,87 @@
+import sys
+import asyncio
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from sqlalchemy import create_engine, event, text
+
+from src.session.mysql_service import MySQLSessionService
+
+
+def make_service(tmp_path, count):
+    # 用 SQLite 模拟 messages 表，created_at 直接保存 unix 时间戳
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+
+    @event.listens_for(engine, "connect")
+    def register_functions(conn, _):
+        conn.create_function("FROM_UNIXTIME", 1, float)
+        conn.create_function("UNIX_TIMESTAMP", 1, lambda value: value)
+
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE messages (event_id TEXT PRIMARY KEY, user_id TEXT, session_id TEXT, "
+            "role TEXT, content TEXT, created_at REAL, accumulated_usage INTEGER DEFAULT 0)"
+        ))
+        conn.execute(
+            text("INSERT INTO messages VALUES (:event_id, 'u1', 's1', :role, :content, :created_at, 0)"),
+            [
+                # 每两条消息时间相同，验证游标在时间相同时按 event_id 继续
+                {"event_id": f"e{i:03d}", "role": "user" if i % 2 == 0 else "assistant",
+                 "content": f"message {i:03d} " + "x" * 36, "created_at": 1000.0 + i // 2}
+                for i in range(count)
+            ],
+        )
+    return MySQLSessionService(engine=engine, write_behind=False)
+
+
+def test_pages_cover_history_in_order(tmp_path):
+    service = make_service(tmp_path, 23)
+    ids, cursor = [], None
+    while True:
+        page = service.get_messages_page("u1", "s1", limit=5, cursor=cursor)
+        ids.extend(message["event_id"] for message in page.messages)
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+    assert ids == [f"e{i:03d}" for i in range(23)]
+
+    page = service.get_messages_page("u1", "s1", limit=4, descending=True)
+    assert [m["event_id"] for m in page.messages] == ["e022", "e021", "e020", "e019"]
+    page = service.get_messages_page("u1", "s1", limit=4, cursor=page.next_cursor, descending=True)
+    assert [m["event_id"] for m in page.messages] == ["e018", "e017", "e016", "e015"]
+
+
+def test_recent_window_respects_token_budget(tmp_path, monkeypatch):
+    monkeypatch.setenv("SESSION_HISTORY_PAGE_SIZE", "3")
+    service = make_service(tmp_path, 30)
+    # 每条消息 12 个 token
+    window = service.get_recent_messages("u1", "s1", max_tokens=100)
+    assert [m["event_id"] for m in window] == [f"e{i:03d}" for i in range(22, 30)]
+
+    # 单条消息超过上限时仍保留最近一条
+    assert [m["event_id"] for m in service.get_recent_messages("u1", "s1", max_tokens=1)] == ["e029"]
+    assert len(service.get_recent_messages("u1", "s1", max_tokens=0)) == 30
+
+
+def test_aiter_messages_exports_everything(tmp_path):
+    service = make_service(tmp_path, 11)
+
+    async def export():
+        return [m["event_id"] async for m in service.aiter_messages("u1", "s1", page_size=4)]
+
+    assert asyncio.run(export()) == [f"e{i:03d}" for i in range(11)]
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    import pytest
+
+    for test in (test_pages_cover_history_in_order, test_aiter_messages_exports_everything):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as mp:
+        test_recent_window_respects_token_budget(Path(tmp), mp)
+    print("[OK] session history")
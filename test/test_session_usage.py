@@ -0,0 +1,67 @@
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.event.events import Event, EventType
+from src.session.mysql_service import (
+    ACCUMULATED_USAGE_SQL,
+    ADD_SESSION_USAGE_SQL,
+    INSERT_MESSAGE_SQL,
+    MySQLSessionService,
+)
+
+
+class RecordingDBSession:
+    """记录执行的 SQL，sessions.accumulated_usage 保存在内存中"""
+
+    def __init__(self, accumulated_usage):
+        self.accumulated_usage = accumulated_usage
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append((sql, params))
+        if sql is ADD_SESSION_USAGE_SQL:
+            self.accumulated_usage += params["usage"]
+        row = SimpleNamespace(accumulated_usage=self.accumulated_usage)
+        return SimpleNamespace(fetchone=lambda: row)
+
+
+def make_event(index, event_type, usage):
+    return Event(
+        type=event_type, event_id=f"e{index}", user_id="u1", session_id="s1", invocation_id="inv",
+        author="main_agent", timestamp=time.time(), content=f"m{index}", usage=usage,
+    )
+
+
+def test_messages_use_session_counter():
+    db = RecordingDBSession(accumulated_usage=100)
+    events = [
+        make_event(0, EventType.USER_MESSAGE, 10),
+        make_event(1, EventType.TOOL_CALL, 99),
+        make_event(2, EventType.COMPLETE_RESPONSE, 5),
+    ]
+    MySQLSessionService._insert_messages(None, db, "u1", "s1", events)
+
+    sqls = [sql for sql, _ in db.statements]
+    assert sqls == [ADD_SESSION_USAGE_SQL, ACCUMULATED_USAGE_SQL, INSERT_MESSAGE_SQL]
+    # 不再扫描 messages 表
+    assert "messages" not in str(ACCUMULATED_USAGE_SQL)
+    # 只累计写入消息表的事件
+    assert db.statements[0][1]["usage"] == 15 and db.accumulated_usage == 115
+    assert [p["accumulated_usage"] for p in db.statements[2][1]] == [110, 115]
+
+
+def test_no_messages_no_statements():
+    db = RecordingDBSession(accumulated_usage=0)
+    MySQLSessionService._insert_messages(None, db, "u1", "s1", [make_event(0, EventType.TOOL_CALL, 3)])
+    assert db.statements == []
+
+
+if __name__ == "__main__":
+    test_messages_use_session_counter()
+    test_no_messages_no_statements()
+    print("[OK] session usage")
@@ -0,0 +1,195 @@
+import sys
+import time
+import threading
+import asyncio
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+import pytest
+
+from src.event.events import Event, EventType
+from src.session.mysql_service import MySQLSessionService, WriteBehindMixin, message_params
+from src.session.types import Session
+
+
+def make_service(**kwargs):
+    # 只测试缓冲逻辑，数据库写入由 writes 记录
+    kwargs.setdefault("write_behind", True)
+    service = MySQLSessionService("sqlite://", **kwargs)
+    service.writes = []
+    service.fail = 0
+    service.error = RuntimeError("db down")
+
+    service.threads = []
+
+    def write(user_id, session_id, events, base_time, current_time):
+        service.threads.append(threading.current_thread())
+        if service.fail:
+            service.fail -= 1
+            raise service.error
+        service.writes.append((session_id, [e.event_id for e in events], base_time, current_time))
+
+    service._write_events_sync = write
+    return service
+
+
+def make_event(session, index):
+    return Event(
+        type=EventType.COMPLETE_CHOICE, event_id=f"e{index}", user_id=session.user_id,
+        session_id=session.session_id, invocation_id="inv", author="main_agent", timestamp=time.time(),
+    )
+
+
+def test_events_are_flushed_in_one_batch_per_interval():
+    async def run():
+        service = make_service(flush_interval=0.05, max_batch_events=100)
+        session = Session(session_id="s1", user_id="u1", last_updated_time=100.0)
+        for i in range(3):
+            await service.append_event(session, make_event(session, i))
+        assert service.writes == [] and len(session.events) == 3
+
+        await asyncio.sleep(0.15)
+        assert len(service.writes) == 1
+        session_id, event_ids, base_time, current_time = service.writes[0]
+        assert (session_id, event_ids, base_time) == ("s1", ["e0", "e1", "e2"], 100.0)
+        # 写入后数据库中的更新时间与内存一致，下一批的过期检查不会误判
+        assert current_time == session.last_updated_time
+        service.close()
+
+    asyncio.run(run())
+
+
+def test_full_batch_flushes_immediately():
+    async def run():
+        service = make_service(flush_interval=60, max_batch_events=2)
+        session = Session(session_id="s1", user_id="u1")
+        for i in range(5):
+            await service.append_event(session, make_event(session, i))
+        assert [w[1] for w in service.writes] == [["e0", "e1"], ["e2", "e3"]]
+
+        await service.flush(session)
+        assert [w[1] for w in service.writes][-1] == ["e4"]
+        service.close()
+
+    asyncio.run(run())
+
+
+def test_failed_flush_keeps_events():
+    async def run():
+        service = make_service(flush_interval=60)
+        session = Session(session_id="s1", user_id="u1")
+        await service.append_event(session, make_event(session, 0))
+
+        service.fail = 1
+        with pytest.raises(ValueError):
+            await service.flush()
+        await service.append_event(session, make_event(session, 1))
+        await service.flush()
+        assert [w[1] for w in service.writes] == [["e0", "e1"]]
+        service.close()
+
+    asyncio.run(run())
+
+
+def test_timer_flush_continues_after_failure_and_rearms():
+    async def run():
+        service = make_service(flush_interval=0.05)
+        sessions = [Session(session_id=f"s{i}", user_id="u1") for i in range(2)]
+        for i, session in enumerate(sessions):
+            await service.append_event(session, make_event(session, i))
+
+        # s0 写入失败不影响 s1，失败的事件由下一次定时写入重试
+        service.fail = 1
+        await asyncio.sleep(0.08)
+        assert [w[0] for w in service.writes] == ["s1"]
+        await asyncio.sleep(0.08)
+        assert [w[0] for w in service.writes] == ["s1", "s0"]
+        assert service._pending == {}
+        service.close()
+
+    asyncio.run(run())
+
+
+def test_conflicting_batch_is_dropped_without_retry():
+    async def run():
+        service = make_service(flush_interval=60)
+        session = Session(session_id="s1", user_id="u1")
+        await service.append_event(session, make_event(session, 0))
+
+        # 会话冲突重试也无法写入，这批事件直接丢弃，之后的事件不会排在它后面
+        service.fail, service.error = 1, ValueError("会话已过期，请重新获取: s1")
+        with pytest.raises(ValueError):
+            await service.flush()
+        assert service._pending == {}
+
+        await service.append_event(session, make_event(session, 1))
+        await service.flush()
+        assert [w[1] for w in service.writes] == [["e1"]]
+        service.close()
+
+    asyncio.run(run())
+
+
+def test_timer_stops_retrying_after_max_retries():
+    async def run():
+        service = make_service(flush_interval=0.02)
+        service.max_flush_retries = 3
+        session = Session(session_id="s1", user_id="u1")
+        await service.append_event(session, make_event(session, 0))
+
+        service.fail = 100
+        await asyncio.sleep(0.2)
+        # 连续失败 3 次后丢弃，定时写入不再重新调度
+        assert service.fail == 97
+        assert service._pending == {}
+        assert service._flush_task.done()
+        service.close()
+
+    asyncio.run(run())
+
+
+def test_write_through_runs_in_thread():
+    async def run():
+        service = make_service(write_behind=False)
+        session = Session(session_id="s1", user_id="u1")
+        await service.append_event(session, make_event(session, 0))
+        assert [w[1] for w in service.writes] == [["e0"]]
+        assert service.threads[0] is not threading.current_thread()
+        service.close()
+
+    asyncio.run(run())
+
+
+def test_write_behind_mixin_requires_write_events():
+    class NoWriter(WriteBehindMixin):
+        pass
+
+    with pytest.raises(TypeError):
+        NoWriter()
+
+
+def test_message_params_accumulate_usage():
+    session = Session(session_id="s1", user_id="u1")
+    events = [make_event(session, i) for i in range(2)]
+    events[0].type, events[0].usage = EventType.USER_MESSAGE, 10
+    events[1].type, events[1].usage = EventType.COMPLETE_RESPONSE, None
+
+    params = message_params(events, accumulated_usage=100)
+    assert [(p["role"], p["token_usage"], p["accumulated_usage"]) for p in params] == [
+        ("user", 10, 110), ("assistant", 0, 110),
+    ]
+
+
+if __name__ == "__main__":
+    test_events_are_flushed_in_one_batch_per_interval()
+    test_full_batch_flushes_immediately()
+    test_failed_flush_keeps_events()
+    test_timer_flush_continues_after_failure_and_rearms()
+    test_conflicting_batch_is_dropped_without_retry()
+    test_timer_stops_retrying_after_max_retries()
+    test_write_through_runs_in_thread()
+    test_write_behind_mixin_requires_write_events()
+    test_message_params_accumulate_usage()
+    print("[OK] session write-behind")
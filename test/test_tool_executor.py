@@ -0,0 +1,169 @@
+import sys
+import time
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.event.events import Event, EventType
+from src.orchestration import runner as runner_module
+from src.tool import executor as executor_module
+from src.tool.types import ToolCallResult, ToolExeResult
+
+
+def make_tool_call(call_id, name, arguments="{}", index=0):
+    function = SimpleNamespace(name=name, arguments=arguments)
+    return SimpleNamespace(index=index, id=call_id, type="function", function=function)
+
+
+class ParallelLLMClient:
+    """第一轮并行调用 A、B、C 三个工具，第二轮直接回答"""
+
+    provider = "dashscope"
+
+    def __init__(self):
+        self.requests = []
+
+    async def acompletion(self, **params):
+        self.requests.append([dict(m) for m in params["messages"]])
+        turn = len(self.requests)
+
+        async def stream():
+            if turn == 1:
+                tool_calls = [make_tool_call(f"call_{name}", name, index=i) for i, name in enumerate("ABC")]
+                delta = SimpleNamespace(content=None, tool_calls=tool_calls)
+                yield SimpleNamespace(id="r1", choices=[SimpleNamespace(delta=delta, finish_reason="tool_calls")], usage=None)
+            else:
+                delta = SimpleNamespace(content="done", tool_calls=None)
+                yield SimpleNamespace(id="r2", choices=[SimpleNamespace(delta=delta, finish_reason="stop")], usage=None)
+
+        return stream()
+
+
+class OutOfOrderExecutor:
+    """按完成顺序返回结果：C 先于 A 完成，B 没有产生结果"""
+
+    async def handle_tool_call_streaming(self, response):
+        for call_id in ("call_C", "call_A"):
+            yield Event(
+                type=EventType.TOOL_RESPONSE, event_id=call_id, user_id="u1", session_id="s1",
+                invocation_id="i1", author="main_agent", timestamp=time.time(),
+                tool_result=ToolCallResult(
+                    tool_call_id=call_id, function_name=call_id[-1],
+                    result=ToolExeResult(success=True, result=call_id),
+                ),
+            )
+
+
+def test_parallel_results_follow_tool_call_order(monkeypatch):
+    client = ParallelLLMClient()
+    monkeypatch.setattr(runner_module, "get_llm_client", lambda model, api_base=None: client)
+    monkeypatch.setenv("PROMPT_CACHE_CONTROL", "false")
+    agent_runner = runner_module.runner(
+        user_id="u1", session_id="s1", invocation_id="i1", executor=OutOfOrderExecutor(),
+        max_turns=3, parallel_tool_calls=True,
+    )
+
+    async def run():
+        return [event async for event in agent_runner.run([{"role": "system", "content": "sys"}])]
+
+    events = asyncio.run(run())
+    assert events[-1].type == EventType.COMPLETE_RESPONSE
+
+    messages = client.requests[1]
+    assert [m["role"] for m in messages] == ["system", "assistant", "tool", "tool", "tool"]
+    # tool 消息按模型给出的调用顺序排列，而不是完成顺序
+    assert [m["tool_call_id"] for m in messages[2:]] == ["call_A", "call_B", "call_C"]
+    assert [tc["id"] for tc in messages[1]["tool_calls"]] == ["call_A", "call_B", "call_C"]
+    # 没有结果的调用补上一条失败的 tool 消息
+    assert "Tool call produced no result" in messages[3]["content"]
+    assert '"success": false' in messages[3]["content"]
+    assert '"result": "call_A"' in messages[2]["content"]
+
+
+class TrackedTool:
+    """记录同时执行的调用数"""
+
+    def __init__(self, max_concurrency=None):
+        self.max_concurrency = max_concurrency
+        self.running = 0
+        self.peak = 0
+
+    async def execute(self, **kwargs):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(0.02)
+            return ToolExeResult(success=True, result="ok")
+        finally:
+            self.running -= 1
+
+
+def run_tool_calls(monkeypatch, tools, tool_calls, max_concurrency):
+    monkeypatch.setattr(executor_module, "get_tool", tools.get)
+    monkeypatch.setattr(executor_module, "_tool_limiter", executor_module.ToolConcurrencyLimiter(max_concurrency))
+    tool_executor = executor_module.executor(user_id="u1", session_id="s1", invocation_id="i1", author="main_agent")
+    response = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=tool_calls))])
+
+    async def run():
+        return [event async for event in tool_executor.handle_tool_call_streaming(response)]
+
+    return asyncio.run(run())
+
+
+def test_global_limit_caps_concurrent_tools(monkeypatch):
+    free = TrackedTool()
+    tool_calls = [make_tool_call(f"call{i}", "Free") for i in range(6)]
+    events = run_tool_calls(monkeypatch, {"Free": free}, tool_calls, max_concurrency=2)
+
+    assert len(events) == 6 and all(e.type == EventType.TOOL_RESPONSE for e in events)
+    assert free.peak == 2
+
+
+def test_per_tool_limit_caps_below_global_limit(monkeypatch):
+    capped = TrackedTool(max_concurrency=1)
+    free = TrackedTool()
+    tool_calls = [make_tool_call(f"capped{i}", "Capped") for i in range(3)]
+    tool_calls += [make_tool_call(f"free{i}", "Free") for i in range(3)]
+    events = run_tool_calls(monkeypatch, {"Capped": capped, "Free": free}, tool_calls, max_concurrency=8)
+
+    assert len(events) == 6
+    assert capped.peak == 1
+    assert free.peak == 3
+
+
+def test_limiter_rebinds_to_new_event_loop():
+    limiter = executor_module.ToolConcurrencyLimiter(max_concurrency=1)
+
+    async def contend():
+        # 两个调用争用同一个槽位，信号量会绑定到当前事件循环
+        async def hold():
+            async with limiter.slot("Task"):
+                await asyncio.sleep(0.01)
+
+        async def use_global():
+            async with limiter.slot("Free"):
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(use_global(), use_global(), hold())
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(executor_module, "get_tool", lambda name: None)
+        asyncio.run(contend())
+        # 新的事件循环中不会复用绑定到旧事件循环的信号量
+        asyncio.run(contend())
+
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as mp:
+        test_parallel_results_follow_tool_call_order(mp)
+    with pytest.MonkeyPatch.context() as mp:
+        test_global_limit_caps_concurrent_tools(mp)
+    with pytest.MonkeyPatch.context() as mp:
+        test_per_tool_limit_caps_below_global_limit(mp)
+    test_limiter_rebinds_to_new_event_loop()
+    print("[OK] tool executor")
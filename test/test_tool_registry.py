@@ -0,0 +1,84 @@
+import os
+import sys
+import json
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+import pytest
+
+from src.tool import registor
+from src.tool.registor import (
+    AGENT_TOOLS,
+    get_tool,
+    get_tool_registry,
+    get_tool_schema,
+    get_tool_schema_json,
+    get_tool_schema_tokens,
+)
+
+
+@pytest.fixture(autouse=True)
+def dashscope_api_key(monkeypatch):
+    # 创建 MediaAnalyze 的模型客户端需要 API key，构建注册表不会发出请求
+    monkeypatch.setenv("DASHSCOPE_API_KEY", os.getenv("DASHSCOPE_API_KEY", "test"))
+
+
+def test_registry_is_built_once_and_shared():
+    registry = get_tool_registry()
+    assert get_tool_registry() is registry
+    # main_agent 和 analyzer_agent 共享同一个工具实例
+    assert registor.AVAILABLE_TOOLS["analyzer_agent"][1][1] is get_tool("MediaAnalyze")
+    assert registor.TOOLS is registry.tools
+    assert get_tool("Unknown") is None
+
+
+def test_schemas_match_agent_tools():
+    for agent_type, tool_names in AGENT_TOOLS.items():
+        schemas = get_tool_schema(agent_type)
+        assert [schema["function"]["name"] for schema in schemas] == list(tool_names)
+        assert json.loads(get_tool_schema_json(agent_type)) == [dict(schema) for schema in schemas]
+        assert get_tool_schema_tokens(agent_type) > 0
+        for schema in schemas:
+            assert schema["function"]["parameters"]["required"][-1] == "introduction"
+
+    with pytest.raises(ValueError):
+        get_tool_schema("unknown_agent")
+
+
+def test_registry_is_read_only():
+    registry = get_tool_registry()
+    with pytest.raises(TypeError):
+        registry.tools["Other"] = None
+    with pytest.raises(AttributeError):
+        registry.tools = {}
+
+
+def test_schema_copies_do_not_share_state():
+    schemas = get_tool_schema("main_agent")
+    assert schemas == get_tool_schema("main_agent")
+    schemas[0]["function"]["name"] = "Renamed"
+    schemas[0]["function"]["parameters"]["properties"].clear()
+    # 修改返回的 schema 不影响注册表和其他 agent
+    assert get_tool_schema("main_agent")[0]["function"]["name"] == "UploadToTOS"
+    assert get_tool_schema("analyzer_agent")[0]["function"]["parameters"]["properties"]
+    assert "Renamed" not in get_tool_schema_json("main_agent")
+
+
+def test_enhanced_parameters_do_not_mutate_tool():
+    tool = get_tool("UploadToTOS")
+    before = json.dumps(tool.parameters)
+    tool.get_enhanced_parameters()["properties"]["extra"] = {}
+    assert json.dumps(tool.parameters) == before
+    assert "introduction" not in tool.parameters["properties"]
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("DASHSCOPE_API_KEY", "test")
+    test_registry_is_built_once_and_shared()
+    test_schemas_match_agent_tools()
+    test_registry_is_read_only()
+    test_schema_copies_do_not_share_state()
+    test_enhanced_parameters_do_not_mutate_tool()
+    print("[OK] tool registry")
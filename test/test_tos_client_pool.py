@@ -0,0 +1,105 @@
+import sys
+import threading
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+import requests
+import tos
+
+from src.storage.tos_client_pool import TosClientPool, is_connection_error
+
+
+def make_pool(**kwargs) -> TosClientPool:
+    return TosClientPool("ak", "sk", "tos-cn-beijing.volces.com", "cn-beijing", "bucket", **kwargs)
+
+
+def test_pool_is_bounded_and_reused():
+    pool = make_pool(max_size=2)
+    clients = [pool.acquire() for _ in range(6)]
+    assert len({id(c) for c in clients}) == 2
+    assert clients[0] is clients[2] is clients[4]
+    pool.close()
+
+
+def test_unhealthy_client_is_replaced():
+    pool = make_pool(max_size=1)
+    client = pool.acquire()
+    assert pool.acquire() is client
+    pool.report_failure(client)
+    assert pool.acquire() is not client
+    pool.close()
+
+
+def test_expired_client_is_replaced():
+    pool = make_pool(max_size=1, max_age=1e-9)
+    client = pool.acquire()
+    assert pool.acquire() is not client
+    pool.close()
+
+
+def track_close(client, closed):
+    client.close = lambda: closed.append(client)
+    return client
+
+
+def test_replaced_client_is_closed_after_release():
+    pool = make_pool(max_size=1, health_check_interval=0)
+    closed = []
+    client = track_close(pool.acquire(), closed)
+    pool.report_failure(client)
+    other = pool.acquire()
+    assert other is not client
+    # 旧 client 仍在使用中，释放后才关闭
+    assert closed == []
+    pool.release(client)
+    assert closed == [client]
+    pool.release(other)
+    pool.close()
+
+
+def test_check_health_replaces_only_on_connection_errors():
+    pool = make_pool(max_size=2, health_check_interval=0)
+    closed = []
+    ok, broken = (track_close(pool.acquire(), closed) for _ in range(2))
+    pool.release(ok)
+    pool.release(broken)
+
+    def forbidden(bucket):
+        raise tos.exceptions.TosServerError(None, "denied", "AccessDenied", "", "", "")
+
+    def unreachable(bucket):
+        raise tos.exceptions.TosClientError("http request timeout", requests.ConnectionError("refused"))
+
+    ok.head_bucket = forbidden
+    broken.head_bucket = unreachable
+    assert pool.check_health() == 1
+    assert closed == [broken]
+    assert pool.acquire() is ok
+    pool.close()
+
+
+def test_acquire_schedules_health_check():
+    pool = make_pool(max_size=1, health_check_interval=1e-9)
+    checked = threading.Event()
+    pool.check_health = lambda: checked.set() or 0
+    pool.release(pool.acquire())
+    assert checked.wait(1)
+    pool.close()
+
+
+def test_connection_error_classification():
+    assert is_connection_error(tos.exceptions.TosClientError("timeout", requests.Timeout()))
+    assert not is_connection_error(tos.exceptions.TosClientError("bucket is required"))
+
+
+if __name__ == "__main__":
+    test_pool_is_bounded_and_reused()
+    test_unhealthy_client_is_replaced()
+    test_expired_client_is_replaced()
+    test_replaced_client_is_closed_after_release()
+    test_check_health_replaces_only_on_connection_errors()
+    test_acquire_schedules_health_check()
+    test_connection_error_classification()
+    print("[OK] tos client pool")
@@ -0,0 +1,169 @@
+import os
+import sys
+import asyncio
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+import tos
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.storage.tos_multipart import MIN_PART_SIZE, TosMultipartUploader
+from src.storage.upload_index import UploadIndex
+from src.tool import upload_to_tos as upload_module
+
+
+def server_error(code: str, status: int = 400) -> tos.exceptions.TosServerError:
+    resp = SimpleNamespace(request_id="req", headers={}, status=status)
+    return tos.exceptions.TosServerError(resp, code, code, "host", "resource")
+
+
+class FakeTosClient:
+    """内存中的 TOS client，fail_parts 中的分片按给定异常失败一次"""
+
+    def __init__(self, fail_parts=None, expire_upload=False):
+        self.fail_parts = dict(fail_parts or {})
+        self.expire_upload = expire_upload
+        self.upload_ids = []
+        self.uploaded = []
+        self.completed = None
+        self.aborted = []
+
+    def head_object(self, bucket, key):
+        raise server_error("NoSuchKey", status=404)
+
+    def create_multipart_upload(self, bucket, key):
+        self.upload_ids.append(f"upload{len(self.upload_ids) + 1}")
+        return SimpleNamespace(upload_id=self.upload_ids[-1])
+
+    def upload_part(self, bucket, key, upload_id, part_number, content_length, content):
+        assert len(content) == content_length
+        if self.expire_upload and upload_id == self.upload_ids[0]:
+            raise server_error("NoSuchUpload", status=404)
+        error = self.fail_parts.pop(part_number, None)
+        if error is not None:
+            raise error
+        self.uploaded.append((upload_id, part_number))
+        return SimpleNamespace(etag=f"etag-{upload_id}-{part_number}")
+
+    def complete_multipart_upload(self, bucket, key, upload_id, parts):
+        self.completed = (upload_id, [(p.part_number, p.etag) for p in parts])
+
+    def abort_multipart_upload(self, bucket, key, upload_id):
+        self.aborted.append(upload_id)
+
+
+class FakePool:
+    endpoint = "tos-cn-beijing.volces.com"
+    bucket_name = "bucket"
+
+    def __init__(self, client):
+        self.client = client
+
+    def acquire(self):
+        return self.client
+
+    def release(self, client):
+        pass
+
+    def report_failure(self, client):
+        pass
+
+    @contextmanager
+    def lease(self):
+        yield self.client
+
+
+def make_uploader() -> TosMultipartUploader:
+    return TosMultipartUploader(part_size=MIN_PART_SIZE, multipart_threshold=MIN_PART_SIZE, max_workers=2)
+
+
+@pytest.fixture
+def three_part_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "clip.mp4")
+        with open(path, "wb") as f:
+            f.write(os.urandom(2 * MIN_PART_SIZE + 1024))
+        yield path
+
+
+def test_retry_resumes_from_completed_parts(three_part_file):
+    uploader = make_uploader()
+    client = FakeTosClient(fail_parts={2: server_error("InternalError", status=500)})
+    state = uploader.new_state("bucket", "files/clip.mp4", three_part_file)
+
+    with pytest.raises(tos.exceptions.TosServerError):
+        asyncio.run(uploader.upload(client, state))
+    assert state.upload_id == "upload1"
+    assert sorted(state.completed_parts) == [1, 3]
+    assert client.completed is None
+
+    asyncio.run(uploader.upload(client, state))
+    # 重试只上传失败的分片，不重新创建分片上传
+    assert client.upload_ids == ["upload1"]
+    assert sorted(client.uploaded) == [("upload1", 1), ("upload1", 2), ("upload1", 3)]
+    assert client.completed == ("upload1", [(n, f"etag-upload1-{n}") for n in (1, 2, 3)])
+
+
+def run_tool(monkeypatch, client, local_path, index=None):
+    index = index or UploadIndex(":memory:")
+    monkeypatch.setattr(upload_module, "get_tos_client_pool", lambda: FakePool(client))
+    monkeypatch.setattr(upload_module, "get_upload_index", lambda: index)
+    monkeypatch.setattr(upload_module, "get_tos_uploader", make_uploader)
+    result = asyncio.run(upload_module.UploadToTOS().execute(local_path=local_path))
+    return result, index
+
+
+def test_no_such_upload_restarts_multipart_upload(monkeypatch, three_part_file):
+    client = FakeTosClient(expire_upload=True)
+    result, index = run_tool(monkeypatch, client, three_part_file)
+
+    assert result.success
+    # 分片上传失效后重新创建，所有分片都上传到新的 upload id
+    assert client.upload_ids == ["upload1", "upload2"]
+    assert sorted(client.uploaded) == [("upload2", 1), ("upload2", 2), ("upload2", 3)]
+    assert client.completed[0] == "upload2"
+    assert client.aborted == []
+    object_key = result.result["file_url"].split(".com/", 1)[1]
+    assert index.get_url("bucket", object_key) == result.result["file_url"]
+
+
+def test_failed_upload_is_aborted(monkeypatch, three_part_file):
+    client = FakeTosClient(fail_parts={3: server_error("AccessDenied", status=403)})
+    result, index = run_tool(monkeypatch, client, three_part_file)
+
+    assert not result.success
+    assert client.completed is None
+    # 上传最终失败时释放已上传的分片
+    assert client.aborted == ["upload1"]
+
+
+def test_head_miss_invalidates_stale_index_entry(monkeypatch, three_part_file):
+    # 记录已超过 TTL，HEAD 发现对象已不存在
+    index = UploadIndex(":memory:", ttl=0)
+    client = FakeTosClient(fail_parts={1: server_error("AccessDenied", status=403)})
+    object_key = upload_module.content_addressed_key("files", index.file_hash(three_part_file), three_part_file)
+    index.put_url("bucket", object_key, "https://stale", 1)
+
+    result, _ = run_tool(monkeypatch, client, three_part_file, index=index)
+    assert not result.success
+    assert index._conn.execute("SELECT COUNT(*) FROM uploads").fetchone()[0] == 0
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "clip.mp4")
+        with open(path, "wb") as f:
+            f.write(os.urandom(2 * MIN_PART_SIZE + 1024))
+        test_retry_resumes_from_completed_parts(path)
+        with pytest.MonkeyPatch.context() as mp:
+            test_no_such_upload_restarts_multipart_upload(mp, path)
+        with pytest.MonkeyPatch.context() as mp:
+            test_failed_upload_is_aborted(mp, path)
+        with pytest.MonkeyPatch.context() as mp:
+            test_head_miss_invalidates_stale_index_entry(mp, path)
+    print("[OK] tos multipart")
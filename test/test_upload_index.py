@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from src.storage.upload_index import UploadIndex, hash_file, content_addressed_key
+
+
+def make_file(directory: str, name: str, data: bytes) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_same_content_same_key():
+    with tempfile.TemporaryDirectory() as tmp:
+        a = make_file(tmp, "a.MP4", b"same clip")
+        b = make_file(tmp, "b.mp4", b"same clip")
+        c = make_file(tmp, "a.mp4.part", b"other clip")
+        assert content_addressed_key("files", hash_file(a), a) == content_addressed_key("files", hash_file(b), b)
+        assert content_addressed_key("files", hash_file(a), a).endswith(".mp4")
+        assert hash_file(a) != hash_file(c)
+
+
+def test_file_hash_is_refreshed_when_file_changes():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = UploadIndex(":memory:")
+        path = make_file(tmp, "clip.mp4", b"v1")
+        first = index.file_hash(path)
+        assert index.file_hash(path) == first
+
+        make_file(tmp, "clip.mp4", b"v2 longer")
+        assert index.file_hash(path) == hash_file(path) != first
+
+
+def test_url_ttl_and_invalidate():
+    index = UploadIndex(":memory:", ttl=60)
+    index.put_url("bucket", "files/abc.mp4", "https://bucket.tos/files/abc.mp4", 10)
+    assert index.get_url("bucket", "files/abc.mp4") == "https://bucket.tos/files/abc.mp4"
+    assert index.get_url("other", "files/abc.mp4") is None
+
+    index.ttl = 0
+    time.sleep(0.01)
+    assert index.get_url("bucket", "files/abc.mp4") is None
+
+    index.ttl = 60
+    index.invalidate("bucket", "files/abc.mp4")
+    assert index.get_url("bucket", "files/abc.mp4") is None
+
+
+if __name__ == "__main__":
+    test_same_content_same_key()
+    test_file_hash_is_refreshed_when_file_changes()
+    test_url_ttl_and_invalidate()
+    print("[OK] upload index")
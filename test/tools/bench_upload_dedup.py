@@ -0,0 +1,90 @@
+"""
+Benchmark of the UploadToTOS dedup hit path.
+
+Compares a cold content hash of a file with a repeat upload of the same file,
+which is served from the local upload index without touching TOS. Runs offline:
+the index is a temporary SQLite file and dummy TOS credentials are used when
+none are configured.
+
+    python test/tools/bench_upload_dedup.py [size_mb] [iterations]
+"""
+
+import sys
+import os
+import time
+import asyncio
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+TMP_DIR = tempfile.mkdtemp(prefix="bench_upload_dedup_")
+os.environ["TOS_UPLOAD_INDEX_PATH"] = os.path.join(TMP_DIR, "upload_index.db")
+os.environ.setdefault("TOS_ACCESS_KEY", "bench")
+os.environ.setdefault("TOS_SECRET_KEY", "bench")
+os.environ.setdefault("TOS_BUCKET_NAME", "bench")
+
+from src.config.config import load_tos_config
+from src.storage.upload_index import get_upload_index, hash_file, content_addressed_key
+from src.tool.upload_to_tos import UploadToTOS
+
+
+def make_file(size_mb: int) -> str:
+    path = os.path.join(TMP_DIR, "clip.mp4")
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(1024 * 1024))
+    return path
+
+
+def report(name: str, samples):
+    samples = sorted(samples)
+    p50 = statistics.median(samples) * 1000
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000
+    print(f"{name:<28} p50 {p50:9.3f} ms   p99 {p99:9.3f} ms   n={len(samples)}")
+
+
+async def main(size_mb: int, iterations: int):
+    local_path = make_file(size_mb)
+    tos_config = load_tos_config()
+    bucket, endpoint = tos_config["bucket_name"], tos_config["endpoint"]
+
+    # 冷路径：完整流式哈希
+    cold = []
+    for _ in range(3):
+        start = time.perf_counter()
+        content_hash = hash_file(local_path)
+        cold.append(time.perf_counter() - start)
+
+    # 模拟首次上传完成后的索引状态
+    index = get_upload_index()
+    object_key = content_addressed_key("files", content_hash, local_path)
+    index.file_hash(local_path)
+    index.put_url(bucket, object_key, f"https://{bucket}.{endpoint}/{object_key}", os.path.getsize(local_path))
+
+    # 命中路径：stat + 哈希缓存 + URL 索引
+    index_hit = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        index.get_url(bucket, content_addressed_key("files", index.file_hash(local_path), local_path))
+        index_hit.append(time.perf_counter() - start)
+
+    # 命中路径：完整的 UploadToTOS.execute
+    tool = UploadToTOS()
+    tool_hit = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = await tool.execute(local_path=local_path, introduction="bench")
+        tool_hit.append(time.perf_counter() - start)
+    assert result.success, result.error
+
+    print(f"file size: {size_mb} MB")
+    report("cold sha256", cold)
+    report("index hit", index_hit)
+    report("UploadToTOS.execute hit", tool_hit)
+
+
+if __name__ == "__main__":
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    asyncio.run(main(size_mb, iterations))